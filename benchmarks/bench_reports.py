@@ -0,0 +1,207 @@
+"""
+Benchmark of the report paths against an in-process Supabase stand-in.
+
+Generates synthetic ``sleep_logs`` (1k, 100k and 1M rows by default) in
+fake_backend.FakeBackend and runs the data paths behind every report,
+through the same calls the screens make:
+
+* ``admin``        -- AdminScreen / ReportScreen.update_report (all users)
+* ``weekly_admin`` -- the admin weekly report (all users, last 7 days)
+* ``overview``     -- the main menu (async_db.fetch_overview), with the
+                      user weekly report (7 latest logs) and the tips
+                      (last 7 days) computed from it
+* ``history``      -- HistoryScreen (count, first page, 10-day averages)
+* ``sync``         -- filling an empty local mirror (mirror mode only)
+
+Each path runs with the local SQLite mirror (``mirror``) and straight
+against the server (``remote``), with the query cache cleared, and
+reports the best time of several runs, throughput and peak traced
+memory. Both the time and the peak memory are compared with a stored
+baseline.
+
+Usage:
+    python benchmarks/bench_reports.py [--sizes 1000,100000] [--save-baseline]
+    python benchmarks/bench_reports.py --check   # exit 1 on regressions
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sleep_tracker.database import async_db, supabase_db  # noqa: E402
+from sleep_tracker.database.fake_backend import FakeBackend  # noqa: E402
+from sleep_tracker.database.paging import user_history  # noqa: E402
+from sleep_tracker.models import LogArray  # noqa: E402
+from sleep_tracker.stats import summarize  # noqa: E402
+
+BASELINE = Path(__file__).with_name("baseline.json")
+USERS = 200
+FIRST_DAY = date(2020, 1, 1)
+
+# Peak memory growth below this is tracemalloc noise, not a regression
+MEMORY_SLACK = 64 * 1024
+
+
+def make_logs(count, users=USERS):
+    """Yield synthetic logs: one per user and day, spread over the days."""
+    for i in range(count):
+        sleep = (22 * 60 + (i * 37) % 240) % (24 * 60)
+        wake = (sleep + 6 * 60 + (i * 53) % 180) % (24 * 60)
+        yield {
+            "login": f"user{i % users}",
+            "date": (FIRST_DAY + timedelta(days=i // users)).isoformat(),
+            "sleep_time": f"{sleep // 60:02d}:{sleep % 60:02d}:00",
+            "wake_time": f"{wake // 60:02d}:{wake % 60:02d}:00",
+            "wellbeing": i % 10 + 1,
+            "comment": "",
+        }
+
+
+def report_paths(today, loop):
+    week_ago = today - timedelta(days=6)
+    user = "user0"
+
+    def overview():
+        # MainMenuScreen: the weekly report and the tips read the overview
+        data = loop.run_until_complete(async_db.fetch_overview(user, today))
+        summarize(data.recent[:7])
+        summarize(data.week)
+
+    async def load_history():
+        # HistoryScreen.load_history without a prefetched overview: the
+        # first page holds the visible rows and the latest 10 logs
+        logs = await async_db.run(user_history, user)
+        if len(logs):
+            await logs.load_page(0)
+        summarize(LogArray(log for log in logs.window(0, 10) if log is not None))
+
+    # name -> (callable, whether it scans every row)
+    return {
+        "admin": (lambda: supabase_db.fetch_summaries(), True),
+        "weekly_admin": (
+            lambda: supabase_db.fetch_summaries(date_from=week_ago, date_to=today), False),
+        "overview": (overview, False),
+        "history": (lambda: loop.run_until_complete(load_history()), False),
+    }
+
+
+def measure(func, repeat):
+    """Return (best seconds, peak traced bytes) of a callable."""
+    best = float("inf")
+    for _ in range(repeat):
+        supabase_db.query_cache.invalidate()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    supabase_db.query_cache.invalidate()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+
+def run_size(size, repeat):
+    backend = FakeBackend()
+    backend.load("sleep_logs", make_logs(size))
+    supabase_db.use_backend(backend)
+    today = FIRST_DAY + timedelta(days=(size - 1) // USERS)
+    results = {}
+
+    def record(mode, name, scans, seconds, peak):
+        rate = f"{size / seconds / 1000:9.1f}k rows/s" if scans else f"{1 / seconds:9.1f} calls/s"
+        print(f"{size:>8} {mode:<7} {name:<13} {seconds * 1000:10.2f} ms {rate} "
+              f"{peak / 2 ** 20:8.2f} MiB", flush=True)
+        results[f"{mode}/{name}/{size}"] = {"seconds": seconds, "peak_bytes": peak}
+
+    def cold_sync():
+        supabase_db.use_local_store(":memory:")
+        supabase_db.sync_local_store(force=True)
+
+    loop = asyncio.new_event_loop()
+    try:
+        # A cold sync is slow on big tables and needs a fresh mirror every run
+        record("mirror", "sync", True, *measure(cold_sync, 1 if size > 100_000 else repeat))
+        for name, (func, scans) in report_paths(today, loop).items():
+            record("mirror", name, scans, *measure(func, repeat))
+        supabase_db.use_local_store(None)
+        for name, (func, scans) in report_paths(today, loop).items():
+            record("remote", name, scans, *measure(func, repeat))
+    finally:
+        loop.close()
+    return results
+
+
+def compare(results, baseline, tolerance, memory_tolerance=None):
+    """Print the paths slower or hungrier than the baseline and return how many there are.
+
+    Args:
+        results: The results of this run
+        baseline: The saved results
+        tolerance: Allowed slowdown, e.g. 0.25 for 25%
+        memory_tolerance: Allowed growth of the peak memory (default:
+            the same as tolerance)
+    """
+    if memory_tolerance is None:
+        memory_tolerance = tolerance
+    regressions = 0
+    for key, result in results.items():
+        old = baseline.get(key)
+        if not old:
+            continue
+        if result["seconds"] > old["seconds"] * (1 + tolerance):
+            regressions += 1
+            print(f"REGRESSION {key}: {old['seconds'] * 1000:.2f} ms -> "
+                  f"{result['seconds'] * 1000:.2f} ms")
+        peak, old_peak = result["peak_bytes"], old.get("peak_bytes")
+        if old_peak is not None and peak > max(old_peak * (1 + memory_tolerance),
+                                               old_peak + MEMORY_SLACK):
+            regressions += 1
+            print(f"REGRESSION {key} peak: {old_peak / 2 ** 20:.2f} MiB -> "
+                  f"{peak / 2 ** 20:.2f} MiB")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="1000,100000,1000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown versus the baseline")
+    parser.add_argument("--memory-tolerance", type=float,
+                        help="allowed peak memory growth (default: --tolerance)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true",
+                        help="exit with status 1 if a path regressed")
+    args = parser.parse_args(argv)
+
+    print(f"{'rows':>8} {'mode':<7} {'path':<13} {'best':>13} {'throughput':>18} {'peak':>12}")
+    results = {}
+    for size in (int(size) for size in args.sizes.split(",")):
+        results.update(run_size(size, args.repeat))
+    supabase_db.use_local_store(None)
+    supabase_db.use_backend(None)
+
+    if args.save_baseline:
+        BASELINE.write_text(json.dumps(results, indent=2, sort_keys=True))
+        print(f"Baseline saved to {BASELINE}")
+        return
+    if not BASELINE.exists():
+        print("No baseline to compare with, create one with --save-baseline")
+        return
+    regressions = compare(results, json.loads(BASELINE.read_text()), args.tolerance,
+                          args.memory_tolerance)
+    print(f"{regressions} regression(s) versus {BASELINE.name}")
+    if args.check and regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Cost of circular-mean aggregation compared to plain minute averages.
+
+Aggregates synthetic sleep logs per user three ways and prints the best
+time of several runs:
+
+* ``previous`` -- a copy of the pure Python SleepStats path from before
+  circular means, summing raw minutes after midnight
+* ``circular`` -- SleepStats on the pure Python path
+* ``numpy``    -- SleepStats on the NumPy path (if NumPy is installed)
+
+``previous`` is kept here verbatim (parsing included), so the comparison
+doesn't depend on helpers that changed since.
+
+Usage:
+    python benchmarks/bench_stats.py [--rows 100000] [--repeat 5]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sleep_tracker.stats import SleepStats, np  # noqa: E402
+
+
+def make_logs(count, users=50, seed=1):
+    rng = random.Random(seed)
+    logs = []
+    for i in range(count):
+        sleep = (22 * 60 + rng.randrange(-120, 180)) % (24 * 60)
+        wake = (sleep + rng.randrange(5 * 60, 10 * 60)) % (24 * 60)
+        logs.append({
+            "login": f"user{i % users}",
+            "sleep_time": f"{sleep // 60:02d}:{sleep % 60:02d}:00",
+            "wake_time": f"{wake // 60:02d}:{wake % 60:02d}:00",
+            "wellbeing": rng.randrange(1, 11),
+        })
+    return logs
+
+
+def _previous_parse_minutes(value):
+    hours, minutes, *_ = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def _previous_parse_log(log):
+    try:
+        return (
+            _previous_parse_minutes(log['sleep_time']),
+            _previous_parse_minutes(log['wake_time']),
+            int(log.get('wellbeing', 5)),
+        )
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+class PreviousStats:
+    """SleepStats.add/merge/summaries as they were before circular means."""
+
+    def __init__(self, group_by='login'):
+        self.group_by = group_by
+        self._totals = {}
+
+    def add(self, log):
+        values = _previous_parse_log(log)
+        if values is None:
+            return False
+        sleep, wake, wellbeing = values
+        group = log.get(self.group_by, '???') if self.group_by else None
+        self.merge(group, sleep, wake, wellbeing, (wake - sleep) % (24 * 60), 1)
+        return True
+
+    def merge(self, group, sleep, wake, wellbeing, duration, count):
+        totals = self._totals.get(group)
+        if totals is None:
+            totals = self._totals[group] = [0, 0, 0, 0, 0]
+        totals[0] += sleep
+        totals[1] += wake
+        totals[2] += wellbeing
+        totals[3] += duration
+        totals[4] += count
+
+    def summaries(self):
+        return {
+            group: (sleep // count, wake // count, wellbeing / count, duration / count, count)
+            for group, (sleep, wake, wellbeing, duration, count) in self._totals.items()
+        }
+
+
+def previous(logs):
+    stats = PreviousStats()
+    for log in logs:
+        stats.add(log)
+    return stats.summaries()
+
+
+def best_of(repeat, runs, logs):
+    """Best time of every run; the runs take turns so drift hits all alike."""
+    times = {name: [] for name in runs}
+    for _ in range(repeat):
+        for name, func in runs.items():
+            start = time.perf_counter()
+            func(logs)
+            times[name].append(time.perf_counter() - start)
+    return {name: min(values) for name, values in times.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    logs = make_logs(args.rows)
+    runs = {
+        "previous": previous,
+        "circular": lambda logs: SleepStats(vectorize=False).update(logs).summaries(),
+    }
+    if np is not None:
+        runs["numpy"] = lambda logs: SleepStats(vectorize=True).update(logs).summaries()
+    times = best_of(args.repeat, runs, logs)
+    baseline = times["previous"]
+    for name, seconds in times.items():
+        print(
+            f"{name:<9} {args.rows} rows: {seconds * 1000:8.1f} ms "
+            f"({args.rows / seconds / 1e6:5.2f} M rows/s, {seconds / baseline:4.2f}x previous)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Per-request latency of the Supabase transport, cold vs warm connections.
+
+Starts a local stand-in for the PostgREST endpoint that answers
+``GET /rest/v1/sleep_logs`` with JSON rows. Every new connection is
+delayed by ``--handshake-ms`` to model the TCP + TLS handshake of a
+mobile network, which a cold request pays and a warm (pooled keep-alive)
+request doesn't.
+
+Usage:
+    python benchmarks/bench_transport.py [--requests 200] [--handshake-ms 150]
+
+Requires httpx.
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from sleep_tracker.database.transport import TransportConfig, create_http_client  # noqa: E402
+
+
+def make_rows(count):
+    return [
+        {
+            "id": i,
+            "login": f"user{i % 20}",
+            "date": f"2025-05-{i % 28 + 1:02d}",
+            "sleep_time": "23:00:00",
+            "wake_time": "07:00:00",
+            "wellbeing": i % 10 + 1,
+        }
+        for i in range(count)
+    ]
+
+
+def start_server(rows, handshake_delay):
+    """Start the stand-in server on a free port and return it."""
+    body = json.dumps(rows).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        disable_nagle_algorithm = True  # headers and body are separate writes
+
+        def setup(self):
+            super().setup()
+            time.sleep(handshake_delay)
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def timed(request):
+    start = time.perf_counter()
+    response = request()
+    response.raise_for_status()
+    response.json()
+    return time.perf_counter() - start
+
+
+def run_cold(url, config, count):
+    """A new client (and connection) for every request."""
+    latencies = []
+    for _ in range(count):
+        with create_http_client(config) as client:
+            latencies.append(timed(lambda: client.get(url)))
+    return latencies
+
+
+def run_warm(url, config, count, workers=1):
+    """One pooled client shared by every request."""
+    with create_http_client(config) as client:
+        timed(lambda: client.get(url))  # open the connection(s) first
+        with ThreadPoolExecutor(workers) as pool:
+            return list(pool.map(lambda _: timed(lambda: client.get(url)), range(count)))
+
+
+def report(name, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:<22} n={len(latencies):<5} "
+        f"mean={statistics.mean(latencies) * 1000:7.2f} ms  "
+        f"p50={statistics.median(latencies) * 1000:7.2f} ms  "
+        f"p95={p95 * 1000:7.2f} ms"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=10, help="rows per response")
+    parser.add_argument("--handshake-ms", type=float, default=150.0)
+    parser.add_argument("--workers", type=int, default=4, help="threads for the concurrent run")
+    args = parser.parse_args(argv)
+
+    server = start_server(make_rows(args.rows), args.handshake_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_port}/rest/v1/sleep_logs"
+    config = TransportConfig()
+    try:
+        # Cold requests are slow by design, don't make them dominate the run time
+        report("cold (new connection)", run_cold(url, config, max(1, args.requests // 10)))
+        report("warm (keep-alive)", run_warm(url, config, args.requests))
+        report(f"warm x{args.workers} threads", run_warm(url, config, args.requests, args.workers))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
-from sleep_tracker.app import main
+import sys
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Headless commands (python -m sleep_tracker report ...), no Toga
+        from sleep_tracker.cli import main as cli_main
+        sys.exit(cli_main())
+    from sleep_tracker.app import main
     main().main_loop()
@@ -2,13 +2,33 @@
 App for Programming class
 """
 
+import sys
+import time
+from collections import OrderedDict
+
+# Taken as early as possible, so startup timings include importing Toga
+_IMPORT_START = time.perf_counter()
+
 import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
 
+from .metrics import metrics
+
+# Constructed screens kept alive between navigations; beyond this many the
+# least recently shown one is dropped
+MAX_CACHED_SCREENS = 4
+
 class SleepTracker(toga.App):
     def startup(self):
         """Construct and show the Toga application."""
+        metrics.record('startup:imports', time.perf_counter() - _IMPORT_START)
+        startup_start = time.perf_counter()
+        
+        # Read the images of the first screens while the window is built
+        from .images import SLEEP_IMAGE, images
+        images.preload([SLEEP_IMAGE])
+        
         # Create the main window
         self.main_window = toga.MainWindow(title=self.formal_name)
         
@@ -16,8 +36,23 @@ class SleepTracker(toga.App):
         self.current_user = None
         self.user_role = None
         
+        # Work against an in-process server if one is configured, with its
+        # own mirror so it never mixes with the real data
+        from .database.fake_backend import from_environ
+        from .database.supabase_db import use_backend, use_local_store
+        mirror = "sleep_logs.sqlite3"
+        backend = from_environ()
+        if backend is not None:
+            use_backend(backend)
+            mirror = "sleep_logs-fake.sqlite3"
+        
+        # Mirror sleep logs locally so screens don't wait on the network
+        self.paths.data.mkdir(parents=True, exist_ok=True)
+        use_local_store(self.paths.data / mirror)
+        
         # Create a container for the content
         self.content = toga.Box(style=Pack(direction=COLUMN))
+        self.screens = OrderedDict()
         
         # Set the content of the main window
         self.main_window.content = self.content
@@ -25,50 +60,130 @@ class SleepTracker(toga.App):
         # Show the main window
         self.main_window.show()
         
-        # Initialize the login screen
+        # Warms the data of the screens the user is likely to open next
+        from .database.prefetch import Prefetcher
+        self.prefetcher = Prefetcher(self.loop)
+        
+        # Restore the saved session, if any. The main menu opens right away
+        # with a plain user's rights; the session is checked on the server
+        # in the background, which also tells the user's role
+        from .database.session import load_session
+        self.session_path = self.paths.data / "session.json"
+        session = load_session(self.session_path)
+        if session:
+            self.current_user = session['login']
+            self.user_role = 'user'
+            self.prefetcher.start(self.current_user, self.user_role)
+            self.show_main_menu()
+            self.loop.create_task(self.restore_session(session))
+        else:
+            self.show_login_screen()
+        
+        # Shown on the diagnostics screen and saved with metrics.json
+        metrics.record('startup:startup', time.perf_counter() - startup_start)
+        metrics.record('startup:first_screen', time.perf_counter() - _IMPORT_START)
+    
+    async def restore_session(self, session):
+        """Check a saved session on the server and take the user's role from it.
+        
+        Args:
+            session: The session loaded at startup
+        """
+        from .database import async_db
+        from .database.session import verify_session
+        from .database.supabase_db import fetch_user
+        try:
+            user = await async_db.run(fetch_user, session['login'])
+        except Exception as e:
+            # Без сети пользователь работает со своими данными, без прав администратора
+            print(f"Не удалось проверить сессию: {e}", file=sys.stderr)
+            return
+        if session['login'] != self.current_user:
+            return
+        if not verify_session(session, user):
+            self.log_out()
+            return
+        role = user.get('role', 'user')
+        if role != self.user_role:
+            self.user_role = role
+            self.prefetcher.start(self.current_user, role)
+            self.forget_screens()
+            self.show_main_menu()
+    
+    def log_out(self):
+        """Forget the current user and their data, and show the login screen."""
+        from .database.session import clear_session
+        from .database.supabase_db import query_cache
+        clear_session(self.session_path)
+        query_cache.invalidate()
+        self.prefetcher.cancel()
+        self.forget_screens()
+        self.current_user = None
+        self.user_role = None
         self.show_login_screen()
     
+    def show_screen(self, screen_class):
+        """Swap a screen in, reusing the instance built on an earlier visit.
+        
+        A reused screen reloads its data through reload(). Only the
+        MAX_CACHED_SCREENS most recently shown screens are kept, so rarely
+        used ones (e.g. the admin screen) are rebuilt when needed. Building
+        and reloading are timed in metrics.
+        
+        Args:
+            screen_class: The BaseScreen subclass to show
+        """
+        screen = self.screens.pop(screen_class, None)
+        name = screen_class.__name__
+        if screen is None:
+            screen = metrics.measure(f"screen:{name}", screen_class, self)
+        else:
+            metrics.measure(f"reload:{name}", screen.reload)
+        self.screens[screen_class] = screen
+        while len(self.screens) > MAX_CACHED_SCREENS:
+            self.screens.popitem(last=False)
+        self.content.clear()
+        self.content.add(screen)
+    
+    def forget_screens(self):
+        """Drop the cached screens that show the current user's data."""
+        for screen_class in [cls for cls in self.screens if cls.per_user]:
+            del self.screens[screen_class]
+    
     def show_login_screen(self):
         """Show the login screen."""
         from .screens.login_screen import LoginScreen
-        screen = LoginScreen(self)
-        self.content.clear()
-        self.content.add(screen)
+        self.show_screen(LoginScreen)
     
     def show_main_menu(self):
         """Show the main menu screen."""
         from .screens.main_menu import MainMenuScreen
-        screen = MainMenuScreen(self)
-        self.content.clear()
-        self.content.add(screen)
+        self.show_screen(MainMenuScreen)
     
     def show_input_screen(self):
         """Show the input screen."""
         from .screens.input_screen import InputScreen
-        screen = InputScreen(self)
-        self.content.clear()
-        self.content.add(screen)
+        self.show_screen(InputScreen)
     
     def show_history_screen(self):
         """Show the history screen."""
         from .screens.history_screen import HistoryScreen
-        screen = HistoryScreen(self)
-        self.content.clear()
-        self.content.add(screen)
+        self.show_screen(HistoryScreen)
     
     def show_report_screen(self):
         """Show the report screen."""
         from .screens.report_screen import ReportScreen
-        screen = ReportScreen(self)
-        self.content.clear()
-        self.content.add(screen)
+        self.show_screen(ReportScreen)
     
     def show_admin_screen(self):
         """Show the admin screen."""
         from .screens.admin_screen import AdminScreen
-        screen = AdminScreen(self)
-        self.content.clear()
-        self.content.add(screen)
+        self.show_screen(AdminScreen)
+    
+    def show_diagnostics_screen(self):
+        """Show the performance diagnostics screen (admins only)."""
+        from .screens.diagnostics_screen import DiagnosticsScreen
+        self.show_screen(DiagnosticsScreen)
 
 def main():
     return SleepTracker()
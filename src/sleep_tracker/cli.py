@@ -0,0 +1,242 @@
+"""
+Headless commands, run as ``python -m sleep_tracker <command>``.
+
+``report`` builds the per-user report of the admin screen for any date
+range without Toga, e.g. for nightly jobs on a server::
+
+    python -m sleep_tracker report --from 2025-05-01 --to 2025-05-31 \\
+        --format csv --output may.csv
+
+Users are split into partitions summarized by a process pool; every
+worker streams its users' logs page by page (see supabase_db) and only
+sends the per-user summaries back. The server is the one configured for
+the app, or the fake backend named by ``SLEEP_TRACKER_FAKE_BACKEND``
+(a file, since every worker process opens it on its own).
+If any page of logs (or the list of users) can't be fetched, no report
+is written and the command exits with status 1, so a nightly job never
+publishes a partial report.
+
+``export`` writes the logs themselves to CSV or Parquet (see export.py)::
+
+    python -m sleep_tracker export --from 2024-01-01 --output logs.parquet
+
+``import`` loads history from other trackers in batches (see importer.py)::
+
+    python -m sleep_tracker import history.csv --login ivan
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from itertools import repeat
+from multiprocessing import get_context
+
+from .stats import format_minutes
+
+# Partitions per worker: smaller partitions even out users with many logs
+PARTITIONS_PER_WORKER = 4
+
+REPORT_FIELDS = ("login", "logs", "avg_sleep", "avg_wake", "avg_duration", "avg_wellbeing")
+
+
+def _use_configured_backend():
+    from .database.fake_backend import from_environ
+    from .database.supabase_db import use_backend
+    backend = from_environ()
+    if backend is not None:
+        use_backend(backend)
+
+
+def summarize_users(logins, date_from=None, date_to=None):
+    """Summarize the logs of some users.
+
+    Args:
+        logins: The users to summarize
+        date_from: First day of the window (inclusive)
+        date_to: Last day of the window (inclusive)
+
+    Returns:
+        A dict mapping each login with logs to its SleepSummary
+
+    Raises:
+        Exception: If a page of logs can't be fetched
+    """
+    from .database.supabase_db import fetch_summaries
+    summaries = {}
+    for login in logins:
+        summaries.update(fetch_summaries(login, date_from, date_to, strict=True))
+    return summaries
+
+
+def partition(items, count):
+    """Split items round-robin into at most count non-empty lists."""
+    return [part for part in (items[i::count] for i in range(count)) if part]
+
+
+def build_report(logins, date_from=None, date_to=None, workers=None):
+    """Summarize users over a date range, in parallel processes.
+
+    Args:
+        logins: The users to report on
+        date_from: First day of the window (inclusive)
+        date_to: Last day of the window (inclusive)
+        workers: Number of worker processes, 1 to work in this process
+            (default: one per CPU)
+
+    Returns:
+        A dict mapping each login with logs to its SleepSummary, sorted
+        by login
+    """
+    workers = workers or os.cpu_count() or 1
+    summaries = {}
+    if workers == 1 or len(logins) <= 1:
+        summaries = summarize_users(logins, date_from, date_to)
+    else:
+        parts = partition(logins, workers * PARTITIONS_PER_WORKER)
+        # spawn, so no worker inherits open connections or threads
+        with ProcessPoolExecutor(min(workers, len(parts)), mp_context=get_context("spawn"),
+                                 initializer=_use_configured_backend) as executor:
+            for result in executor.map(summarize_users, parts, repeat(date_from), repeat(date_to)):
+                summaries.update(result)
+    return dict(sorted(summaries.items()))
+
+
+def report_rows(summaries):
+    """Turn summaries into flat rows with REPORT_FIELDS."""
+    for login, summary in summaries.items():
+        yield {
+            "login": login,
+            "logs": summary.count,
+            "avg_sleep": format_minutes(summary.avg_sleep),
+            "avg_wake": format_minutes(summary.avg_wake),
+            "avg_duration": round(summary.avg_duration, 1),
+            "avg_wellbeing": round(summary.avg_wellbeing, 2),
+        }
+
+
+def write_report(rows, out, fmt="csv"):
+    """Write report rows to a text stream as CSV or JSON."""
+    if fmt == "json":
+        json.dump(list(rows), out, ensure_ascii=False, indent=2)
+        out.write("\n")
+        return
+    writer = csv.DictWriter(out, fieldnames=REPORT_FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def _split_logins(users):
+    """Parse a --users value into a list of logins, None if not given."""
+    if not users:
+        return None
+    return [login.strip() for login in users.split(",") if login.strip()]
+
+
+def report(args):
+    _use_configured_backend()
+    logins = _split_logins(args.users)
+    try:
+        if logins is None:
+            from .database.supabase_db import fetch_logins
+            logins = fetch_logins(strict=True)
+        summaries = build_report(logins, args.date_from, args.date_to, args.workers)
+    except Exception as e:
+        print(f"Report failed: {e}", file=sys.stderr)
+        return 1
+    rows = report_rows(summaries)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            write_report(rows, out, args.format)
+    else:
+        write_report(rows, sys.stdout, args.format)
+    return 0
+
+
+def export(args):
+    from . import export as exporter
+    _use_configured_backend()
+    logins = _split_logins(args.users)
+    fmt = args.format or exporter.format_for(args.output)
+    try:
+        if args.output == "-":
+            if fmt != "csv":
+                print("Parquet can only be written to a file", file=sys.stderr)
+                return 2
+            count = exporter.write_csv(sys.stdout, exporter.iter_pages(
+                logins, args.date_from, args.date_to, args.page_size))
+        else:
+            count = exporter.export_logs(args.output, fmt, logins, args.date_from,
+                                         args.date_to, args.page_size)
+    except Exception as e:
+        print(f"Export failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Exported {count} logs", file=sys.stderr)
+    return 0
+
+
+def import_logs(args):
+    from .importer import import_file
+    _use_configured_backend()
+
+    def progress(result):
+        print(f"read {result.read}, imported {result.imported}, "
+              f"duplicates {result.duplicates}, invalid {result.invalid}", file=sys.stderr)
+
+    try:
+        result = import_file(args.file, args.login, args.batch_size, progress)
+    except Exception as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    for number, message in result.errors:
+        print(f"row {number}: {message}", file=sys.stderr)
+    if result.invalid > len(result.errors):
+        print(f"... and {result.invalid - len(result.errors)} more invalid rows", file=sys.stderr)
+    return 0
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(prog="python -m sleep_tracker")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_report = commands.add_parser("report", help="per-user sleep report")
+    parser_report.add_argument("--from", dest="date_from", type=date.fromisoformat,
+                               help="first day, YYYY-MM-DD (inclusive)")
+    parser_report.add_argument("--to", dest="date_to", type=date.fromisoformat,
+                               help="last day, YYYY-MM-DD (inclusive)")
+    parser_report.add_argument("--users", help="comma separated logins (default: all users)")
+    parser_report.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser_report.add_argument("--output", help="file to write (default: stdout)")
+    parser_report.add_argument("--workers", type=int,
+                               help="worker processes (default: one per CPU)")
+    parser_report.set_defaults(func=report)
+
+    parser_export = commands.add_parser("export", help="export sleep logs to CSV or Parquet")
+    parser_export.add_argument("--output", required=True,
+                               help="file to write, - for CSV on stdout")
+    parser_export.add_argument("--format", choices=("csv", "parquet"),
+                               help="default: parquet for *.parquet files, else csv")
+    parser_export.add_argument("--from", dest="date_from", type=date.fromisoformat,
+                               help="first day, YYYY-MM-DD (inclusive)")
+    parser_export.add_argument("--to", dest="date_to", type=date.fromisoformat,
+                               help="last day, YYYY-MM-DD (inclusive)")
+    parser_export.add_argument("--users", help="comma separated logins (default: all users)")
+    parser_export.add_argument("--page-size", type=int, default=1000,
+                               help="rows fetched and written at a time")
+    parser_export.set_defaults(func=export)
+
+    parser_import = commands.add_parser("import", help="import sleep history from CSV or JSON")
+    parser_import.add_argument("file", help="CSV, JSON Lines (.jsonl) or JSON file")
+    parser_import.add_argument("--login", help="import every row for this user")
+    parser_import.add_argument("--batch-size", type=int, default=5000,
+                               help="rows inserted per request")
+    parser_import.set_defaults(func=import_logs)
+    return parser
+
+
+def main(argv=None):
+    args = make_parser().parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,72 @@
+"""
+Clock-time arithmetic shared by all reports.
+
+Bedtimes and wake-up times live on a 24-hour circle: averaging 23:30 and
+00:30 as plain minutes gives noon, while the right answer is midnight.
+Times are therefore averaged as angles (the circular mean): every time
+becomes a unit vector, the vectors are summed and the mean time is the
+direction of the sum. Sums of vectors can be added together like any
+other total, so they work for running totals and pre-aggregated rollups.
+"""
+
+import math
+
+MINUTES_PER_DAY = 24 * 60
+
+# Radians per minute of the day
+_ANGLE = 2 * math.pi / MINUTES_PER_DAY
+
+# Unit vectors of every minute of the day. Looking them up is cheaper than
+# calling sin/cos for every row, and gives every code path the same values.
+UNIT_SIN = tuple(math.sin(minute * _ANGLE) for minute in range(MINUTES_PER_DAY))
+UNIT_COS = tuple(math.cos(minute * _ANGLE) for minute in range(MINUTES_PER_DAY))
+
+
+def parse_minutes(value):
+    """Convert a time string to minutes after midnight.
+
+    Args:
+        value: A time in ``HH:MM`` or ``HH:MM:SS`` format
+
+    Returns:
+        The number of minutes after midnight (seconds are ignored)
+    """
+    hours, minutes, *_ = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def sleep_duration(sleep, wake):
+    """Minutes asleep between bedtime and wake-up, wrapping past midnight."""
+    return (wake - sleep) % MINUTES_PER_DAY
+
+
+def unit_vector(minutes):
+    """Return the (sin, cos) unit vector of a time in minutes after midnight."""
+    minute = minutes % MINUTES_PER_DAY
+    return UNIT_SIN[minute], UNIT_COS[minute]
+
+
+def circular_mean(sin_sum, cos_sum):
+    """Return the mean time of summed unit vectors.
+
+    Args:
+        sin_sum: Sum of the sine components
+        cos_sum: Sum of the cosine components
+
+    Returns:
+        Minutes after midnight, in ``[0, MINUTES_PER_DAY)``
+    """
+    angle = math.atan2(sin_sum, cos_sum)
+    return round(angle / _ANGLE) % MINUTES_PER_DAY
+
+
+def mean_time(times):
+    """Return the circular mean of times in minutes after midnight, or None."""
+    sin_sum = cos_sum = 0.0
+    count = 0
+    for minutes in times:
+        sin, cos = unit_vector(minutes)
+        sin_sum += sin
+        cos_sum += cos
+        count += 1
+    return circular_mean(sin_sum, cos_sum) if count else None
@@ -0,0 +1,104 @@
+"""
+Asyncio front end of the data layer.
+
+supabase_db is synchronous (the Supabase client, SQLite), so screens await
+these wrappers instead: each call runs on a small dedicated thread pool,
+which keeps the Toga event loop free and lets independent queries run at
+the same time with ``asyncio.gather``. The pool is bounded so a burst of
+handlers can't open more connections than the server is happy with.
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from . import supabase_db
+from ..models import LogArray
+
+# Upper bound of queries running at the same time
+MAX_WORKERS = 4
+
+# Columns the main menu statistics need
+SUMMARY_COLUMNS = "date,sleep_time,wake_time,wellbeing"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the shared thread pool, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=MAX_WORKERS, thread_name_prefix="db"
+                )
+    return _executor
+
+
+async def run(func, *args, **kwargs):
+    """Run a blocking data layer call on the pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def fetch_sleep_logs(**kwargs):
+    """Awaitable supabase_db.fetch_sleep_logs."""
+    return await run(supabase_db.fetch_sleep_logs, **kwargs)
+
+
+async def fetch_log_array(**kwargs):
+    """Awaitable supabase_db.fetch_log_array."""
+    return await run(supabase_db.fetch_log_array, **kwargs)
+
+
+async def fetch_summaries(login=None, date_from=None, date_to=None):
+    """Awaitable supabase_db.fetch_summaries."""
+    return await run(supabase_db.fetch_summaries, login, date_from, date_to)
+
+
+async def has_today_entry(login):
+    """Awaitable supabase_db.has_today_entry."""
+    return await run(supabase_db.has_today_entry, login)
+
+
+class Overview(NamedTuple):
+    """Everything the main menu shows about a user."""
+
+    week: LogArray      # logs dated within the last 7 days
+    recent: LogArray    # the 10 latest logs, newest first
+    has_today: bool     # whether today's log exists
+
+
+async def fetch_overview(login, today=None):
+    """Fetch the main menu data of a user with concurrent queries.
+
+    Args:
+        login: The user's login
+        today: The current day (defaults to date.today())
+
+    Returns:
+        An Overview
+    """
+    today = today or date.today()
+    week, recent, has_today = await asyncio.gather(
+        fetch_log_array(
+            login=login,
+            date_from=today - timedelta(days=6),
+            date_to=today,
+            columns=SUMMARY_COLUMNS,
+        ),
+        fetch_log_array(
+            login=login,
+            columns=SUMMARY_COLUMNS,
+            order="date", desc=True, limit=10,
+        ),
+        has_today_entry(login),
+    )
+    return Overview(week=week, recent=recent, has_today=has_today)
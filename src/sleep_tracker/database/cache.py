@@ -0,0 +1,75 @@
+"""
+Process-wide cache of sleep log queries.
+
+Moving between screens repeats the same queries (e.g. the main menu,
+history and weekly report all ask for the current user's logs). Results
+are kept for a short time, the least recently used entries are evicted
+once the cache is full, and writes invalidate the affected user.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    def __init__(self, ttl=30.0, maxsize=64):
+        """Initialize the cache.
+
+        Args:
+            ttl: Seconds an entry stays valid
+            maxsize: Maximum number of entries kept
+        """
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Look up a query.
+
+        Args:
+            key: A tuple whose first item is the login the query is limited
+                to (None for queries over all users)
+
+        Returns:
+            A (found, value) pair
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, login=None):
+        """Drop cached queries.
+
+        Args:
+            login: Drop only queries that can include this user's logs
+                (theirs and the all-users ones); drop everything if None
+        """
+        with self._lock:
+            if login is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] in (login, None)]:
+                del self._entries[key]
+
+    def stats(self):
+        """Return the hit/miss counters and current size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
@@ -0,0 +1,279 @@
+"""
+In-process stand-in for the Supabase server, backed by SQLite.
+
+supabase_db talks to the server through the postgrest query builder
+(``client.table(...).select(...).eq(...).execute()``). FakeBackend
+implements the part of that interface the app uses, with the same filter,
+order and range semantics, so the data layer and the screens run without
+a network: plug it in with ``supabase_db.use_backend``.
+
+Every request can be delayed (``latency``, ``jitter``) and made to fail
+(``failure_rate``, ``fail_next``), which makes the caching, offline and
+retry paths reproducible in tests and local load runs. The app itself
+runs against one when ``SLEEP_TRACKER_FAKE_BACKEND`` names its SQLite
+file (see from_environ).
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+from ..metrics import metrics
+
+TABLES = {
+    "sleep_logs": ("id", "login", "date", "sleep_time", "wake_time", "wellbeing", "comment"),
+    "users": ("login", "password", "role"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sleep_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    login TEXT,
+    date TEXT,
+    sleep_time TEXT,
+    wake_time TEXT,
+    wellbeing INTEGER,
+    comment TEXT,
+    UNIQUE (login, date)
+);
+CREATE INDEX IF NOT EXISTS sleep_logs_date ON sleep_logs (date);
+CREATE TABLE IF NOT EXISTS users (
+    login TEXT PRIMARY KEY,
+    password TEXT,
+    role TEXT
+);
+"""
+
+
+def _connect_error():
+    # The errors a real unreachable server produces, so login_user and
+    # the retry paths see what they see in production
+    try:
+        import httpx
+    except ImportError:
+        return ConnectionError("Injected failure")
+    return httpx.ConnectError("Injected failure")
+
+
+class FakeBackend:
+    def __init__(self, path=":memory:", latency=0.0, jitter=0.0,
+                 failure_rate=0.0, error=_connect_error, seed=None):
+        """Initialize the backend.
+
+        Args:
+            path: SQLite file holding the tables, ":memory:" for a
+                throwaway database
+            latency: Delay (seconds) added to every request
+            jitter: Extra random delay, up to this many seconds
+            failure_rate: Probability of a request failing, 0 to 1
+            error: Callable returning the exception of a failed request
+            seed: Seed of the random delays and failures, for
+                reproducible runs
+        """
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.error = error
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._failures = []
+
+    def table(self, name):
+        if name not in TABLES:
+            raise ValueError(f"Unknown table: {name}")
+        return _Query(self, name)
+
+    def load(self, table, rows):
+        """Bulk insert rows without going through requests.
+
+        Rows clashing with a unique key (a second log for a day, a known
+        login) are skipped, as the app's upserts do.
+        """
+        columns = [name for name in TABLES[table] if name != "id"]
+        with self.lock, self.conn:
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                ([row.get(name) for name in columns] for row in rows),
+            )
+
+    def fail_next(self, count=1, error=None, after=0):
+        """Make the next requests fail, regardless of failure_rate.
+
+        Args:
+            count: Number of requests to fail
+            error: Callable returning the exception, defaults to self.error
+            after: Number of requests to let through first, e.g. to fail
+                a page in the middle of a paginated read
+        """
+        self._failures.extend([None] * after + [error or self.error] * count)
+
+    def _request(self):
+        """Account for one request: delay it and decide whether it fails."""
+        with self.lock:
+            self.requests += 1
+            delay = self.latency
+            if self.jitter:
+                delay += self.random.uniform(0, self.jitter)
+            error = self._failures.pop(0) if self._failures else None
+            if error is None and self.failure_rate and self.random.random() < self.failure_rate:
+                error = self.error
+        # Slept outside the lock, so concurrent requests overlap as they
+        # would on a real server
+        if delay:
+            time.sleep(delay)
+        if error is not None:
+            raise error()
+
+
+def from_environ(environ=os.environ):
+    """Build the backend configured by environment variables, if any.
+
+    ``SLEEP_TRACKER_FAKE_BACKEND`` is the SQLite file (or ":memory:"),
+    ``SLEEP_TRACKER_FAKE_LATENCY`` the delay per request in seconds and
+    ``SLEEP_TRACKER_FAKE_FAILURE_RATE`` the share of failing requests.
+
+    Returns:
+        A FakeBackend, or None if SLEEP_TRACKER_FAKE_BACKEND isn't set
+    """
+    path = environ.get("SLEEP_TRACKER_FAKE_BACKEND")
+    if not path:
+        return None
+    return FakeBackend(
+        path,
+        latency=float(environ.get("SLEEP_TRACKER_FAKE_LATENCY", 0)),
+        failure_rate=float(environ.get("SLEEP_TRACKER_FAKE_FAILURE_RATE", 0)),
+    )
+
+
+class _Query:
+    def __init__(self, backend, table):
+        self.backend = backend
+        self.table = table
+        self.columns = TABLES[table]
+        self.method = "select"
+        self.selected = "*"
+        self.count = None
+        self.head = False
+        self.filters = []
+        self.params = []
+        self.order_by = []
+        self.limit_value = None
+        self.offset_value = None
+        self.rows = None
+        self.ignore_duplicates = False
+
+    def _column(self, name):
+        if name not in self.columns:
+            raise ValueError(f"Unknown column: {name}")
+        return name
+
+    def select(self, columns="*", count=None, head=None):
+        self.selected = columns
+        self.count = count
+        self.head = bool(head)
+        return self
+
+    def _filter(self, column, op, value):
+        self.filters.append(f"{self._column(column)} {op} ?")
+        self.params.append(value)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "=", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "<=", value)
+
+    def order(self, column, desc=False):
+        # Like postgrest, later calls add secondary sort keys
+        self.order_by.append(f"{self._column(column)} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size):
+        self.limit_value = int(size)
+        return self
+
+    def offset(self, size):
+        self.offset_value = int(size)
+        return self
+
+    def range(self, start, end):
+        """Rows start..end, both inclusive."""
+        self.offset_value = int(start)
+        self.limit_value = int(end) - int(start) + 1
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self.method = "upsert"
+        self.rows = rows if isinstance(rows, list) else [rows]
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def execute(self):
+        backend = self.backend
+        backend._request()
+        with backend.lock, backend.conn:
+            if self.method == "upsert":
+                response = SimpleNamespace(data=self._upsert(), count=None)
+            else:
+                response = self._select()
+        # Counted like the JSON body a real server would send
+        metrics.add_bytes(len(json.dumps(response.data, default=str)))
+        return response
+
+    def _upsert(self):
+        verb = "INSERT OR IGNORE" if self.ignore_duplicates else "INSERT OR REPLACE"
+        stored = []
+        for row in self.rows:
+            columns = [self._column(name) for name in row]
+            cursor = self.backend.conn.execute(
+                f"{verb} INTO {self.table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' for _ in columns)})",
+                [row[name] for name in columns],
+            )
+            if cursor.rowcount:
+                stored.append(dict(row, id=cursor.lastrowid) if "id" in self.columns else dict(row))
+        return stored
+
+    def _select(self):
+        if self.selected == "*":
+            names = list(self.columns)
+        else:
+            names = [self._column(name.strip()) for name in self.selected.split(",")]
+        where = f" WHERE {' AND '.join(self.filters)}" if self.filters else ""
+        count = None
+        if self.count:
+            count = self.backend.conn.execute(
+                f"SELECT COUNT(*) FROM {self.table}{where}", self.params
+            ).fetchone()[0]
+        if self.head:
+            return SimpleNamespace(data=[], count=count)
+        sql = f"SELECT {', '.join(names)} FROM {self.table}{where}"
+        if self.order_by:
+            sql += f" ORDER BY {', '.join(self.order_by)}"
+        if self.limit_value is not None or self.offset_value:
+            sql += f" LIMIT {self.limit_value if self.limit_value is not None else -1}"
+            sql += f" OFFSET {self.offset_value or 0}"
+        data = [dict(row) for row in self.backend.conn.execute(sql, self.params)]
+        return SimpleNamespace(data=data, count=count)
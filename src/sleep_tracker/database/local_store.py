@@ -0,0 +1,570 @@
+"""
+Local SQLite mirror of the ``sleep_logs`` table.
+
+Screens read from the mirror, so history and reports open without a
+network round trip. The mirror is kept up to date incrementally: every
+sync scope (one user, or ``'*'`` for the whole table) remembers the
+highest server ``id`` it has seen and only asks the server for newer rows.
+Rows changed or deleted on the server after they were mirrored are not
+picked up; call ``reset_sync`` to force a full resync.
+
+New logs are first written to the ``outbox`` table and sent to the server
+later (see ``outbox.OutboxFlusher``). Until then they have no server id,
+but queries already include them. Logs the server refuses for good, or
+skips because the day was already logged elsewhere, are moved to the
+``rejected`` table so the user can be told about them.
+
+Per-user daily and weekly (ISO week) sums are kept in rollup tables by
+triggers on ``sleep_logs``, so every mirrored row updates them exactly
+once, whichever path wrote it. Reports read O(users x weeks) rollup rows
+instead of every log.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import date as Date, timedelta
+
+from ..clock import sleep_duration, unit_vector
+from ..stats import parse_log
+
+COLUMNS = ("id", "login", "date", "sleep_time", "wake_time", "wellbeing", "comment")
+DATA_COLUMNS = COLUMNS[1:]
+ALL_USERS = "*"
+# Why a queued log the server skipped is rejected, shown to the user
+SKIPPED_ERROR = "за этот день на сервере уже есть запись"
+
+# Bump when the mirror schema changes; mirrored data is then refetched
+SCHEMA_VERSION = 2
+# Tables holding only data derived from the server, safe to drop
+DERIVED_TABLES = ("sleep_logs", "sync_state", "rollup_daily", "rollup_weekly")
+# Values parsed once on insert, NULL duration_minutes means "not counted".
+# Times are stored as unit vectors so their sums give circular means.
+PARSED_COLUMNS = ("sleep_sin", "sleep_cos", "wake_sin", "wake_cos",
+                  "duration_minutes", "wellbeing_value", "week")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sleep_logs (
+    id INTEGER PRIMARY KEY,
+    login TEXT,
+    date TEXT,
+    sleep_time TEXT,
+    wake_time TEXT,
+    wellbeing,
+    comment TEXT,
+    sleep_sin REAL,
+    sleep_cos REAL,
+    wake_sin REAL,
+    wake_cos REAL,
+    duration_minutes INTEGER,
+    wellbeing_value INTEGER,
+    week TEXT
+);
+CREATE INDEX IF NOT EXISTS sleep_logs_login_date ON sleep_logs (login, date);
+CREATE INDEX IF NOT EXISTS sleep_logs_date ON sleep_logs (date);
+CREATE TABLE IF NOT EXISTS sync_state (
+    scope TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rollup_daily (
+    login TEXT NOT NULL,
+    day TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    sleep_sin REAL NOT NULL,
+    sleep_cos REAL NOT NULL,
+    wake_sin REAL NOT NULL,
+    wake_cos REAL NOT NULL,
+    duration INTEGER NOT NULL,
+    wellbeing INTEGER NOT NULL,
+    PRIMARY KEY (login, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rollup_weekly (
+    login TEXT NOT NULL,
+    week TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    sleep_sin REAL NOT NULL,
+    sleep_cos REAL NOT NULL,
+    wake_sin REAL NOT NULL,
+    wake_cos REAL NOT NULL,
+    duration INTEGER NOT NULL,
+    wellbeing INTEGER NOT NULL,
+    PRIMARY KEY (login, week)
+) WITHOUT ROWID;
+"""
+
+# The daily and weekly rollups are maintained by the same triggers, keyed
+# by the day and by the Monday of the ISO week
+_ROLLUP_INSERT = """
+    INSERT INTO rollup_{period} (login, {key}, n, sleep_sin, sleep_cos, wake_sin, wake_cos,
+                                 duration, wellbeing)
+    VALUES (COALESCE(NEW.login, '???'), COALESCE(NEW.{column}, ''), 1,
+            NEW.sleep_sin, NEW.sleep_cos, NEW.wake_sin, NEW.wake_cos,
+            NEW.duration_minutes, NEW.wellbeing_value)
+    ON CONFLICT (login, {key}) DO UPDATE SET
+        n = n + 1,
+        sleep_sin = sleep_sin + excluded.sleep_sin, sleep_cos = sleep_cos + excluded.sleep_cos,
+        wake_sin = wake_sin + excluded.wake_sin, wake_cos = wake_cos + excluded.wake_cos,
+        duration = duration + excluded.duration, wellbeing = wellbeing + excluded.wellbeing;
+"""
+_ROLLUP_DELETE = """
+    UPDATE rollup_{period} SET
+        n = n - 1,
+        sleep_sin = sleep_sin - OLD.sleep_sin, sleep_cos = sleep_cos - OLD.sleep_cos,
+        wake_sin = wake_sin - OLD.wake_sin, wake_cos = wake_cos - OLD.wake_cos,
+        duration = duration - OLD.duration_minutes, wellbeing = wellbeing - OLD.wellbeing_value
+    WHERE login = COALESCE(OLD.login, '???') AND {key} = COALESCE(OLD.{column}, '');
+"""
+_PERIODS = (
+    {"period": "daily", "key": "day", "column": "date"},
+    {"period": "weekly", "key": "week", "column": "week"},
+)
+SCHEMA += f"""
+CREATE TRIGGER IF NOT EXISTS sleep_logs_rollup_insert AFTER INSERT ON sleep_logs
+WHEN NEW.duration_minutes IS NOT NULL
+BEGIN{''.join(_ROLLUP_INSERT.format(**period) for period in _PERIODS)}END;
+CREATE TRIGGER IF NOT EXISTS sleep_logs_rollup_delete AFTER DELETE ON sleep_logs
+WHEN OLD.duration_minutes IS NOT NULL
+BEGIN{''.join(_ROLLUP_DELETE.format(**period) for period in _PERIODS)}END;
+"""
+SCHEMA += """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    login TEXT,
+    date TEXT,
+    sleep_time TEXT,
+    wake_time TEXT,
+    wellbeing,
+    comment TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS outbox_login_date ON outbox (login, date);
+CREATE TABLE IF NOT EXISTS rejected (
+    seq INTEGER PRIMARY KEY,
+    login TEXT,
+    date TEXT,
+    sleep_time TEXT,
+    wake_time TEXT,
+    wellbeing,
+    comment TEXT,
+    error TEXT,
+    rejected_at REAL,
+    seen INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+UPSERT_SQL = (
+    f"INSERT OR REPLACE INTO sleep_logs ({', '.join(COLUMNS + PARSED_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in COLUMNS + PARSED_COLUMNS)})"
+)
+
+# Mirrored rows followed by rows still waiting in the outbox (id is NULL)
+ALL_ROWS = (
+    f"(SELECT {', '.join(COLUMNS)} FROM sleep_logs "
+    f"UNION ALL SELECT NULL AS id, {', '.join(DATA_COLUMNS)} FROM outbox)"
+)
+
+
+def _column_list(columns):
+    """Validate a PostgREST-style column selection and return it as SQL."""
+    if columns == "*":
+        return ", ".join(COLUMNS)
+    if isinstance(columns, str):
+        columns = columns.split(",")
+    names = [name.strip() for name in columns]
+    for name in names:
+        if name not in COLUMNS:
+            raise ValueError(f"Unknown sleep_logs column: {name}")
+    return ", ".join(names)
+
+
+def _row_values(row):
+    """Values of a server row for UPSERT_SQL, including the parsed columns."""
+    values = tuple(row.get(name) for name in COLUMNS)
+    try:
+        day = Date.fromisoformat(str(row.get("date")))
+        week = (day - timedelta(days=day.weekday())).isoformat()
+    except ValueError:
+        week = None
+    parsed = parse_log(row)
+    if parsed is None:
+        return values + (None,) * (len(PARSED_COLUMNS) - 1) + (week,)
+    sleep, wake, wellbeing = parsed
+    return (values + unit_vector(sleep) + unit_vector(wake)
+            + (sleep_duration(sleep, wake), wellbeing, week))
+
+
+def _as_date(value):
+    return Date.fromisoformat(str(value)) if value else None
+
+
+def _where(login=None, date=None, date_from=None, date_to=None):
+    clauses = []
+    params = []
+    if login:
+        clauses.append("login = ?")
+        params.append(login)
+    if date:
+        clauses.append("date = ?")
+        params.append(str(date))
+    if date_from:
+        clauses.append("date >= ?")
+        params.append(str(date_from))
+    if date_to:
+        clauses.append("date <= ?")
+        params.append(str(date_to))
+    return clauses, params
+
+
+class LocalStore:
+    def __init__(self, path):
+        """Open (or create) the mirror database.
+
+        Args:
+            path: Path of the SQLite file, or ":memory:"
+        """
+        self.path = str(path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        if self.path != ":memory:":
+            # Cheap, still crash-safe commits for the outbox
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        # INSERT OR REPLACE must fire the delete trigger for replaced rows,
+        # otherwise their old values would stay in the rollups
+        self._conn.execute("PRAGMA recursive_triggers = ON")
+        with self._lock, self._conn:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version != SCHEMA_VERSION:
+                for table in DERIVED_TABLES:
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._synced_at = {}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def upsert(self, rows):
+        """Insert or replace server rows in the mirror.
+
+        Args:
+            rows: ``sleep_logs`` rows, each with an ``id``
+
+        Returns:
+            The number of rows written
+        """
+        values = [_row_values(row) for row in rows]
+        if not values:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT_SQL, values)
+        return len(values)
+
+    def query(self, login=None, date=None, date_from=None, date_to=None,
+              columns="*", order=None, desc=False, limit=None, offset=None):
+        """Query the mirror with the same arguments as ``fetch_sleep_logs``.
+
+        Returns:
+            A list of row dicts
+        """
+        sql = f"SELECT {_column_list(columns)} FROM {ALL_ROWS}"
+        clauses, params = _where(login, date, date_from, date_to)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order:
+            _column_list([order])
+            sql += f" ORDER BY {order} {'DESC' if desc else 'ASC'}"
+        if limit or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [int(limit) if limit else -1, int(offset or 0)]
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def count(self, login=None, date_from=None, date_to=None):
+        """Return the number of logs (including queued ones) matching the filters."""
+        sql = f"SELECT COUNT(*) FROM {ALL_ROWS}"
+        clauses, params = _where(login, None, date_from, date_to)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def iter_pages(self, login=None, date_from=None, date_to=None,
+                   columns="*", page_size=1000):
+        """Yield matching rows page by page, using keyset pagination on id.
+
+        Rows still waiting in the outbox come last, in one final page.
+        """
+        names = _column_list(columns).split(", ")
+        if "id" not in names:
+            names.insert(0, "id")
+        columns = ", ".join(names)
+        clauses, params = _where(login, None, date_from, date_to)
+        last_id = None
+        while True:
+            page_clauses = list(clauses)
+            page_params = list(params)
+            if last_id is not None:
+                page_clauses.append("id > ?")
+                page_params.append(last_id)
+            sql = f"SELECT {columns} FROM sleep_logs"
+            if page_clauses:
+                sql += " WHERE " + " AND ".join(page_clauses)
+            sql += " ORDER BY id LIMIT ?"
+            page_params.append(page_size)
+            with self._lock:
+                page = [dict(row) for row in self._conn.execute(sql, page_params)]
+            if not page:
+                break
+            yield page
+            last_id = page[-1]["id"]
+        outbox_columns = ", ".join("NULL AS id" if name == "id" else name for name in names)
+        sql = f"SELECT {outbox_columns} FROM outbox"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            page = [dict(row) for row in self._conn.execute(sql + " ORDER BY seq", params)]
+        if page:
+            yield page
+
+    def has_entry(self, login, date):
+        """Check whether a user has a log for a day, using the (login, date) indexes."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM sleep_logs WHERE login = ? AND date = ? "
+                "UNION ALL SELECT 1 FROM outbox WHERE login = ? AND date = ? LIMIT 1",
+                (login, str(date), login, str(date)),
+            ).fetchone()
+        return row is not None
+
+    def enqueue(self, row):
+        """Durably queue a new log for sending to the server.
+
+        The duplicate check and the insert run in one transaction, so a
+        user can never queue two logs for the same day.
+
+        Args:
+            row: A ``sleep_logs`` row without an ``id``
+
+        Returns:
+            The outbox sequence number of the row, or None if the user
+            already has a log for that day
+        """
+        with self._lock, self._conn:
+            if self.has_entry(row.get("login"), row.get("date")):
+                return None
+            cursor = self._conn.execute(
+                f"INSERT INTO outbox ({', '.join(DATA_COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in DATA_COLUMNS)})",
+                tuple(row.get(name) for name in DATA_COLUMNS),
+            )
+        return cursor.lastrowid
+
+    def pending(self, limit=500):
+        """Return up to ``limit`` queued logs as (seq, row) pairs, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT seq, {', '.join(DATA_COLUMNS)} FROM outbox ORDER BY seq LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [(row["seq"], {name: row[name] for name in DATA_COLUMNS}) for row in rows]
+
+    def pending_count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def complete(self, seqs, server_rows):
+        """Replace sent outbox rows with the rows the server stored.
+
+        Both happen in one transaction, so a log is never shown twice or
+        lost. Sent rows the server skipped, because the user already had a
+        log for that day, are moved to the rejected logs.
+        """
+        values = [_row_values(row) for row in server_rows]
+        stored = {(row["login"], str(row["date"])) for row in server_rows}
+        placeholders = ", ".join("?" for _ in seqs)
+        with self._lock, self._conn:
+            sent = self._conn.execute(
+                f"SELECT seq, login, date FROM outbox WHERE seq IN ({placeholders})",
+                tuple(seqs),
+            ).fetchall()
+            self._move_to_rejected(
+                [row["seq"] for row in sent if (row["login"], row["date"]) not in stored],
+                SKIPPED_ERROR,
+            )
+            self._conn.executemany(UPSERT_SQL, values)
+            self._conn.executemany(
+                "DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in seqs]
+            )
+
+    def record_failure(self, seqs):
+        """Count a refusal of queued rows by the server.
+
+        Outages (no network, timeouts, 5xx) are not counted, so they never
+        get rows rejected.
+
+        Returns:
+            The highest number of refusals among the rows
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE outbox SET attempts = attempts + 1 WHERE seq = ?",
+                [(seq,) for seq in seqs],
+            )
+            placeholders = ", ".join("?" for _ in seqs)
+            attempts = self._conn.execute(
+                f"SELECT MAX(attempts) FROM outbox WHERE seq IN ({placeholders})",
+                tuple(seqs),
+            ).fetchone()[0]
+        return attempts or 0
+
+    def reject(self, seqs, error):
+        """Move queued rows the server refused out of the outbox.
+
+        Args:
+            seqs: Outbox sequence numbers of the rows
+            error: Why the rows were refused, shown to the user
+        """
+        with self._lock, self._conn:
+            self._move_to_rejected(seqs, error)
+            self._conn.executemany(
+                "DELETE FROM outbox WHERE seq = ?", [(seq,) for seq in seqs]
+            )
+
+    def _move_to_rejected(self, seqs, error):
+        columns = ", ".join(DATA_COLUMNS)
+        self._conn.executemany(
+            f"INSERT OR REPLACE INTO rejected (seq, {columns}, error, rejected_at) "
+            f"SELECT seq, {columns}, ?, ? FROM outbox WHERE seq = ?",
+            [(error, time.time(), seq) for seq in seqs],
+        )
+
+    def rejected(self, login=None, unseen=False):
+        """Return the logs the server refused, oldest first, with their error.
+
+        Args:
+            login: Only return this user's logs
+            unseen: Only return logs not yet marked with mark_seen
+        """
+        sql = f"SELECT seq, {', '.join(DATA_COLUMNS)}, error FROM rejected"
+        clauses, params = [], []
+        if login:
+            clauses.append("login = ?")
+            params.append(login)
+        if unseen:
+            clauses.append("NOT seen")
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql + " ORDER BY seq", params)]
+
+    def mark_seen(self, seqs):
+        """Mark rejected logs as shown to their user."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE rejected SET seen = 1 WHERE seq = ?", [(seq,) for seq in seqs]
+            )
+
+    def pending_logs(self, login=None, date_from=None, date_to=None):
+        """Return queued logs (not yet in the rollups) matching the filters."""
+        sql = f"SELECT NULL AS id, {', '.join(DATA_COLUMNS)} FROM outbox"
+        clauses, params = _where(login, None, date_from, date_to)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql + " ORDER BY seq", params)]
+
+    def rollup_totals(self, login=None, date_from=None, date_to=None):
+        """Return per-user sums for a date window from the rollup tables.
+
+        Whole ISO weeks inside the window are read from ``rollup_weekly``
+        and only the partial weeks at its edges from ``rollup_daily``.
+        Queued outbox rows are not included (see pending_logs).
+
+        Args:
+            login: Only this user
+            date_from: First day of the window (inclusive), or None
+            date_to: Last day of the window (inclusive), or None
+
+        Returns:
+            A list of (login, sleep_sin, sleep_cos, wake_sin, wake_cos,
+            wellbeing, duration, count) tuples of sums, ordered by login,
+            in the argument order of SleepStats.merge
+        """
+        start = _as_date(date_from)
+        end = _as_date(date_to)
+        # First Monday on/after the start and last Monday whose week ends by the end
+        first_week = start + timedelta(days=-start.weekday() % 7) if start else None
+        last_week = end - timedelta(days=(end.weekday() + 1) % 7 + 6) if end else None
+        parts = []
+        params = []
+
+        def part(table, key, low, high):
+            clauses = []
+            if login:
+                clauses.append("login = ?")
+                params.append(login)
+            if low or high:
+                clauses.append(f"{key} != ''")
+            if low:
+                clauses.append(f"{key} >= ?")
+                params.append(low.isoformat())
+            if high:
+                clauses.append(f"{key} <= ?")
+                params.append(high.isoformat())
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+            parts.append(
+                "SELECT login, sleep_sin, sleep_cos, wake_sin, wake_cos, wellbeing, duration, n "
+                f"FROM {table}{where}"
+            )
+
+        if first_week and last_week and first_week > last_week:
+            part("rollup_daily", "day", start, end)
+        else:
+            part("rollup_weekly", "week", first_week, last_week)
+            if start and start < first_week:
+                part("rollup_daily", "day", start, first_week - timedelta(days=1))
+            if end and last_week + timedelta(days=6) < end:
+                part("rollup_daily", "day", last_week + timedelta(days=7), end)
+        sql = (
+            "SELECT login, SUM(sleep_sin), SUM(sleep_cos), SUM(wake_sin), SUM(wake_cos), "
+            "SUM(wellbeing), SUM(duration), SUM(n) "
+            f"FROM ({' UNION ALL '.join(parts)}) GROUP BY login HAVING SUM(n) > 0 ORDER BY login"
+        )
+        with self._lock:
+            return [tuple(row) for row in self._conn.execute(sql, params)]
+
+    def high_water_mark(self, scope=ALL_USERS):
+        """Return the highest server id already synced for a scope."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT last_id FROM sync_state WHERE scope = ?", (scope,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def mark_synced(self, scope, last_id):
+        """Record a completed sync of a scope up to ``last_id``."""
+        if last_id is not None:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (scope, last_id) VALUES (?, ?)",
+                    (scope, last_id),
+                )
+        self._synced_at[scope] = time.monotonic()
+
+    def is_fresh(self, scope, max_age):
+        """Check whether a scope (or the whole table) was synced recently."""
+        now = time.monotonic()
+        return any(
+            now - self._synced_at[key] < max_age
+            for key in (scope, ALL_USERS)
+            if key in self._synced_at
+        )
+
+    def reset_sync(self):
+        """Forget all sync progress so the next sync refetches everything."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sync_state")
+        self._synced_at.clear()
@@ -0,0 +1,171 @@
+"""
+Background delivery of queued sleep logs.
+
+``queue_sleep_data`` only writes to the local outbox, so saving never
+waits for the network. The flusher thread sends everything pending in a
+single bulk insert, and backs off exponentially while the server is
+unreachable, so a long offline period ends with a few large requests
+instead of one request per entry.
+
+A batch the server refuses (e.g. a row it considers invalid) is split in
+halves until the bad rows are isolated, so the rows queued with them are
+still delivered. A single row refused ``max_attempts`` times is moved to
+the store's rejected logs instead of blocking the outbox forever. Only
+refusals count: while the server is unreachable, timing out or failing
+with a 5xx, rows wait in the outbox however long the outage lasts.
+"""
+
+import sys
+import threading
+
+# SQLSTATE classes a retry can get past: connection failures, rolled back
+# transactions (deadlocks), exhausted resources, cancelled statements
+# (timeouts) and system errors
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57", "58")
+
+# PostgREST codes of a database it can't reach
+TRANSIENT_POSTGREST_CODES = ("PGRST000", "PGRST001", "PGRST002", "PGRST003")
+
+
+def is_network_error(error):
+    """Whether a send failed before the server answered (retry as is)."""
+    return isinstance(error, OSError)
+
+
+def _status_code(error):
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "status_code", None)
+    if status is None:
+        # postgrest puts the HTTP status in ``code`` when the error body
+        # isn't JSON (e.g. a gateway's 502 page)
+        code = str(getattr(error, "code", None) or "")
+        if len(code) == 3 and code.isdigit():
+            status = int(code)
+    return status
+
+
+def is_transient_error(error):
+    """Whether a send may succeed as is later, so it doesn't count as a refusal.
+
+    Network failures, timeouts and server errors (5xx) are transient;
+    other 4xx responses and constraint or data errors are refusals.
+    """
+    if is_network_error(error):
+        return True
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500 or status in (408, 429)
+    code = str(getattr(error, "code", None) or "")
+    return code.startswith(TRANSIENT_SQLSTATE_CLASSES) or code in TRANSIENT_POSTGREST_CODES
+
+
+class OutboxFlusher(threading.Thread):
+    def __init__(self, store, send, batch_size=500, retry_delay=2.0,
+                 max_retry_delay=300.0, max_attempts=5, transient=is_transient_error,
+                 changed=None):
+        """Initialize the flusher.
+
+        Args:
+            store: The LocalStore holding the outbox
+            send: Callable inserting a list of rows on the server and
+                returning the stored rows (rows the server skipped as
+                duplicates are not returned and end up rejected); it
+                raises on failure
+            batch_size: Maximum rows per bulk insert
+            retry_delay: Delay (seconds) after the first failed attempt
+            max_retry_delay: Upper bound of the exponential backoff
+            max_attempts: Refusals of a single row before it is rejected
+            transient: Callable telling whether an exception raised by
+                send is an outage rather than a refusal; outages never
+                count towards max_attempts
+            changed: Callable called with a login whose queued logs were
+                delivered, rejected or skipped, e.g. to drop cached queries
+        """
+        super().__init__(name="outbox-flusher", daemon=True)
+        self.store = store
+        self.send = send
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_attempts = max_attempts
+        self.transient = transient
+        self.changed = changed
+        self.failures = 0
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+
+    def wake(self):
+        """Ask the flusher to deliver pending rows now."""
+        self._wake.set()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def run(self):
+        while not self._stopped.is_set():
+            if self.flush():
+                self.failures = 0
+                timeout = None
+            else:
+                self.failures += 1
+                timeout = min(
+                    self.retry_delay * 2 ** (self.failures - 1),
+                    self.max_retry_delay,
+                )
+            self._wake.wait(timeout)
+            self._wake.clear()
+
+    def flush(self):
+        """Send all pending rows, one bulk insert per batch.
+
+        Returns:
+            True if the outbox was emptied, False if a batch failed and
+            must be retried later
+        """
+        while True:
+            pending = self.store.pending(self.batch_size)
+            if not pending:
+                return True
+            try:
+                delivered = self._send(pending)
+            except Exception as e:
+                # Only refusals count as attempts, see _send
+                print(f"Ошибка при отправке сохраненных записей: {e}", file=sys.stderr)
+                return False
+            if not delivered:
+                return False
+
+    def _send(self, pending):
+        """Send (seq, row) pairs, isolating the rows the server refuses.
+
+        Raises:
+            Exception: The error of send, if it is transient
+
+        Returns:
+            False if refused rows stay queued for another attempt
+        """
+        seqs = [seq for seq, _ in pending]
+        try:
+            stored = self.send([row for _, row in pending])
+        except Exception as e:
+            if self.transient(e):
+                raise
+            print(f"Сервер не принял сохраненные записи: {e}", file=sys.stderr)
+            if len(pending) > 1:
+                middle = len(pending) // 2
+                first = self._send(pending[:middle])
+                return self._send(pending[middle:]) and first
+            if self.store.record_failure(seqs) < self.max_attempts:
+                return False
+            self.store.reject(seqs, str(e))
+            self._notify(pending)
+            return True
+        self.store.complete(seqs, stored)
+        self._notify(pending)
+        return True
+
+    def _notify(self, pending):
+        if self.changed is not None:
+            for login in {row["login"] for _, row in pending}:
+                self.changed(login)
@@ -0,0 +1,152 @@
+"""
+Windowed access to a user's full sleep history.
+
+The history list can cover years of nightly logs. Instead of fetching them
+all, PagedLogs looks like a sequence of every log but fetches fixed-size
+pages on demand and keeps only the most recently used ones, so memory use
+stays constant however far the user scrolls.
+
+Indexing fetches a missing page right away. The history screen instead
+reads only the pages in memory (``cached``) and loads the missing ones on
+the async_db pool (``load_page``), so scrolling never waits on a query.
+Pages are kept here rather than in the shared query cache, which would
+otherwise be flushed by a long scroll.
+"""
+
+import asyncio
+from collections import OrderedDict
+
+from . import async_db, supabase_db
+
+# Columns the history list shows
+HISTORY_COLUMNS = "date,sleep_time,wake_time,wellbeing"
+
+
+class PagedLogs:
+    def __init__(self, fetch_page, size, page_size=50, max_pages=8):
+        """Initialize the source.
+
+        Args:
+            fetch_page: Callable (offset, limit) returning a sequence of
+                rows (e.g. a LogArray)
+            size: Total number of rows
+            page_size: Rows per fetch
+            max_pages: Pages kept in memory
+        """
+        self.fetch_page = fetch_page
+        self.size = size
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages = OrderedDict()
+        self._loading = {}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError(index)
+        page = self.page(index // self.page_size)
+        offset = index % self.page_size
+        # The data can shrink under us (e.g. a row deleted on the server)
+        return page[offset] if offset < len(page) else None
+
+    def page(self, number):
+        """Return a page, fetching it unless it is already in memory."""
+        page = self._pages.get(number)
+        if page is None:
+            page = self.fetch_page(number * self.page_size, self.page_size)
+            self._keep(number, page)
+        else:
+            self._pages.move_to_end(number)
+        return page
+
+    def _keep(self, number, page):
+        self._pages[number] = page
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+
+    def cached(self, index, default=None):
+        """Return a row if its page is in memory, default if it isn't.
+
+        Never fetches. Rows past the end of a shorter than expected page
+        are None, as with indexing.
+        """
+        page = self._pages.get(index // self.page_size)
+        if page is None:
+            return default
+        offset = index % self.page_size
+        return page[offset] if offset < len(page) else None
+
+    def missing_pages(self, start, stop):
+        """Return the numbers of the pages of rows ``[start, stop)`` not in memory."""
+        start, stop = max(start, 0), min(stop, self.size)
+        if start >= stop:
+            return []
+        return [
+            number
+            for number in range(start // self.page_size, (stop - 1) // self.page_size + 1)
+            if number not in self._pages
+        ]
+
+    async def load_page(self, number):
+        """Fetch a page on the async_db pool unless it is in memory or loading.
+
+        Returns:
+            The page
+        """
+        page = self._pages.get(number)
+        if page is not None:
+            self._pages.move_to_end(number)
+            return page
+        task = self._loading.get(number)
+        if task is None:
+            task = asyncio.ensure_future(async_db.run(
+                self.fetch_page, number * self.page_size, self.page_size
+            ))
+            self._loading[number] = task
+            try:
+                page = await task
+            finally:
+                del self._loading[number]
+            self._keep(number, page)
+            return page
+        return await task
+
+    def window(self, start, stop):
+        """Return the rows in ``[start, stop)``, clamped to the data."""
+        return [self[i] for i in range(max(start, 0), min(stop, self.size))]
+
+
+def user_history(login, page_size=50):
+    """Return a user's logs, newest first, as a PagedLogs of SleepLog records.
+
+    Counts the logs, so it blocks; screens call it through async_db.run.
+    """
+    def fetch_page(offset, limit):
+        return supabase_db.fetch_log_array(
+            login=login, columns=HISTORY_COLUMNS,
+            order="date", desc=True, limit=limit, offset=offset, cache=False,
+        )
+
+    return PagedLogs(fetch_page, supabase_db.count_sleep_logs(login), page_size)
+
+
+def visible_range(position, viewport, row_height, size, overscan=5):
+    """Compute which rows of a scrolled list must be rendered.
+
+    Args:
+        position: Scroll offset from the top, in pixels
+        viewport: Visible height, in pixels
+        row_height: Height of every row, in pixels
+        size: Number of rows
+        overscan: Extra rows rendered above and below the visible ones
+
+    Returns:
+        A (start, stop) pair of row indexes
+    """
+    first = int(position // row_height)
+    last = int((position + viewport) // row_height) + 1
+    return max(first - overscan, 0), min(last + overscan, size)
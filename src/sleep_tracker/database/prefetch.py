@@ -0,0 +1,111 @@
+"""
+Background prefetch of the data the next screen is likely to need.
+
+After logging in (and after every save) the user almost always opens the
+weekly report, history or tips next. The prefetcher loads their data in
+the background, so those screens open from results that are already in
+memory instead of starting a fetch of their own.
+
+Prefetching is low priority: it waits a moment so the current screen is
+drawn first, then runs its jobs one at a time. A screen that needs a job
+before its turn simply starts it right away.
+"""
+
+import asyncio
+import sys
+import time
+from datetime import date, timedelta
+
+from . import async_db
+
+
+class Prefetcher:
+    def __init__(self, loop, delay=0.5, max_age=60.0):
+        """Initialize the prefetcher.
+
+        Args:
+            loop: The event loop running the jobs
+            delay: Seconds to wait before prefetching starts
+            max_age: Seconds a prefetched result is served before it is
+                fetched again
+        """
+        self.loop = loop
+        self.delay = delay
+        self.max_age = max_age
+        self._jobs = {}
+        self._tasks = {}
+        self._runner = None
+
+    def start(self, login, role):
+        """Start prefetching for a user, dropping results of the previous run.
+
+        Args:
+            login: The user's login
+            role: The user's role; admins also get the report summaries
+        """
+        self.cancel()
+        self._jobs = {'overview': lambda: async_db.fetch_overview(login)}
+        if role == 'admin':
+            self._jobs['week_summaries'] = _fetch_week_summaries
+            self._jobs['summaries'] = async_db.fetch_summaries
+        self._runner = self.loop.create_task(self._run())
+
+    def cancel(self):
+        """Cancel all pending jobs and forget their results (e.g. on logout)."""
+        if self._runner is not None:
+            self._runner.cancel()
+        for _, task in self._tasks.values():
+            task.cancel()
+        self._jobs = {}
+        self._tasks = {}
+        self._runner = None
+
+    def get(self, name):
+        """Return the task of a job, starting it if it isn't running or usable.
+
+        Returns:
+            An asyncio task, or None if no such job is scheduled
+        """
+        job = self._jobs.get(name)
+        if job is None:
+            return None
+        entry = self._tasks.get(name)
+        if entry is not None:
+            started, task = entry
+            if not task.done():
+                return task
+            if (not task.cancelled() and task.exception() is None
+                    and time.monotonic() - started < self.max_age):
+                return task
+        task = self.loop.create_task(job())
+        self._tasks[name] = (time.monotonic(), task)
+        return task
+
+    def result(self, name):
+        """Return a job's result if it is already available, otherwise None.
+
+        For screens built synchronously, which can't wait for a job.
+        """
+        entry = self._tasks.get(name)
+        if entry is None:
+            return None
+        started, task = entry
+        if (not task.done() or task.cancelled() or task.exception() is not None
+                or time.monotonic() - started >= self.max_age):
+            return None
+        return task.result()
+
+    async def _run(self):
+        await asyncio.sleep(self.delay)
+        for name in list(self._jobs):
+            try:
+                await self.get(name)
+            except Exception as e:
+                print(f"Ошибка предварительной загрузки ({name}): {e}", file=sys.stderr)
+
+
+async def _fetch_week_summaries():
+    today = date.today()
+    return await async_db.fetch_summaries(
+        date_from=today - timedelta(days=6), date_to=today
+    )
@@ -0,0 +1,91 @@
+"""
+Locally persisted login session.
+
+After a successful login the session is saved next to the local store,
+so relaunching the app goes straight to the main menu. The file holds no
+role: the session is only a login signed with the user's password as
+stored on the server, and the app checks it against the ``users`` table
+at startup (see verify_session), which also tells the user's current
+role. Editing the file, changing the password or deleting the user
+invalidates it. Logging out deletes the session.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import time
+
+# Sessions older than this require logging in again
+SESSION_TTL = 30 * 24 * 60 * 60
+
+
+def session_token(login, password, expires):
+    """Sign a session with the user's password."""
+    message = f"{login}\n{expires}".encode("utf-8")
+    return hmac.new(str(password).encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def save_session(path, user):
+    """Persist a session for a logged in user.
+
+    Args:
+        path: Path of the session file
+        user: The user's row from the ``users`` table
+
+    Returns:
+        The session token
+    """
+    expires = time.time() + SESSION_TTL
+    session = {
+        "login": user["login"],
+        "token": session_token(user["login"], user["password"], expires),
+        "expires": expires,
+    }
+    path = str(path)
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(session, f)
+    os.replace(tmp_path, path)
+    return session["token"]
+
+
+def load_session(path):
+    """Load a saved session, still to be checked with verify_session.
+
+    Returns:
+        A dict with ``login``, ``token`` and ``expires``, or None if there
+        is no unexpired session
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            session = json.load(f)
+        if session["expires"] > time.time() and session["login"] and session["token"]:
+            return session
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+
+def verify_session(session, user):
+    """Check a loaded session against the user's row fetched from the server.
+
+    Args:
+        session: The result of load_session
+        user: The ``users`` row of the session's login, None if there is none
+
+    Returns:
+        True if the session was issued for this user and password
+    """
+    if user is None or user.get("login") != session["login"]:
+        return False
+    expected = session_token(user["login"], user["password"], session["expires"])
+    return hmac.compare_digest(expected, str(session["token"]))
+
+
+def clear_session(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -1,15 +1,170 @@
-from supabase import create_client, Client
 from datetime import date
-import httpx
+import sys
+import threading
+from .cache import QueryCache
+from .local_store import ALL_USERS, LocalStore
+from .outbox import OutboxFlusher, is_transient_error
+from .transport import DEFAULT_CONFIG, create_http_client
+from ..metrics import metrics
+from ..models import LOG_COLUMNS, LogArray
+from ..stats import SleepStats
 
 SUPABASE_URL = "SUPABASE_URL"
 SUPABASE_KEY = "SUPABASE_KEY"
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# How long (seconds) a synced local mirror is trusted before reads ask the
+# server for new rows again
+SYNC_INTERVAL = 60
 
+_client = None
+_client_lock = threading.Lock()
+_transport_config = DEFAULT_CONFIG
+_http_client = None
+_backend = None
+
+def get_client():
+    """Return the shared Supabase client, creating it on first use.
+
+    supabase/httpx/postgrest are only imported here, so importing the
+    screens (and drawing the login screen) doesn't pay for them. All its
+    requests go through one pooled keep-alive HTTP client (see transport).
+    A backend set with use_backend is returned instead.
+    """
+    global _client, _http_client
+    if _backend is not None:
+        return _backend
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from supabase import ClientOptions, create_client
+                _http_client = create_http_client(
+                    _transport_config, event_hooks={"response": [_count_payload]}
+                )
+                _client = create_client(
+                    SUPABASE_URL, SUPABASE_KEY,
+                    options=ClientOptions(httpx_client=_http_client),
+                )
+    return _client
+
+def _count_payload(response):
+    # The body is read right after the hooks anyway; reading it here lets
+    # the call being measured count the bytes as received (compressed)
+    response.read()
+    metrics.add_bytes(response.num_bytes_downloaded)
+
+def configure_transport(config):
+    """Use new HTTP transport settings for all following requests.
+
+    Args:
+        config: A transport.TransportConfig
+    """
+    global _client, _http_client, _transport_config
+    with _client_lock:
+        _transport_config = config
+        if _http_client is not None:
+            _http_client.close()
+        _client = None
+        _http_client = None
+
+def use_backend(backend):
+    """Send every server request to another backend instead of Supabase.
+
+    The backend must offer the postgrest query builder interface of the
+    Supabase client, like fake_backend.FakeBackend. Cached query results
+    from the previous backend are dropped.
+
+    Args:
+        backend: The backend to use, or None to go back to Supabase
+    """
+    global _backend
+    _backend = backend
+    query_cache.invalidate()
+
+# Repeated navigation between screens is served from here; writes and
+# logout invalidate it
+query_cache = QueryCache()
+
+_local_store = None
+_outbox_flusher = None
+_sync_lock = threading.Lock()
+
+def use_local_store(path):
+    """Mirror sleep_logs into a local SQLite file and serve reads from it.
+
+    Also starts the background flusher that delivers queued logs. Cached
+    query results are dropped.
+
+    Args:
+        path: Path of the SQLite file (":memory:" for a throwaway mirror),
+            or None to read straight from the server again
+
+    Returns:
+        The LocalStore, or None
+    """
+    global _local_store, _outbox_flusher
+    if _outbox_flusher is not None:
+        _outbox_flusher.stop()
+        _outbox_flusher = None
+    _local_store = None
+    query_cache.invalidate()
+    if path is None:
+        return None
+    _local_store = LocalStore(path)
+    # Cached queries still show queued logs as they were before delivery
+    _outbox_flusher = OutboxFlusher(_local_store, _upsert_rows, transient=_is_transient_error,
+                                    changed=query_cache.invalidate)
+    _outbox_flusher.start()
+    return _local_store
+
+def _is_transient_error(error):
+    # httpx errors raised before a response (including timeouts) don't
+    # derive from OSError
+    if is_transient_error(error):
+        return True
+    try:
+        import httpx
+    except ImportError:
+        return False
+    return isinstance(error, httpx.TransportError)
+
+def get_local_store():
+    return _local_store
+
+def sync_local_store(login=None, force=False, strict=False):
+    """Pull rows newer than the local high-water mark into the mirror.
+
+    Args:
+        login: Sync only this user's rows, or every row if None
+        force: Sync even if the mirror was synced recently
+        strict: Raise when a page can't be fetched, leaving the mirror
+            marked as not synced, instead of printing the error and
+            keeping what arrived
+
+    Returns:
+        The number of rows received from the server
+    """
+    store = _local_store
+    if store is None:
+        return 0
+    scope = login or ALL_USERS
+    if not force and store.is_fresh(scope, SYNC_INTERVAL):
+        return 0
+    with _sync_lock:
+        if not force and store.is_fresh(scope, SYNC_INTERVAL):
+            return 0
+        last_id = store.high_water_mark(scope)
+        count = 0
+        for page in _iter_remote_pages(login=login, after_id=last_id, strict=strict):
+            count += store.upsert(page)
+            last_id = page[-1]["id"]
+        store.mark_synced(scope, last_id)
+    return count
+
+@metrics.timed("login_user")
 def login_user(login, password):
+    import httpx
     try:
-        response = supabase.table("users").select("*").eq("login", login).execute()
+        response = get_client().table("users").select("*").eq("login", login).execute()
         if response.data:
             user = response.data[0]
             if user["password"] == password:
@@ -17,44 +172,326 @@ def login_user(login, password):
         return None
     except httpx.ConnectError:
         raise Exception("Нет подключения к интернету. Проверьте сеть и попробуйте снова.")
+    except httpx.TimeoutException:
+        raise Exception("Сервер не отвечает. Проверьте сеть и попробуйте снова.")
     except Exception as e:
         raise Exception(f"Ошибка при подключении к серверу: {str(e)}")
 
-def save_sleep_data(login, sleep_time, wake_time, wellbeing, comment=""):
-    today = str(date.today())
-    data = {
+@metrics.timed("fetch_user")
+def fetch_user(login):
+    """Return the users row of a login, or None if there is no such user.
+
+    Raises:
+        Exception: If the server can't be reached
+    """
+    rows = get_client().table("users").select("*").eq("login", login).limit(1).execute().data
+    return rows[0] if rows else None
+
+def fetch_logins(strict=False):
+    """Return the logins of all users, sorted.
+
+    Args:
+        strict: Raise when the server can't be reached, instead of
+            printing the error and returning an empty list
+    """
+    try:
+        rows = get_client().table("users").select("login").order("login").execute().data
+    except Exception as e:
+        if strict:
+            raise
+        print(f"Ошибка при получении списка пользователей: {e}", file=sys.stderr)
+        return []
+    return [row["login"] for row in rows]
+
+def _new_log(login, sleep_time, wake_time, wellbeing, comment=""):
+    return {
         "login": login,
-        "date": today,
+        "date": str(date.today()),
         "sleep_time": sleep_time,
         "wake_time": wake_time,
         "wellbeing": wellbeing,
         "comment": comment
     }
+
+class DuplicateEntryError(Exception):
+    """Raised when the user already has a log for the day."""
+
+    def __init__(self):
+        super().__init__(
+            "Запись за сегодняшний день уже существует. "
+            "Вы не можете создать две записи за один день."
+        )
+
+def _upsert_rows(rows):
+    # Relies on the unique (login, date) index: rows for a day that already
+    # has a log are skipped by the server and not returned
+    return get_client().table("sleep_logs").upsert(
+        rows, on_conflict="login,date", ignore_duplicates=True
+    ).execute().data
+
+@metrics.timed("save_sleep_data")
+def save_sleep_data(login, sleep_time, wake_time, wellbeing, comment=""):
+    """Save today's log on the server in a single request.
+
+    Raises:
+        DuplicateEntryError: If the user already has a log for today
+    """
+    data = _new_log(login, sleep_time, wake_time, wellbeing, comment)
     try:
-        supabase.table("sleep_logs").insert(data).execute()
-        return True
+        rows = _upsert_rows(data)
     except Exception as e:
-        print(f"Ошибка при сохранении сна: {e}")
+        print(f"Ошибка при сохранении сна: {e}", file=sys.stderr)
         return False
+    if not rows:
+        raise DuplicateEntryError()
+    if _local_store is not None:
+        _local_store.upsert(rows)
+    query_cache.invalidate(login)
+    return True
+
+def insert_sleep_logs(rows):
+    """Insert a batch of complete logs (e.g. imported history) in one request.
+
+    Logs for a day the user already has are skipped by the server. Unlike
+    save_sleep_data this raises on failure, so the caller can retry.
+
+    Args:
+        rows: sleep_logs rows without ids
+
+    Returns:
+        The rows the server stored, with their ids
+    """
+    stored = _upsert_rows(rows)
+    if _local_store is not None and stored:
+        _local_store.upsert(stored)
+    for login in {row["login"] for row in rows}:
+        query_cache.invalidate(login)
+    return stored
+
+def queue_sleep_data(login, sleep_time, wake_time, wellbeing, comment=""):
+    """Save today's log to the local outbox and return immediately.
 
-def fetch_sleep_logs(login=None, date=None):
-    query = supabase.table("sleep_logs").select("*")
+    The outbox flusher sends it to the server in the background, together
+    with anything else still pending. Without a local store this is the
+    same as save_sleep_data.
+
+    The duplicate check only sees the local mirror. If the server turns
+    out to have a log for the day already, the queued one is moved to the
+    store's rejected logs and the main menu tells the user.
+
+    Raises:
+        DuplicateEntryError: If the user already has a log for today
+    """
+    if _local_store is None:
+        return save_sleep_data(login, sleep_time, wake_time, wellbeing, comment)
+    data = _new_log(login, sleep_time, wake_time, wellbeing, comment)
+    if _local_store.enqueue(data) is None:
+        raise DuplicateEntryError()
+    query_cache.invalidate(login)
+    _outbox_flusher.wake()
+    return True
+
+def _select_columns(columns):
+    if isinstance(columns, str):
+        return columns
+    return ",".join(columns)
+
+def _apply_filters(query, login=None, date=None, date_from=None, date_to=None):
     if login:
         query = query.eq("login", login)
     if date:
-        query = query.eq("date", date)
+        query = query.eq("date", str(date))
+    if date_from:
+        query = query.gte("date", str(date_from))
+    if date_to:
+        query = query.lte("date", str(date_to))
+    return query
+
+@metrics.timed("fetch_sleep_logs")
+def fetch_sleep_logs(login=None, date=None, date_from=None, date_to=None,
+                     columns="*", order=None, desc=False, limit=None, offset=None):
+    """Fetch sleep logs, letting the server do the filtering.
+
+    Args:
+        login: Only return logs of this user
+        date: Only return logs for this exact day
+        date_from: Only return logs on or after this day (inclusive)
+        date_to: Only return logs on or before this day (inclusive)
+        columns: Column name(s) to select, "*" for all
+        order: Column to sort by on the server
+        desc: Sort in descending order
+        limit: Maximum number of rows to return
+        offset: Number of rows to skip (with order, for paging)
+    """
+    key = (login, str(date or ""), str(date_from or ""), str(date_to or ""),
+           _select_columns(columns), order, desc, limit, offset)
+    found, logs = query_cache.get(key)
+    if found:
+        return list(logs)
     try:
-        data = query.execute().data
-        return data
+        logs = _query_logs(login, date, date_from, date_to, columns, order, desc, limit, offset)
     except Exception as e:
-        print(f"Ошибка при получении истории сна: {e}")
+        print(f"Ошибка при получении истории сна: {e}", file=sys.stderr)
         return []
+    query_cache.put(key, logs)
+    return list(logs)
+
+@metrics.timed("fetch_log_array")
+def fetch_log_array(login=None, date=None, date_from=None, date_to=None,
+                    columns=LOG_COLUMNS, order=None, desc=False, limit=None, offset=None,
+                    cache=True):
+    """Fetch sleep logs decoded into a LogArray.
+
+    Takes the arguments of fetch_sleep_logs. The rows are decoded once and
+    the array is cached, so screens opened again reuse it as it is; treat
+    it as read-only. An empty LogArray is returned on error.
 
+    Args:
+        cache: Whether to use the shared query cache; callers keeping
+            their own pages (see paging) pass False so scrolling doesn't
+            evict the entries of other screens
+    """
+    key = (login, str(date or ""), str(date_from or ""), str(date_to or ""),
+           _select_columns(columns), order, desc, limit, offset, LogArray)
+    if cache:
+        found, logs = query_cache.get(key)
+        if found:
+            return logs
+    try:
+        rows = _query_logs(login, date, date_from, date_to, columns, order, desc, limit, offset)
+    except Exception as e:
+        print(f"Ошибка при получении истории сна: {e}", file=sys.stderr)
+        return LogArray()
+    logs = LogArray.from_rows(rows)
+    if cache:
+        query_cache.put(key, logs)
+    return logs
+
+def _query_logs(login, date, date_from, date_to, columns, order, desc, limit, offset):
+    if _local_store is not None:
+        sync_local_store(login)
+        return _local_store.query(login, date, date_from, date_to,
+                                  columns, order, desc, limit, offset)
+    query = get_client().table("sleep_logs").select(_select_columns(columns))
+    query = _apply_filters(query, login, date, date_from, date_to)
+    if order:
+        query = query.order(order, desc=desc)
+    if limit:
+        query = query.limit(limit)
+    if offset:
+        query = query.offset(offset)
+    return query.execute().data
+
+def count_sleep_logs(login=None, date_from=None, date_to=None):
+    """Return the number of sleep logs matching the filters (0 on error)."""
+    try:
+        if _local_store is not None:
+            sync_local_store(login)
+            return _local_store.count(login, date_from, date_to)
+        query = get_client().table("sleep_logs").select("id", count="exact", head=True)
+        query = _apply_filters(query, login, None, date_from, date_to)
+        return query.execute().count or 0
+    except Exception as e:
+        print(f"Ошибка при получении истории сна: {e}", file=sys.stderr)
+        return 0
+
+def iter_sleep_log_pages(login=None, date_from=None, date_to=None,
+                         columns="*", page_size=1000, strict=False):
+    """Yield sleep logs lazily, one page (list of rows) at a time.
+
+    Pages come from the local mirror when one is in use, otherwise from the
+    server. Either way they are read with keyset pagination on ``id``
+    (``id > last_id``), so only one page is held in memory and the
+    PostgREST row cap never truncates the result.
+
+    Args:
+        login: Only return logs of this user
+        date_from: Only return logs on or after this day (inclusive)
+        date_to: Only return logs on or before this day (inclusive)
+        columns: Column name(s) to select, "*" for all
+        page_size: Number of rows requested per round trip
+        strict: Raise when a page can't be fetched from the server (or
+            the mirror can't be synced), instead of printing the error and
+            ending early
+    """
+    if _local_store is not None:
+        sync_local_store(login, strict=strict)
+        yield from _local_store.iter_pages(login, date_from, date_to,
+                                           columns, page_size)
+        return
+    yield from _iter_remote_pages(login, date_from, date_to, columns, page_size,
+                                  strict=strict)
+
+def _iter_remote_pages(login=None, date_from=None, date_to=None, columns="*",
+                       page_size=1000, after_id=None, strict=False):
+    columns = _select_columns(columns)
+    if columns != "*" and "id" not in columns.split(","):
+        columns = "id," + columns
+    last_id = after_id
+    while True:
+        query = get_client().table("sleep_logs").select(columns)
+        query = _apply_filters(query, login, None, date_from, date_to)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        query = query.order("id").limit(page_size)
+        try:
+            page = query.execute().data
+        except Exception as e:
+            if strict:
+                raise
+            print(f"Ошибка при получении истории сна: {e}", file=sys.stderr)
+            return
+        if not page:
+            return
+        yield page
+        last_id = page[-1]["id"]
+
+def iter_sleep_logs(login=None, date_from=None, date_to=None, columns="*",
+                    page_size=1000):
+    """Yield sleep logs lazily, row by row. See iter_sleep_log_pages."""
+    for page in iter_sleep_log_pages(login, date_from, date_to, columns, page_size):
+        yield from page
+
+def fetch_summaries(login=None, date_from=None, date_to=None, strict=False):
+    """Return per-user sleep summaries for a date window.
+
+    With a local mirror the totals come from its daily/weekly rollup
+    tables plus the logs still queued in the outbox, so the cost doesn't
+    grow with the number of logs. Otherwise the logs are streamed from the
+    server through SleepStats.
+
+    Args:
+        login: Only summarize this user
+        date_from: First day of the window (inclusive)
+        date_to: Last day of the window (inclusive)
+        strict: Raise when the logs can't be fetched, instead of printing
+            the error and summarizing what arrived
+
+    Returns:
+        A dict mapping each login to its SleepSummary
+    """
+    stats = SleepStats()
+    if _local_store is None:
+        for page in _iter_remote_pages(login, date_from, date_to,
+                                       "login,sleep_time,wake_time,wellbeing",
+                                       strict=strict):
+            stats.update(page)
+        return stats.summaries()
+    sync_local_store(login, strict=strict)
+    for group, *totals in _local_store.rollup_totals(login, date_from, date_to):
+        stats.merge(group, *totals)
+    stats.update(_local_store.pending_logs(login, date_from, date_to))
+    return stats.summaries()
+
+@metrics.timed("has_today_entry")
 def has_today_entry(login):
     today = date.today().isoformat()
+    if _local_store is not None:
+        sync_local_store(login)
+        return _local_store.has_entry(login, today)
     try:
-        response = supabase.table('sleep_logs').select('id').eq('login', login).eq('date', today).execute()
+        response = get_client().table('sleep_logs').select('id').eq('login', login).eq('date', today).limit(1).execute()
         return len(response.data) > 0
     except Exception as e:
-        print(f"Ошибка при проверке сегодняшней записи: {e}")
-        return False 
\ No newline at end of file
+        print(f"Ошибка при проверке сегодняшней записи: {e}", file=sys.stderr)
+        return False
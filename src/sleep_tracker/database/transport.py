@@ -0,0 +1,68 @@
+"""
+HTTP transport shared by every Supabase request.
+
+By default postgrest builds its own httpx client with library defaults.
+Here one pooled client is created for the whole app and handed to
+supabase-py, so connections (and their TLS sessions) are kept alive and
+reused between queries, HTTP/2 multiplexes concurrent queries over one
+connection, and every request has explicit timeouts instead of hanging on
+a bad mobile network.
+
+httpx is only imported when the client is created, keeping app startup
+cheap.
+"""
+
+from typing import NamedTuple
+
+
+class TransportConfig(NamedTuple):
+    """Settings of the shared HTTP client."""
+
+    http2: bool = True                   # used only if the h2 package is installed
+    max_connections: int = 10
+    max_keepalive_connections: int = 5
+    keepalive_expiry: float = 120.0      # seconds an idle connection is kept
+    connect_timeout: float = 10.0        # TCP + TLS handshake
+    read_timeout: float = 20.0
+    write_timeout: float = 20.0
+    pool_timeout: float = 5.0            # waiting for a free pooled connection
+
+
+DEFAULT_CONFIG = TransportConfig()
+
+
+def http2_available():
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_http_client(config=DEFAULT_CONFIG, **kwargs):
+    """Create the pooled keep-alive httpx client.
+
+    Args:
+        config: A TransportConfig
+        **kwargs: Extra arguments for httpx.Client (e.g. base_url)
+
+    Returns:
+        An httpx.Client
+    """
+    import httpx
+    return httpx.Client(
+        http2=config.http2 and http2_available(),
+        limits=httpx.Limits(
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            keepalive_expiry=config.keepalive_expiry,
+        ),
+        timeout=httpx.Timeout(
+            connect=config.connect_timeout,
+            read=config.read_timeout,
+            write=config.write_timeout,
+            pool=config.pool_timeout,
+        ),
+        follow_redirects=True,
+        **kwargs,
+    )
@@ -0,0 +1,124 @@
+"""
+Streaming export of sleep logs for offline analysis.
+
+Logs are read page by page (see supabase_db.iter_sleep_log_pages) and
+every page is written out before the next one is fetched, so exporting
+years of logs for the whole organisation needs memory for one page only.
+CSV always works; Parquet needs pyarrow, which is optional: every page
+becomes one row group of the file.
+"""
+
+import csv
+import importlib.util
+
+from .database import supabase_db
+
+EXPORT_COLUMNS = ("id", "login", "date", "sleep_time", "wake_time", "wellbeing", "comment")
+
+FORMATS = ("csv", "parquet")
+
+
+def parquet_available():
+    """Whether pyarrow is installed, so Parquet files can be written."""
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def format_for(path):
+    """Pick the export format from a file name (CSV unless it ends in .parquet)."""
+    return "parquet" if str(path).lower().endswith(".parquet") else "csv"
+
+
+def iter_pages(logins=None, date_from=None, date_to=None, page_size=1000):
+    """Yield pages of logs with EXPORT_COLUMNS, user by user.
+
+    Unlike the screens, a page that can't be fetched raises, and so does
+    a failed sync of the local mirror the pages are read from, so an
+    export is never silently cut short.
+
+    Args:
+        logins: Logins to export, or None for every user
+        date_from: First day (inclusive)
+        date_to: Last day (inclusive)
+        page_size: Rows per page
+    """
+    for login in logins or [None]:
+        yield from supabase_db.iter_sleep_log_pages(
+            login, date_from, date_to, EXPORT_COLUMNS, page_size, strict=True,
+        )
+
+
+def write_csv(out, pages):
+    """Write pages of logs to a text stream as CSV.
+
+    Returns:
+        The number of rows written
+    """
+    writer = csv.DictWriter(out, fieldnames=EXPORT_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    count = 0
+    for page in pages:
+        writer.writerows(page)
+        count += len(page)
+    return count
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def write_parquet(path, pages):
+    """Write pages of logs to a Parquet file, one row group per page.
+
+    Raises:
+        ImportError: If pyarrow isn't installed
+
+    Returns:
+        The number of rows written
+    """
+    if not parquet_available():
+        raise ImportError("pyarrow is required for Parquet export")
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ("id", pa.int64()),
+        ("login", pa.string()),
+        ("date", pa.date32()),
+        ("sleep_time", pa.string()),
+        ("wake_time", pa.string()),
+        ("wellbeing", pa.int64()),
+        ("comment", pa.string()),
+    ])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for page in pages:
+            columns = {name: [row.get(name) for row in page] for name in EXPORT_COLUMNS}
+            columns["wellbeing"] = [_int_or_none(value) for value in columns["wellbeing"]]
+            columns["date"] = pa.array(columns["date"], pa.string()).cast(pa.date32())
+            writer.write_table(pa.table(columns, schema=schema))
+            count += len(page)
+    return count
+
+
+def export_logs(path, fmt=None, logins=None, date_from=None, date_to=None,
+                page_size=1000):
+    """Export sleep logs to a file.
+
+    Args:
+        path: File to write
+        fmt: "csv" or "parquet", by default picked from the file name
+        logins: Logins to export, or None for every user
+        date_from: First day (inclusive)
+        date_to: Last day (inclusive)
+        page_size: Rows fetched and written at a time
+
+    Returns:
+        The number of rows written
+    """
+    pages = iter_pages(logins, date_from, date_to, page_size)
+    if (fmt or format_for(path)) == "parquet":
+        return write_parquet(path, pages)
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        return write_csv(out, pages)
@@ -0,0 +1,94 @@
+"""
+Shared cache of the images shown by the screens.
+
+Each image file is read once (optionally ahead of time on a background
+thread during startup) and decoded into a single ``toga.Image`` that every
+screen reuses. Paths are resolved relative to the package, not the current
+working directory.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+ASSETS_DIR = Path(__file__).resolve().parent / "assets"
+
+SLEEP_IMAGE = "sleep_image.png"
+
+
+class ImageCache:
+    def __init__(self, root=ASSETS_DIR, factory=None):
+        """Initialize the cache.
+
+        Args:
+            root: Directory the image names are relative to
+            factory: Callable turning the file contents into an image,
+                toga.Image by default
+        """
+        self.root = Path(root)
+        self.factory = factory
+        self._data = {}
+        self._images = {}
+        self._lock = threading.Lock()
+        self._preloader = None
+
+    def path(self, name):
+        return self.root / name
+
+    def load_bytes(self, name):
+        """Return the contents of an image file, reading it only once.
+
+        Raises:
+            OSError: If the file can't be read
+        """
+        with self._lock:
+            data = self._data.get(name)
+        if data is None:
+            data = self.path(name).read_bytes()
+            with self._lock:
+                data = self._data.setdefault(name, data)
+        return data
+
+    def preload(self, names):
+        """Read image files on a background thread.
+
+        Args:
+            names: Names of the images the first screens show
+
+        Returns:
+            The started thread
+        """
+        def run():
+            for name in names:
+                try:
+                    self.load_bytes(name)
+                except OSError as e:
+                    print(f"Не удалось загрузить изображение {name}: {e}", file=sys.stderr)
+
+        self._preloader = threading.Thread(target=run, name="image-preload", daemon=True)
+        self._preloader.start()
+        return self._preloader
+
+    def get(self, name):
+        """Return the shared decoded image, decoding it on first use.
+
+        Must be called on the UI thread.
+
+        Raises:
+            OSError: If the file can't be read
+        """
+        image = self._images.get(name)
+        if image is None:
+            preloader = self._preloader
+            if preloader is not None and name not in self._data:
+                # Don't read the file twice if the preloader is on it
+                preloader.join()
+            factory = self.factory
+            if factory is None:
+                import toga
+                factory = toga.Image
+            image = self._images[name] = factory(self.load_bytes(name))
+        return image
+
+
+images = ImageCache()
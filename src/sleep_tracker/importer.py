@@ -0,0 +1,190 @@
+"""
+Bulk import of sleep history from CSV or JSON files.
+
+New users bring months of logs from other trackers; saving them one by
+one would cost a request per day. The import instead:
+
+1. streams the file once to learn every user's date range,
+2. reads the dates already stored for each user with one range query,
+3. streams the file again, validating every row and skipping days that
+   are stored or repeated, and inserts the rest in batches of
+   ``batch_size`` rows per request.
+
+Only the per-user sets of known days are kept in memory, never the file.
+CSV and JSON Lines files are streamed; a JSON array file is read whole.
+The columns are those of the export (see export.py); ``id`` is ignored.
+"""
+
+import csv
+import json
+from datetime import date
+from typing import NamedTuple
+
+from .database import supabase_db
+
+BATCH_SIZE = 5000
+
+# Invalid rows reported in detail; the rest are only counted
+MAX_ERRORS = 100
+
+
+class ImportResult(NamedTuple):
+    """Counts of an import, also reported as progress along the way."""
+
+    read: int           # data rows read from the file
+    imported: int       # rows stored on the server
+    duplicates: int     # rows for days that already had a log
+    invalid: int        # rows that failed validation
+    errors: list        # (row number, message) of the first invalid rows
+
+
+def read_rows(path):
+    """Yield the rows of a CSV, JSON Lines (.jsonl) or JSON array file as dicts."""
+    name = str(path).lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif name.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def _time(value):
+    """Normalize an ``HH:MM`` or ``HH:MM:SS`` time to ``HH:MM:00``."""
+    parts = [int(part) for part in value.strip().split(":")]
+    if len(parts) not in (2, 3) or not (0 <= parts[0] < 24 and all(0 <= p < 60 for p in parts[1:])):
+        raise ValueError(value)
+    return f"{parts[0]:02d}:{parts[1]:02d}:00"
+
+
+def validate_row(row, login=None, today=None):
+    """Check an imported row and convert it to a sleep_logs row.
+
+    Args:
+        row: A dict from the file
+        login: Login to use for every row (overrides the file's)
+        today: The current day, later dates are rejected
+
+    Raises:
+        ValueError: With a message saying what's wrong
+
+    Returns:
+        A sleep_logs row without id
+    """
+    login = login or str(row.get("login") or "").strip()
+    if not login:
+        raise ValueError("нет логина")
+    try:
+        day = date.fromisoformat(str(row.get("date", "")).strip())
+    except ValueError:
+        raise ValueError(f"неверная дата: {row.get('date')!r}") from None
+    if day > (today or date.today()):
+        raise ValueError(f"дата в будущем: {day}")
+    times = {}
+    for name in ("sleep_time", "wake_time"):
+        try:
+            times[name] = _time(row[name])
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(f"неверное время {name}: {row.get(name)!r}") from None
+    try:
+        wellbeing = int(row.get("wellbeing"))
+    except (TypeError, ValueError):
+        wellbeing = None
+    if wellbeing is None or not 1 <= wellbeing <= 10:
+        raise ValueError(f"самочувствие должно быть от 1 до 10: {row.get('wellbeing')!r}")
+    return {
+        "login": login,
+        "date": day.isoformat(),
+        "sleep_time": times["sleep_time"],
+        "wake_time": times["wake_time"],
+        "wellbeing": wellbeing,
+        "comment": row.get("comment") or "",
+    }
+
+
+def _date_ranges(path, login=None):
+    """First pass: the earliest and latest date of every user in the file."""
+    ranges = {}
+    for row in read_rows(path):
+        user = login or str(row.get("login") or "").strip()
+        try:
+            day = date.fromisoformat(str(row.get("date", "")).strip())
+        except ValueError:
+            continue
+        first, last = ranges.get(user, (day, day))
+        ranges[user] = (min(first, day), max(last, day))
+    return ranges
+
+
+def stored_days(login, date_from, date_to):
+    """Return the set of days a user already has logs for, within a range."""
+    days = set()
+    for page in supabase_db.iter_sleep_log_pages(
+        login, date_from, date_to, "date", page_size=1000, strict=True,
+    ):
+        days.update(row["date"] for row in page)
+    return days
+
+
+def import_file(path, login=None, batch_size=BATCH_SIZE, progress=None, today=None):
+    """Import the sleep logs of a file.
+
+    Args:
+        path: CSV, JSON Lines or JSON file
+        login: Import every row for this user, ignoring the file's logins
+        batch_size: Rows inserted per request
+        progress: Called with an ImportResult after every batch
+        today: The current day, later dates are rejected
+
+    Raises:
+        Exception: If the server can't be reached; batches already sent
+            stay imported and are skipped as duplicates when run again
+
+    Returns:
+        An ImportResult
+    """
+    known = {
+        user: stored_days(user, first, last)
+        for user, (first, last) in _date_ranges(path, login).items() if user
+    }
+    read = imported = duplicates = invalid = 0
+    errors = []
+    batch = []
+
+    def result():
+        return ImportResult(read, imported, duplicates, invalid, errors)
+
+    for number, row in enumerate(read_rows(path), start=1):
+        read += 1
+        try:
+            log = validate_row(row, login, today)
+        except ValueError as e:
+            invalid += 1
+            if len(errors) < MAX_ERRORS:
+                errors.append((number, str(e)))
+            continue
+        days = known[log["login"]]
+        if log["date"] in days:
+            duplicates += 1
+            continue
+        days.add(log["date"])
+        batch.append(log)
+        if len(batch) >= batch_size:
+            stored = supabase_db.insert_sleep_logs(batch)
+            imported += len(stored)
+            duplicates += len(batch) - len(stored)
+            batch = []
+            if progress:
+                progress(result())
+    if batch:
+        stored = supabase_db.insert_sleep_logs(batch)
+        imported += len(stored)
+        duplicates += len(batch) - len(stored)
+    if progress:
+        progress(result())
+    return result()
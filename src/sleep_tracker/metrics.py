@@ -0,0 +1,171 @@
+"""
+Timing of data-layer calls and screen construction.
+
+Every instrumented call site gets a latency histogram with fixed buckets
+and running totals of calls, errors, rows and payload bytes; the last
+calls are also kept individually in a ring buffer. Recording a call costs
+two clock reads and a few additions, so it stays on in release builds and
+field reports from slow devices come with real numbers: the admin
+diagnostics screen shows them and ``Metrics.dump`` writes them as JSON.
+
+Payload bytes are the bytes received from the server while the call ran.
+They are reported by the HTTP transport (see supabase_db) through
+``add_bytes``, so calls served from the local mirror count 0 bytes.
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from collections.abc import Sequence
+
+# Upper bounds of the latency buckets, in milliseconds
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float("inf"))
+
+
+class Histogram:
+    """Call counts per latency bucket plus totals, for one call site."""
+
+    __slots__ = ("buckets", "calls", "errors", "total_ms", "max_ms", "rows", "bytes")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS_MS)
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.bytes = 0
+
+    def add(self, ms, rows, nbytes, ok):
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+        self.calls += 1
+        self.errors += not ok
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+        self.rows += rows or 0
+        self.bytes += nbytes
+
+    def percentile(self, fraction):
+        """Upper bound (ms) of the bucket holding the given fraction of calls."""
+        target = fraction * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS_MS, self.buckets):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.max_ms)
+        return 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "max_ms": self.max_ms,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "buckets": dict(zip(map(str, BUCKETS_MS), self.buckets)),
+        }
+
+
+class Metrics:
+    def __init__(self, capacity=500):
+        """Initialize the metrics.
+
+        Args:
+            capacity: Number of recent calls kept in the ring buffer
+        """
+        self.histograms = {}
+        self.recent = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, name, seconds, rows=None, nbytes=0, ok=True):
+        """Record one finished call.
+
+        Args:
+            name: Call site, e.g. "fetch_sleep_logs"
+            seconds: How long the call took
+            rows: Number of rows returned, if it returns rows
+            nbytes: Payload bytes received from the server
+            ok: False if the call failed
+        """
+        ms = seconds * 1000
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(ms, rows, nbytes, ok)
+            self.recent.append((time.time(), name, ms, rows, nbytes, ok))
+
+    def add_bytes(self, nbytes):
+        """Count payload bytes toward the calls running in this thread."""
+        for call in getattr(self._local, "calls", ()):
+            call[0] += nbytes
+
+    def measure(self, name, func, /, *args, **kwargs):
+        """Call func(*args, **kwargs) and record its time, rows and bytes.
+
+        Sequences returned (lists, LogArrays) count as rows; exceptions are recorded as errors
+        and re-raised.
+        """
+        calls = getattr(self._local, "calls", None)
+        if calls is None:
+            calls = self._local.calls = []
+        call = [0]
+        calls.append(call)
+        start = time.perf_counter()
+        ok = False
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            seconds = time.perf_counter() - start
+            calls.pop()
+            rows = len(result) if isinstance(result, Sequence) and not isinstance(result, str) else None
+            self.record(name, seconds, rows, call[0], ok)
+
+    def timed(self, name):
+        """Decorator recording every call of a function under name."""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                return self.measure(name, func, *args, **kwargs)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        """Return the histograms and the recent calls as JSON-ready data."""
+        with self._lock:
+            return {
+                "calls": {name: h.as_dict() for name, h in sorted(self.histograms.items())},
+                "recent": [
+                    {"time": at, "name": name, "ms": ms, "rows": rows, "bytes": nbytes, "ok": ok}
+                    for at, name, ms, rows, nbytes, ok in self.recent
+                ],
+            }
+
+    def dump(self, path, **extra):
+        """Write snapshot() to a JSON file.
+
+        Args:
+            path: File to write
+            **extra: More top-level fields, e.g. startup timings
+        """
+        import json
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({**extra, **self.snapshot()}, f, ensure_ascii=False, indent=2)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.recent.clear()
+
+
+# Shared by the data layer and the app
+metrics = Metrics()
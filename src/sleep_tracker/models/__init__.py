@@ -0,0 +1,8 @@
+"""
+Data models of the sleep tracker app.
+"""
+
+from .log_array import LogArray
+from .sleep_log import DEFAULT_WELLBEING, LOG_COLUMNS, MISSING, SleepLog
+
+__all__ = ["DEFAULT_WELLBEING", "LOG_COLUMNS", "LogArray", "MISSING", "SleepLog"]
@@ -0,0 +1,121 @@
+"""
+Columnar, array-backed collection of sleep logs.
+
+A list of row dicts costs several hundred bytes per log (the dict, its
+keys' hash table and a string per time and date). LogArray decodes the
+rows once and keeps every column in a typed ``array.array`` - about 20
+bytes per log - with logins interned in a table and comments stored only
+where there is one. Reports aggregate the columns directly, and NumPy can
+view them without copying (see stats.LogColumns.from_array).
+"""
+
+from array import array
+from collections.abc import Sequence
+
+from .sleep_log import MISSING, SleepLog, parse_day, parse_values
+
+
+class LogArray(Sequence):
+    """Sleep logs stored column by column.
+
+    Indexing returns SleepLog records built on the fly and slicing returns
+    a new LogArray. Arrays handed out by the data layer are shared through
+    its cache and must be treated as read-only.
+
+    Attributes:
+        logins: Distinct logins, indexed by code
+        codes: Login code of every log
+        ids: Server id of every log (0 if not stored on the server yet)
+        days: Date ordinal of every log (0 if unknown)
+        sleep: Bedtime of every log, minutes after midnight
+        wake: Wake-up time of every log, minutes after midnight
+        wellbeing: Wellbeing of every log
+        comments: Comments by log index, for the logs that have one
+    """
+
+    __slots__ = ('logins', 'codes', 'ids', 'days', 'sleep', 'wake', 'wellbeing',
+                 'comments', '_codes_by_login')
+
+    def __init__(self, logs=()):
+        self.logins = []
+        self.codes = array('I')
+        self.ids = array('q')
+        self.days = array('i')
+        self.sleep = array('h')
+        self.wake = array('h')
+        self.wellbeing = array('i')
+        self.comments = {}
+        self._codes_by_login = {}
+        for log in logs:
+            self.append(log)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Decode ``sleep_logs`` rows (dicts from the server or the mirror)."""
+        logs = cls()
+        logs.extend_rows(rows)
+        return logs
+
+    def _code(self, login):
+        code = self._codes_by_login.get(login)
+        if code is None:
+            code = self._codes_by_login[login] = len(self.logins)
+            self.logins.append(login)
+        return code
+
+    def append(self, log):
+        """Add a SleepLog."""
+        if log.comment:
+            self.comments[len(self.codes)] = log.comment
+        self.codes.append(self._code(log.login))
+        self.ids.append(log.id or 0)
+        self.days.append(log.day)
+        self.sleep.append(log.sleep)
+        self.wake.append(log.wake)
+        self.wellbeing.append(log.wellbeing)
+
+    def extend_rows(self, rows):
+        """Decode and add ``sleep_logs`` rows."""
+        code = self._code
+        for row in rows:
+            comment = row.get('comment')
+            if comment:
+                self.comments[len(self.codes)] = comment
+            sleep, wake, wellbeing = parse_values(row)
+            self.codes.append(code(row.get('login')))
+            self.ids.append(row.get('id') or 0)
+            self.days.append(parse_day(row.get('date')))
+            self.sleep.append(sleep)
+            self.wake.append(wake)
+            self.wellbeing.append(wellbeing)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LogArray(self[i] for i in range(*index.indices(len(self))))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return SleepLog(
+            self.logins[self.codes[index]], self.days[index], self.sleep[index],
+            self.wake[index], self.wellbeing[index], self.comments.get(index),
+            self.ids[index] or None,
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def valid_count(self):
+        """Number of logs whose values parsed and count in statistics."""
+        return len(self) - self.sleep.count(MISSING)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays."""
+        return sum(column.itemsize * len(column) for column in (
+            self.codes, self.ids, self.days, self.sleep, self.wake, self.wellbeing,
+        ))
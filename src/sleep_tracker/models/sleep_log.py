@@ -0,0 +1,118 @@
+"""
+Typed record of one night's sleep log.
+"""
+
+from datetime import date
+
+from ..clock import MINUTES_PER_DAY, parse_minutes, sleep_duration
+
+DEFAULT_WELLBEING = 5
+
+# Stored instead of times that are missing or malformed
+MISSING = -1
+
+# Every column a SleepLog can hold
+LOG_COLUMNS = "id,login,date,sleep_time,wake_time,wellbeing,comment"
+
+
+def parse_day(value):
+    """Return the ordinal of an ISO date string, 0 if missing or invalid."""
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        return 0
+
+
+def parse_values(row):
+    """Decode the times and wellbeing of a ``sleep_logs`` row.
+
+    Returns:
+        A (sleep, wake, wellbeing) tuple with times in minutes after
+        midnight, or (MISSING, MISSING, 0) if any value is missing or
+        malformed; such logs are not counted in statistics
+    """
+    try:
+        values = (
+            parse_minutes(row['sleep_time']) % MINUTES_PER_DAY,
+            parse_minutes(row['wake_time']) % MINUTES_PER_DAY,
+            int(row.get('wellbeing', DEFAULT_WELLBEING)),
+        )
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return MISSING, MISSING, 0
+    # LogArray keeps wellbeing in 32 bits
+    if not -2 ** 31 <= values[2] < 2 ** 31:
+        return MISSING, MISSING, 0
+    return values
+
+
+def _format_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00" if minutes != MISSING else None
+
+
+class SleepLog:
+    """One sleep log with its values decoded.
+
+    Attributes:
+        id: Server id, None for logs not stored on the server yet
+        login: The user's login
+        day: Date as a proleptic Gregorian ordinal, 0 if unknown
+        sleep: Bedtime, minutes after midnight (MISSING if invalid)
+        wake: Wake-up time, minutes after midnight (MISSING if invalid)
+        wellbeing: Wellbeing score
+        comment: The user's comment, or None
+    """
+
+    __slots__ = ('id', 'login', 'day', 'sleep', 'wake', 'wellbeing', 'comment')
+
+    def __init__(self, login, day, sleep, wake, wellbeing=DEFAULT_WELLBEING,
+                 comment=None, id=None):
+        self.id = id
+        self.login = login
+        self.day = day
+        self.sleep = sleep
+        self.wake = wake
+        self.wellbeing = wellbeing
+        self.comment = comment
+
+    @classmethod
+    def from_row(cls, row):
+        """Decode a ``sleep_logs`` row (a dict from the server or the mirror)."""
+        sleep, wake, wellbeing = parse_values(row)
+        return cls(
+            row.get('login'), parse_day(row.get('date')), sleep, wake, wellbeing,
+            row.get('comment') or None, row.get('id'),
+        )
+
+    def to_row(self):
+        """Encode the log as a ``sleep_logs`` row, as the server stores it."""
+        return {
+            'id': self.id,
+            'login': self.login,
+            'date': self.date.isoformat() if self.day else None,
+            'sleep_time': _format_time(self.sleep),
+            'wake_time': _format_time(self.wake),
+            'wellbeing': self.wellbeing,
+            'comment': self.comment or '',
+        }
+
+    @property
+    def valid(self):
+        """Whether the log's values parsed and count in statistics."""
+        return self.sleep != MISSING
+
+    @property
+    def date(self):
+        return date.fromordinal(self.day) if self.day else None
+
+    @property
+    def duration(self):
+        """Minutes asleep, wrapping past midnight."""
+        return sleep_duration(self.sleep, self.wake)
+
+    def __eq__(self, other):
+        if not isinstance(other, SleepLog):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"SleepLog({self.login!r}, {self.date}, {self.sleep}, {self.wake}, {self.wellbeing})"
@@ -2,12 +2,15 @@
 Admin screen for managing users and viewing system status.
 """
 
+import sys
 import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
+from datetime import date
 from .base_screen import BaseScreen
-from ..database.supabase_db import fetch_sleep_logs
-from collections import defaultdict
+from ..database import async_db
+from ..export import export_logs, parquet_available
+from ..stats import format_minutes
 
 class AdminScreen(BaseScreen):
     def __init__(self, app):
@@ -22,47 +25,9 @@ class AdminScreen(BaseScreen):
         if self.app.user_role != 'admin':
             self.content.add(toga.Label('Доступ запрещен', style=Pack(font_size=18, color='red', padding=20)))
             return
-        # Получаем все логи сна
-        logs = fetch_sleep_logs()
-        if not logs:
-            self.content.add(toga.Label('Нет данных для отчета', style=Pack(font_size=16, padding=20)))
-            return
-        # Группируем по пользователям
-        user_logs = defaultdict(list)
-        for log in logs:
-            user_logs[log.get('login', '???')].append(log)
-        # Для каждого пользователя считаем средние значения
-        for user, logs in user_logs.items():
-            total_sleep = 0
-            total_wake = 0
-            total_wellbeing = 0
-            count = 0
-            for log in logs:
-                try:
-                    sleep_h, sleep_m, *_ = map(int, log['sleep_time'].split(':'))
-                    wake_h, wake_m, *_ = map(int, log['wake_time'].split(':'))
-                    sleep_minutes = sleep_h * 60 + sleep_m
-                    wake_minutes = wake_h * 60 + wake_m
-                    total_sleep += sleep_minutes
-                    total_wake += wake_minutes
-                    total_wellbeing += int(log.get('wellbeing', 5))
-                    count += 1
-                except Exception:
-                    continue
-            if count == 0:
-                continue
-            avg_sleep = total_sleep // count
-            avg_wake = total_wake // count
-            avg_wellbeing = total_wellbeing / count
-            avg_sleep_str = f"{avg_sleep // 60:02d}:{avg_sleep % 60:02d}"
-            avg_wake_str = f"{avg_wake // 60:02d}:{avg_wake % 60:02d}"
-            self.content.add(toga.Label(
-                f"Пользователь: {user}\n"
-                f"Среднее время сна: {avg_sleep_str}\n"
-                f"Среднее время пробуждения: {avg_wake_str}\n"
-                f"Среднее самочувствие: {avg_wellbeing:.1f}\n",
-                style=Pack(font_size=15, padding=10)
-            ))
+        # Отчет перестраивается в reload(), остальные виджеты создаются один раз
+        self.report_box = toga.Box(style=Pack(direction=COLUMN))
+        self.content.add(self.report_box)
         
         # Create a container for the main content
         main_content = toga.Box(style=Pack(direction=COLUMN, padding=20))
@@ -75,6 +40,31 @@ class AdminScreen(BaseScreen):
         )
         main_content.add(back_button)
         
+        # Замеры скорости работы приложения
+        diagnostics_button = toga.Button(
+            'Диагностика',
+            on_press=self.show_diagnostics,
+            style=Pack(padding=5, width=200)
+        )
+        main_content.add(diagnostics_button)
+        
+        # Выгрузка записей для анализа: пустые поля означают всех
+        # пользователей и все даты
+        export_filters = toga.Box(style=Pack(direction=ROW, padding=5))
+        self.export_login = toga.TextInput(placeholder='Логин', style=Pack(width=120, padding_right=5))
+        self.export_from = toga.TextInput(placeholder='С ГГГГ-ММ-ДД', style=Pack(width=120, padding_right=5))
+        self.export_to = toga.TextInput(placeholder='По ГГГГ-ММ-ДД', style=Pack(width=120))
+        export_filters.add(self.export_login)
+        export_filters.add(self.export_from)
+        export_filters.add(self.export_to)
+        main_content.add(export_filters)
+        
+        export_buttons = toga.Box(style=Pack(direction=ROW))
+        export_buttons.add(toga.Button('Экспорт в CSV', on_press=self.export_csv, style=Pack(padding=5)))
+        if parquet_available():
+            export_buttons.add(toga.Button('Экспорт в Parquet', on_press=self.export_parquet, style=Pack(padding=5)))
+        main_content.add(export_buttons)
+        
         # Add a label for the admin message
         admin_label = toga.Label(
             'Здесь будет список работников и их состояние.',
@@ -84,6 +74,79 @@ class AdminScreen(BaseScreen):
         
         # Add the main content to the screen
         self.content.add(main_content)
+        self.update_report()
+    
+    def reload(self):
+        self.update_report()
+    
+    def update_report(self):
+        """Rebuild the per-user report once the latest data arrives."""
+        if self.app.user_role != 'admin':
+            return
+        self.report_box.clear()
+        self.report_box.add(toga.Label('Загрузка...', style=Pack(font_size=16, padding=20)))
+        self.app.loop.create_task(self.show_report())
+    
+    async def show_report(self):
+        # Суммы по пользователям берутся из предварительно агрегированных таблиц
+        # (обычно уже загружены в фоне)
+        task = self.app.prefetcher.get('summaries')
+        try:
+            summaries = await (task or async_db.fetch_summaries())
+        except Exception as e:
+            print(f"Ошибка при загрузке отчета: {e}", file=sys.stderr)
+            summaries = None
+        self.report_box.clear()
+        if summaries is None:
+            self.report_box.add(toga.Label('Не удалось загрузить отчет', style=Pack(font_size=16, padding=20)))
+            return
+        if not summaries:
+            self.report_box.add(toga.Label('Нет данных для отчета', style=Pack(font_size=16, padding=20)))
+            return
+        # Для каждого пользователя выводим средние значения
+        for user, summary in summaries.items():
+            self.report_box.add(toga.Label(
+                f"Пользователь: {user}\n"
+                f"Среднее время сна: {format_minutes(summary.avg_sleep)}\n"
+                f"Среднее время пробуждения: {format_minutes(summary.avg_wake)}\n"
+                f"Среднее самочувствие: {summary.avg_wellbeing:.1f}\n",
+                style=Pack(font_size=15, padding=10)
+            ))
+    
+    async def export_csv(self, widget):
+        await self.export_logs('csv')
+    
+    async def export_parquet(self, widget):
+        await self.export_logs('parquet')
+    
+    async def export_logs(self, fmt):
+        """Export the logs matching the filters to a file in the app data folder.
+        
+        Args:
+            fmt: "csv" or "parquet"
+        """
+        try:
+            date_from = date.fromisoformat(self.export_from.value.strip()) if self.export_from.value.strip() else None
+            date_to = date.fromisoformat(self.export_to.value.strip()) if self.export_to.value.strip() else None
+        except ValueError:
+            await self.app.main_window.error_dialog('Ошибка', 'Введите даты в формате ГГГГ-ММ-ДД')
+            return
+        login = self.export_login.value.strip()
+        path = self.app.paths.data / f"sleep_logs-{date.today().isoformat()}.{fmt}"
+        # Записи выгружаются постранично в фоновом потоке
+        try:
+            count = await async_db.run(
+                export_logs, path, fmt, [login] if login else None, date_from, date_to
+            )
+        except Exception as e:
+            print(f"Ошибка при экспорте: {e}", file=sys.stderr)
+            await self.app.main_window.error_dialog('Ошибка', 'Не удалось выгрузить записи')
+            return
+        await self.app.main_window.info_dialog('Экспорт', f"Выгружено записей: {count}\nФайл: {path}")
+    
+    def show_diagnostics(self, widget):
+        """Show the performance diagnostics screen."""
+        self.app.show_diagnostics_screen()
     
     def go_back(self, widget):
         """Go back to the main menu."""
@@ -7,6 +7,10 @@ from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
 
 class BaseScreen(toga.Box):
+    # Whether the screen shows the logged in user's data and must be
+    # rebuilt for the next user
+    per_user = True
+
     def __init__(self, app):
         """Initialize the base screen.
         
@@ -28,6 +32,13 @@ class BaseScreen(toga.Box):
         self.footer = toga.Box(style=Pack(direction=ROW, padding_top=20))
         self.add(self.footer)
     
+    def reload(self):
+        """Reload the screen's data when a cached screen is shown again.
+        
+        Not named refresh(): toga.Widget.refresh() recomputes the layout
+        and is called by Toga itself on every style change.
+        """
+    
     def add_header_button(self, text, on_press=None):
         """Add a button to the header.
         
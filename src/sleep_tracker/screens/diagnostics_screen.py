@@ -0,0 +1,148 @@
+"""
+Diagnostics screen with the timings of data-layer calls and screens.
+"""
+
+import sys
+import toga
+from toga.style import Pack
+from toga.style.pack import COLUMN, ROW
+from .base_screen import BaseScreen
+from ..database import async_db
+from ..database.supabase_db import get_local_store
+from ..metrics import metrics
+
+def format_bytes(nbytes):
+    """Format a byte count as B/KB/MB."""
+    if nbytes < 1024:
+        return f"{nbytes} Б"
+    if nbytes < 1024 * 1024:
+        return f"{nbytes / 1024:.1f} КБ"
+    return f"{nbytes / 1024 / 1024:.1f} МБ"
+
+# Call sites under which the app records its startup phases
+STARTUP_PREFIX = 'startup:'
+
+def format_startup(snapshot):
+    """Format the startup phases of a metrics snapshot as one line.
+
+    Args:
+        snapshot: The result of Metrics.snapshot()
+    """
+    phases = [
+        f"{name[len(STARTUP_PREFIX):]} {call['max_ms']:.0f} мс"
+        for name, call in snapshot['calls'].items()
+        if name.startswith(STARTUP_PREFIX)
+    ]
+    return "Запуск: " + (", ".join(phases) or "нет данных")
+
+def format_calls(snapshot):
+    """Format the per-call-site totals of a metrics snapshot as text.
+
+    Args:
+        snapshot: The result of Metrics.snapshot()
+    """
+    lines = []
+    for name, call in snapshot['calls'].items():
+        if name.startswith(STARTUP_PREFIX):
+            continue
+        line = (
+            f"{name}: {call['calls']} выз., среднее {call['avg_ms']:.1f} мс, "
+            f"p95 {call['p95_ms']:.0f} мс, макс. {call['max_ms']:.0f} мс"
+        )
+        if call['errors']:
+            line += f", ошибок {call['errors']}"
+        if call['rows']:
+            line += f", строк {call['rows']}"
+        if call['bytes']:
+            line += f", {format_bytes(call['bytes'])}"
+        lines.append(line)
+    return '\n'.join(lines) or 'Замеров пока нет'
+
+def format_rejected(rows):
+    """Format the logs the server refused as text ('' if there are none).
+
+    Args:
+        rows: The result of LocalStore.rejected()
+    """
+    if not rows:
+        return ''
+    lines = [f"Не приняты сервером ({len(rows)}):"]
+    for row in rows:
+        lines.append(f"{row['login']}, {row['date']}: {row['error']}")
+    return '\n'.join(lines)
+
+def rejected_logs():
+    """Return the logs the server refused, empty without a local store."""
+    store = get_local_store()
+    return store.rejected() if store is not None else []
+
+def dump_metrics(path):
+    """Write the metrics and the rejected logs to a JSON file."""
+    metrics.dump(path, rejected=rejected_logs())
+
+class DiagnosticsScreen(BaseScreen):
+    def __init__(self, app):
+        """Initialize the diagnostics screen.
+        
+        Args:
+            app: The main application instance
+        """
+        super().__init__(app)
+        
+        # Проверка прав
+        if self.app.user_role != 'admin':
+            self.content.add(toga.Label('Доступ запрещен', style=Pack(font_size=18, color='red', padding=20)))
+            return
+        
+        buttons = toga.Box(style=Pack(direction=ROW, padding_bottom=10))
+        buttons.add(toga.Button('Назад', on_press=self.go_back, style=Pack(padding=5)))
+        buttons.add(toga.Button('Обновить', on_press=self.update_view, style=Pack(padding=5)))
+        buttons.add(toga.Button('Сохранить JSON', on_press=self.save_json, style=Pack(padding=5)))
+        buttons.add(toga.Button('Сбросить', on_press=self.reset, style=Pack(padding=5)))
+        self.content.add(buttons)
+        
+        # Время запуска и замеры по каждому вызову
+        self.startup_label = toga.Label('', style=Pack(font_size=13, padding=5))
+        self.content.add(self.startup_label)
+        # Записи, которые сервер отказался принять
+        self.rejected_label = toga.Label('', style=Pack(font_size=13, padding=5, color='red'))
+        self.content.add(self.rejected_label)
+        self.calls_label = toga.Label('', style=Pack(font_size=13, padding=5))
+        self.content.add(toga.ScrollContainer(content=self.calls_label, style=Pack(flex=1)))
+        self.update_view()
+    
+    def reload(self):
+        self.update_view()
+    
+    def update_view(self, widget=None):
+        """Show the current metrics."""
+        if self.app.user_role != 'admin':
+            return
+        snapshot = metrics.snapshot()
+        self.startup_label.text = format_startup(snapshot)
+        self.calls_label.text = format_calls(snapshot)
+        self.app.loop.create_task(self.show_rejected())
+    
+    async def show_rejected(self):
+        # Отклоненные записи читаются из локальной базы в фоновом потоке
+        self.rejected_label.text = format_rejected(await async_db.run(rejected_logs))
+    
+    async def save_json(self, widget):
+        """Write the metrics to a JSON file to attach to a bug report."""
+        path = self.app.paths.data / 'metrics.json'
+        try:
+            await async_db.run(dump_metrics, path)
+        except OSError as e:
+            print(f"Ошибка при сохранении замеров: {e}", file=sys.stderr)
+            await self.app.main_window.error_dialog('Ошибка', 'Не удалось сохранить замеры')
+            return
+        await self.app.main_window.info_dialog('Диагностика', f"Замеры сохранены в {path}")
+    
+    def reset(self, widget):
+        """Forget all measurements."""
+        metrics.reset()
+        self.update_view()
+    
+    def go_back(self, widget):
+        """Go back to the admin screen."""
+        self.app.show_admin_screen()
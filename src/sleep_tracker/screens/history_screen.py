@@ -2,12 +2,27 @@
 History screen for viewing sleep data history.
 """
 
+import sys
 import toga
 from toga.style import Pack
-from toga.style.pack import COLUMN, ROW
+from toga.style.pack import COLUMN, NONE, PACK, ROW
 from .base_screen import BaseScreen
-from datetime import datetime
-from ..database.supabase_db import fetch_sleep_logs
+from ..database import async_db
+from ..database.paging import user_history, visible_range
+from ..models import LogArray
+from ..stats import format_minutes, summarize
+
+# Every row of the list has the same height, so the visible rows can be
+# computed from the scroll position alone
+ROW_HEIGHT = 40
+# Generous estimate of the list's visible height, in pixels
+VIEWPORT_HEIGHT = 1200
+# Rows rendered above and below the visible ones
+OVERSCAN = 5
+# Row widgets created once and reused while scrolling
+POOL_SIZE = VIEWPORT_HEIGHT // ROW_HEIGHT + 1 + 2 * OVERSCAN
+# Marks rows whose page is still loading
+PENDING = object()
 
 class HistoryScreen(BaseScreen):
     def __init__(self, app):
@@ -17,6 +32,8 @@ class HistoryScreen(BaseScreen):
             app: The main application instance
         """
         super().__init__(app)
+        self.logs = None
+        self._start = None
         
         # Основной контейнер с flex=1
         main_content = toga.Box(style=Pack(direction=COLUMN, padding=10, flex=1))
@@ -33,19 +50,43 @@ class HistoryScreen(BaseScreen):
         self.stats_label = toga.Label('', style=Pack(padding=10, font_size=15))
         main_content.add(self.stats_label)
         
+        # Список всех записей. Отрисовываются только видимые строки: над и под
+        # ними пустые блоки высотой с пропущенные строки, а сами строки
+        # переиспользуются при прокрутке
+        self.top_spacer = toga.Box(style=Pack(height=0))
+        self.bottom_spacer = toga.Box(style=Pack(height=0))
+        self.row_labels = [
+            toga.Label('', style=Pack(height=ROW_HEIGHT, padding_left=10, font_size=14))
+            for _ in range(POOL_SIZE)
+        ]
+        rows = toga.Box(children=self.row_labels, style=Pack(direction=COLUMN))
+        self.list_box = toga.Box(
+            children=[self.top_spacer, rows, self.bottom_spacer],
+            style=Pack(direction=COLUMN),
+        )
+        self.scroll = toga.ScrollContainer(
+            content=self.list_box,
+            horizontal=False,
+            on_scroll=self.on_scroll,
+            style=Pack(flex=1),
+        )
+        main_content.add(self.scroll)
+        
         self.content.add(main_content)
         self.update_history()
     
-    def format_date(self, date_str):
-        """Format a date string into a more readable format.
+    def reload(self):
+        self.update_history()
+    
+    def format_date(self, date_obj):
+        """Format a date into a more readable format.
         
         Args:
-            date_str: The date string to format
-            
+            date_obj: The date to format
+        
         Returns:
             The formatted date string
         """
-        date_obj = datetime.strptime(date_str, '%Y-%m-%d')
         months = {
             1: 'января', 2: 'февраля', 3: 'марта', 4: 'апреля',
             5: 'мая', 6: 'июня', 7: 'июля', 8: 'августа',
@@ -53,57 +94,104 @@ class HistoryScreen(BaseScreen):
         }
         return f"{date_obj.day} {months[date_obj.month]} {date_obj.year}г"
     
+    def format_row(self, log):
+        """Format a SleepLog as the text of a list row."""
+        day = self.format_date(log.date) if log.date else '?'
+        if not log.valid:
+            return f"{day}: нет данных"
+        return (
+            f"{day}: {format_minutes(log.sleep)} → {format_minutes(log.wake)}, "
+            f"самочувствие {log.wellbeing}"
+        )
+    
     def update_history(self):
-        """Update the history table with the latest data."""
+        """Update the statistics and the list once the latest data arrives."""
         if not self.app.current_user:
             return
+        self.stats_label.text = 'Загрузка...'
+        self.app.loop.create_task(self.load_history())
+    
+    async def load_history(self):
+        # Записи подгружаются страницами по мере прокрутки, новые сверху.
+        # Число записей и страницы запрашиваются в фоновом потоке
+        logs = await async_db.run(user_history, self.app.current_user)
+        self.logs = logs
+        self._start = None
+        self.scroll.vertical_position = 0
+        self.render_rows(0)
         
-        # Получаем данные из Supabase
-        logs = fetch_sleep_logs(login=self.app.current_user)
-        if not logs:
-            self.stats_label.text = 'Данных нет'
-            self.app.main_window.info_dialog('История', 'Данных нет', on_result=lambda _: self.app.show_main_menu())
+        # Средние по последним 10 записям обычно уже загружены в фоне
+        overview = self.app.prefetcher.result('overview')
+        if overview is not None:
+            recent = overview.recent
+        else:
+            if len(logs):
+                await logs.load_page(0)
+            window = [logs.cached(i) for i in range(min(len(logs), 10))]
+            recent = LogArray(log for log in window if log is not None)
+        if logs is not self.logs:
             return
-        # Оставляем только последние 10 дней
-        logs = sorted(logs, key=lambda x: x['date'], reverse=True)[:10]
-        if not logs:
+        summary = summarize(recent)
+        if summary is None:
             self.stats_label.text = 'Данных нет'
-            self.app.main_window.info_dialog('История', 'Данных нет', on_result=lambda _: self.app.show_main_menu())
+        else:
+            self.stats_label.text = (
+                f"Статистика за последние 10 дней:\n"
+                f"Среднее время сна: {format_minutes(summary.avg_sleep)}\n"
+                f"Среднее время пробуждения: {format_minutes(summary.avg_wake)}\n"
+                f"Среднее самочувствие: {summary.avg_wellbeing:.1f}\n"
+                f"Всего записей: {len(logs)}"
+            )
+    
+    def on_scroll(self, widget, **kwargs):
+        if self.logs is not None:
+            self.render_rows(self.scroll.vertical_position)
+    
+    def render_rows(self, position):
+        """Show the rows around a scroll position in the pooled widgets.
+        
+        Rows whose page isn't loaded yet show a placeholder; their pages
+        are loaded in the background and the rows filled in on arrival.
+        
+        Args:
+            position: Scroll offset from the top, in pixels
+        """
+        size = len(self.logs)
+        start, _ = visible_range(position, VIEWPORT_HEIGHT, ROW_HEIGHT, size, OVERSCAN)
+        # Window of exactly POOL_SIZE rows, so the list height never changes
+        start = max(min(start, size - POOL_SIZE), 0)
+        if start == self._start:
             return
-        # Считаем средние значения
-        total_sleep = 0
-        total_wake = 0
-        total_wellbeing = 0
-        count = 0
-        for log in logs:
-            try:
-                sleep_h, sleep_m, *_ = map(int, log['sleep_time'].split(':'))
-                wake_h, wake_m, *_ = map(int, log['wake_time'].split(':'))
-                sleep_minutes = sleep_h * 60 + sleep_m
-                wake_minutes = wake_h * 60 + wake_m
-                total_sleep += sleep_minutes
-                total_wake += wake_minutes
-                total_wellbeing += int(log.get('wellbeing', 5))
-                count += 1
-            except Exception:
-                continue
-        if count == 0:
-            self.stats_label.text = 'Данных нет'
-            self.app.main_window.info_dialog('История', 'Данных нет', on_result=lambda _: self.app.show_main_menu())
+        self._start = start
+        for i, label in enumerate(self.row_labels):
+            index = start + i
+            log = self.logs.cached(index, PENDING) if index < size else None
+            if log is None:
+                label.style.display = NONE
+            elif log is PENDING:
+                label.text = 'Загрузка...'
+                label.style.display = PACK
+            else:
+                label.text = self.format_row(log)
+                label.style.display = PACK
+        self.top_spacer.style.height = start * ROW_HEIGHT
+        self.bottom_spacer.style.height = max(size - start - POOL_SIZE, 0) * ROW_HEIGHT
+        missing = self.logs.missing_pages(start, start + POOL_SIZE)
+        if missing:
+            self.app.loop.create_task(self.load_pages(self.logs, missing))
+    
+    async def load_pages(self, logs, numbers):
+        """Load pages in the background, then redraw the rows if still shown."""
+        try:
+            for number in numbers:
+                await logs.load_page(number)
+        except Exception as e:
+            print(f"Ошибка при получении истории сна: {e}", file=sys.stderr)
             return
-        avg_sleep = total_sleep // count
-        avg_wake = total_wake // count
-        avg_wellbeing = total_wellbeing / count
-        avg_sleep_str = f"{avg_sleep // 60:02d}:{avg_sleep % 60:02d}"
-        avg_wake_str = f"{avg_wake // 60:02d}:{avg_wake % 60:02d}"
-        text = (
-            f"Статистика за последние 10 дней:\n"
-            f"Среднее время сна: {avg_sleep_str}\n"
-            f"Среднее время пробуждения: {avg_wake_str}\n"
-            f"Среднее самочувствие: {avg_wellbeing:.1f}"
-        )
-        self.app.main_window.info_dialog('История', text, on_result=lambda _: self.app.show_main_menu())
+        if logs is self.logs:
+            self._start = None
+            self.render_rows(self.scroll.vertical_position)
     
     def go_back(self, widget):
         """Go back to the main menu."""
-        self.app.show_main_menu() 
\ No newline at end of file
+        self.app.show_main_menu()
@@ -6,8 +6,8 @@ import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
 from .base_screen import BaseScreen
-from ..database.supabase_db import save_sleep_data, fetch_sleep_logs
-from datetime import datetime, date
+from ..database import async_db
+from ..database.supabase_db import DuplicateEntryError, queue_sleep_data
 import asyncio
 
 class InputScreen(BaseScreen):
@@ -93,30 +93,35 @@ class InputScreen(BaseScreen):
     async def save_data(self, widget):
         """Save sleep data to database."""
         try:
-            # Проверяем, есть ли уже запись за сегодня
-            logs = await asyncio.to_thread(fetch_sleep_logs, login=self.app.current_user)
-            today_str = date.today().isoformat()
-            if any(log.get('date') == today_str for log in logs):
-                await self.app.main_window.info_dialog(
-                    'Внимание',
-                    'Запись за сегодняшний день уже существует. Вы не можете создать две записи за один день.'
-                )
-                return
-
             # Получаем значения из полей ввода
             sleep_time = f"{self.sleep_hour.value}:{self.sleep_minute.value}:00"
             wake_time = f"{self.wake_hour.value}:{self.wake_minute.value}:00"
             wellbeing = self.wellbeing_selection.value
 
-            # Сохраняем в базу данных
-            await asyncio.to_thread(
-                save_sleep_data,
-                self.app.current_user,
-                sleep_time,
-                wake_time,
-                wellbeing,
-                ''  # пустые заметки
-            )
+            # Сохраняем локально, на сервер запись уйдет в фоне.
+            # Вторая запись за день отклоняется при сохранении, без
+            # отдельного запроса истории. Без локальной базы запрос идет на
+            # сервер, поэтому вызов выполняется в фоновом потоке
+            try:
+                saved = await async_db.run(
+                    queue_sleep_data,
+                    self.app.current_user,
+                    sleep_time,
+                    wake_time,
+                    wellbeing,
+                    ''  # пустые заметки
+                )
+            except DuplicateEntryError as e:
+                await self.app.main_window.info_dialog('Внимание', str(e))
+                return
+            if not saved:
+                await self.app.main_window.error_dialog(
+                    'Ошибка',
+                    'Не удалось сохранить данные. Попробуйте снова.'
+                )
+                return
+            # Отчеты изменились — заново загружаем их данные в фоне
+            self.app.prefetcher.start(self.app.current_user, self.app.user_role)
 
             # Показываем сообщение об успехе
             await self.app.main_window.info_dialog(
@@ -125,11 +130,7 @@ class InputScreen(BaseScreen):
             )
 
             # Очищаем поля ввода
-            self.sleep_hour.value = '00'
-            self.sleep_minute.value = '00'
-            self.wake_hour.value = '00'
-            self.wake_minute.value = '00'
-            self.wellbeing_selection.value = '5'
+            self.reset_form()
 
         except Exception as e:
             await self.app.main_window.error_dialog(
@@ -137,6 +138,17 @@ class InputScreen(BaseScreen):
                 f'Не удалось сохранить данные: {str(e)}'
             )
     
+    def reload(self):
+        self.reset_form()
+    
+    def reset_form(self):
+        """Reset the inputs to their initial values."""
+        self.sleep_hour.value = '00'
+        self.sleep_minute.value = '00'
+        self.wake_hour.value = '00'
+        self.wake_minute.value = '00'
+        self.wellbeing_selection.value = '5'
+    
     def go_back(self, widget):
         """Go back to the main menu."""
         self.app.show_main_menu() 
\ No newline at end of file
@@ -4,12 +4,18 @@ Login screen for the application.
 
 import toga
 import asyncio
+import sys
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
 from .base_screen import BaseScreen
+from ..database import async_db
+from ..database.session import save_session
 from ..database.supabase_db import login_user
+from ..images import SLEEP_IMAGE, images
 
 class LoginScreen(BaseScreen):
+    per_user = False
+
     def __init__(self, app):
         """Initialize the login screen.
         
@@ -17,6 +23,7 @@ class LoginScreen(BaseScreen):
             app: The main application instance
         """
         super().__init__(app)
+        self._login_task = None
         
         # Create a container for the login form
         form = toga.Box(style=Pack(direction=COLUMN, padding=20, width=350))
@@ -36,7 +43,7 @@ class LoginScreen(BaseScreen):
         # Create the login button
         self.login_button = toga.Button(
             'Войти',
-            on_press=lambda w: asyncio.create_task(self.login(w)),
+            on_press=self.on_login_press,
             style=Pack(padding=5, width=300)
         )
         
@@ -48,10 +55,10 @@ class LoginScreen(BaseScreen):
         # Картинка и приветствие
         image_box = toga.Box(style=Pack(direction=COLUMN, padding_bottom=10))
         try:
-            image = toga.ImageView(toga.Image("assets/sleep_image.png"), style=Pack(width=240, height=240, padding_bottom=10))
+            image = toga.ImageView(images.get(SLEEP_IMAGE), style=Pack(width=240, height=240, padding_bottom=10))
             image_box.add(image)
         except Exception:
-            image_box.add(toga.Label("[Нет картинки: assets/sleep_image.png]", style=Pack(color='red', font_size=12, padding_bottom=10)))
+            image_box.add(toga.Label(f"[Нет картинки: {images.path(SLEEP_IMAGE)}]", style=Pack(color='red', font_size=12, padding_bottom=10)))
         image_box.add(toga.Label('Добро пожаловать!', style=Pack(font_size=20, padding_bottom=5)))
         image_box.add(toga.Label('Войдите в приложение.', style=Pack(font_size=14, padding_bottom=15)))
         self.content.add(image_box)
@@ -59,42 +66,67 @@ class LoginScreen(BaseScreen):
         # Add the form to the content
         self.content.add(form)
     
+    def reload(self):
+        """Clear the password left from the previous login."""
+        self.password_input.value = ''
+    
     def show_loading(self, show=True):
         """Show or hide the loading state.
         
+        While loading, the login button cancels the attempt.
+        
         Args:
             show: Whether to show the loading state
         """
-        self.login_button.enabled = not show
-        self.login_button.text = 'Загрузка...' if show else 'Войти'
+        self.login_input.enabled = not show
+        self.password_input.enabled = not show
+        self.login_button.text = 'Загрузка... (отменить)' if show else 'Войти'
     
-    def login(self, widget):
+    def on_login_press(self, widget):
+        """Start logging in, or cancel the login that is in progress."""
+        if self._login_task is not None and not self._login_task.done():
+            self._login_task.cancel()
+            return
+        self._login_task = asyncio.create_task(self.login(widget))
+    
+    async def login(self, widget):
         print("НАЖАТИЕ НА ВОЙТИ")
         username = self.login_input.value
         password = self.password_input.value
 
         if not username or not password:
-            self.app.main_window.error_dialog(
+            await self.app.main_window.error_dialog(
                 'Ошибка',
                 'Пожалуйста, введите имя пользователя и пароль'
             )
             return
 
+        # Запрос к серверу выполняется в пуле потоков данных, интерфейс не блокируется
+        self.show_loading(True)
         try:
-            user = login_user(username, password)
-            if user:
-                print("УСПЕШНЫЙ ВХОД")
-                self.app.current_user = username
-                self.app.user_role = user.get('role', 'user')
-                self.app.show_main_menu()
-            else:
-                self.app.main_window.error_dialog(
-                    'Ошибка',
-                    'Неверное имя пользователя или пароль'
-                )
+            user = await async_db.run(login_user, username, password)
+        except asyncio.CancelledError:
+            return
         except Exception as e:
-            print("ОШИБКА:", e)
-            self.app.main_window.error_dialog(
+            print("ОШИБКА:", e, file=sys.stderr)
+            await self.app.main_window.error_dialog(
                 'Ошибка',
                 f'Не удалось войти: {str(e)}'
-            ) 
\ No newline at end of file
+            )
+            return
+        finally:
+            self.show_loading(False)
+
+        if user:
+            print("УСПЕШНЫЙ ВХОД")
+            self.app.current_user = username
+            self.app.user_role = user.get('role', 'user')
+            # Запоминаем сессию, чтобы при следующем запуске не входить заново
+            save_session(self.app.session_path, user)
+            self.app.prefetcher.start(username, self.app.user_role)
+            self.app.show_main_menu()
+        else:
+            await self.app.main_window.error_dialog(
+                'Ошибка',
+                'Неверное имя пользователя или пароль'
+            )
@@ -6,8 +6,11 @@ import toga
 from toga.style import Pack
 from toga.style.pack import COLUMN, ROW
 from .base_screen import BaseScreen
+from ..database import async_db
+from ..database.supabase_db import get_local_store
+from ..images import SLEEP_IMAGE, images
+from ..stats import format_minutes, summarize
 import random
-import asyncio
 
 # TODO: Move to a separate file
 MOTIVATIONAL_PHRASES = [
@@ -18,6 +21,22 @@ MOTIVATIONAL_PHRASES = [
     "Здоровый сон - здоровый дух!",
 ]
 
+def format_user_summaries(summaries):
+    """Format per-user averages as dialog text.
+
+    Args:
+        summaries: A dict mapping each login to its SleepSummary
+    """
+    text = ''
+    for user, summary in summaries.items():
+        text += (
+            f"Пользователь: {user}\n"
+            f"Среднее время сна: {format_minutes(summary.avg_sleep)}\n"
+            f"Среднее время пробуждения: {format_minutes(summary.avg_wake)}\n"
+            f"Среднее самочувствие: {summary.avg_wellbeing:.1f}\n\n"
+        )
+    return text
+
 class MainMenuScreen(BaseScreen):
     def __init__(self, app):
         """Initialize the main menu screen.
@@ -32,7 +51,7 @@ class MainMenuScreen(BaseScreen):
         # Картинка по центру
         image_box = toga.Box(style=Pack(direction=COLUMN, alignment="center"))
         try:
-            image = toga.ImageView(toga.Image("assets/sleep_image.png"), style=Pack(width=240, height=240, padding_bottom=20))
+            image = toga.ImageView(images.get(SLEEP_IMAGE), style=Pack(width=240, height=240, padding_bottom=20))
             image_box.add(image)
         except Exception as e:
             image_box.add(toga.Label("[Нет картинки!]", style=Pack(color='red', font_size=12, padding_bottom=10)))
@@ -52,6 +71,13 @@ class MainMenuScreen(BaseScreen):
         )
         main_content.add(self.motivational_label)
         
+        # Напоминание о сегодняшней записи, заполняется после загрузки данных
+        self.today_label = toga.Label(
+            '',
+            style=Pack(font_size=14, padding_bottom=10)
+        )
+        main_content.add(self.today_label)
+        
         #Кнопки на всю ширину
         self.input_button = toga.Button(
             'Ввести данные',
@@ -67,13 +93,30 @@ class MainMenuScreen(BaseScreen):
         )
         main_content.add(self.weekly_button)
         
+        self.history_button = toga.Button(
+            'История',
+            on_press=self.go_to_history,
+            style=Pack(padding=10)
+        )
+        main_content.add(self.history_button)
+        
         self.tips_button = toga.Button(
             'Советы',
-            on_press=lambda w: asyncio.create_task(self.show_tips(w)),
+            on_press=self.show_tips,
             style=Pack(padding=10)
         )
         main_content.add(self.tips_button)
         
+        # Экран администратора (отчеты, экспорт, диагностика) виден только
+        # администраторам, кнопка появляется в update_ui
+        self.admin_box = toga.Box(style=Pack(direction=COLUMN))
+        self.admin_button = toga.Button(
+            'Администрирование',
+            on_press=self.go_to_admin,
+            style=Pack(padding=10)
+        )
+        main_content.add(self.admin_box)
+        
         self.logout_button = toga.Button(
             'Разлогиниться',
             on_press=self.logout,
@@ -84,152 +127,102 @@ class MainMenuScreen(BaseScreen):
         self.content.add(main_content)
         self.update_ui()
     
+    def reload(self):
+        self.update_ui()
+    
     def update_ui(self):
         """Update the UI based on the current user and role."""
+        self.admin_box.clear()
+        if self.app.user_role == 'admin':
+            self.admin_box.add(self.admin_button)
         if self.app.current_user:
             self.greeting_label.text = f"Здравствуйте, {self.app.current_user}!"
             self.motivational_label.text = random.choice(MOTIVATIONAL_PHRASES)
+            # Данные для отчетов и советов загружаются сразу, параллельными запросами
+            self.app.loop.create_task(self.show_today_status())
+            self.app.loop.create_task(self.show_rejected())
+    
+    def get_overview(self):
+        """Return the task loading this user's overview (usually prefetched)."""
+        task = self.app.prefetcher.get('overview')
+        if task is None:
+            task = self.app.loop.create_task(async_db.fetch_overview(self.app.current_user))
+        return task
+    
+    async def show_today_status(self):
+        overview = await self.get_overview()
+        if overview.has_today:
+            self.today_label.text = 'Данные за сегодня уже внесены'
+        else:
+            self.today_label.text = 'Не забудьте внести данные за сегодня'
+    
+    async def show_rejected(self):
+        """Tell the user once about their saved logs the server didn't accept."""
+        store = get_local_store()
+        if store is None:
+            return
+        rows = await async_db.run(store.rejected, self.app.current_user, unseen=True)
+        if not rows:
+            return
+        text = '\n'.join(f"{row['date']}: {row['error']}" for row in rows)
+        await self.app.main_window.info_dialog('Записи не сохранены', text)
+        await async_db.run(store.mark_seen, [row['seq'] for row in rows])
     
     def go_to_input(self, widget):
         """Go to the input screen."""
         self.app.show_input_screen()
     
     def go_to_history(self, widget):
-        self.show_history_dialog()
+        """Go to the history screen."""
+        self.app.show_history_screen()
+    
+    def go_to_admin(self, widget):
+        """Go to the admin screen."""
+        self.app.show_admin_screen()
 
-    def show_history_dialog(self):
-        from datetime import datetime
-        from ..database.supabase_db import fetch_sleep_logs
-        logs = fetch_sleep_logs(login=self.app.current_user)
-        if not logs:
-            self.app.main_window.info_dialog('История', 'Данных нет')
-            return
-        logs = sorted(logs, key=lambda x: x['date'], reverse=True)[:10]
-        if not logs:
-            self.app.main_window.info_dialog('История', 'Данных нет')
+    async def show_history_dialog(self):
+        overview = await self.get_overview()
+        summary = summarize(overview.recent)
+        if summary is None:
+            await self.app.main_window.info_dialog('История', 'Данных нет')
             return
-        total_sleep = 0
-        total_wake = 0
-        total_wellbeing = 0
-        count = 0
-        for log in logs:
-            try:
-                sleep_h, sleep_m, *_ = map(int, log['sleep_time'].split(':'))
-                wake_h, wake_m, *_ = map(int, log['wake_time'].split(':'))
-                sleep_minutes = sleep_h * 60 + sleep_m
-                wake_minutes = wake_h * 60 + wake_m
-                total_sleep += sleep_minutes
-                total_wake += wake_minutes
-                total_wellbeing += int(log.get('wellbeing', 5))
-                count += 1
-            except Exception:
-                continue
-        if count == 0:
-            self.app.main_window.info_dialog('История', 'Данных нет')
-            return
-        avg_sleep = total_sleep // count
-        avg_wake = total_wake // count
-        avg_wellbeing = total_wellbeing / count
-        avg_sleep_str = f"{avg_sleep // 60:02d}:{avg_sleep % 60:02d}"
-        avg_wake_str = f"{avg_wake // 60:02d}:{avg_wake % 60:02d}"
         text = (
             f"Статистика за последние 10 дней:\n"
-            f"Среднее время сна: {avg_sleep_str}\n"
-            f"Среднее время пробуждения: {avg_wake_str}\n"
-            f"Среднее самочувствие: {avg_wellbeing:.1f}"
+            f"Среднее время сна: {format_minutes(summary.avg_sleep)}\n"
+            f"Среднее время пробуждения: {format_minutes(summary.avg_wake)}\n"
+            f"Среднее самочувствие: {summary.avg_wellbeing:.1f}"
         )
-        self.app.main_window.info_dialog('История', text)
+        await self.app.main_window.info_dialog('История', text)
     
-    def go_to_report(self, widget):
-        self.show_admin_report_dialog()
+    async def go_to_report(self, widget):
+        await self.show_admin_report_dialog()
 
-    def show_admin_report_dialog(self):
+    async def show_admin_report_dialog(self):
         if self.app.user_role != 'admin':
-            self.app.main_window.info_dialog('Ошибка', 'Недостаточно прав!')
-            return
-        from ..database.supabase_db import fetch_sleep_logs
-        from collections import defaultdict
-        logs = fetch_sleep_logs()
-        if not logs:
-            self.app.main_window.info_dialog('Отчет', 'Нет данных для отчета')
+            await self.app.main_window.info_dialog('Ошибка', 'Недостаточно прав!')
             return
-        user_logs = defaultdict(list)
-        for log in logs:
-            user_logs[log.get('login', '???')].append(log)
-        text = ''
-        for user, logs in user_logs.items():
-            total_sleep = 0
-            total_wake = 0
-            total_wellbeing = 0
-            count = 0
-            for log in logs:
-                try:
-                    sleep_h, sleep_m, *_ = map(int, log['sleep_time'].split(':'))
-                    wake_h, wake_m, *_ = map(int, log['wake_time'].split(':'))
-                    sleep_minutes = sleep_h * 60 + sleep_m
-                    wake_minutes = wake_h * 60 + wake_m
-                    total_sleep += sleep_minutes
-                    total_wake += wake_minutes
-                    total_wellbeing += int(log.get('wellbeing', 5))
-                    count += 1
-                except Exception:
-                    continue
-            if count == 0:
-                continue
-            avg_sleep = total_sleep // count
-            avg_wake = total_wake // count
-            avg_wellbeing = total_wellbeing / count
-            avg_sleep_str = f"{avg_sleep // 60:02d}:{avg_sleep % 60:02d}"
-            avg_wake_str = f"{avg_wake // 60:02d}:{avg_wake % 60:02d}"
-            text += (
-                f"Пользователь: {user}\n"
-                f"Среднее время сна: {avg_sleep_str}\n"
-                f"Среднее время пробуждения: {avg_wake_str}\n"
-                f"Среднее самочувствие: {avg_wellbeing:.1f}\n\n"
-            )
+        # Суммы по пользователям берутся из предварительно агрегированных таблиц
+        # (обычно уже загружены в фоне)
+        task = self.app.prefetcher.get('summaries')
+        text = format_user_summaries(await (task or async_db.fetch_summaries()))
         if not text:
-            self.app.main_window.info_dialog('Отчет', 'Нет данных для отчета')
+            await self.app.main_window.info_dialog('Отчет', 'Нет данных для отчета')
         else:
-            self.app.main_window.info_dialog('Отчет', text)
+            await self.app.main_window.info_dialog('Отчет', text)
     
     def logout(self, widget):
         """Log out the current user."""
-        self.app.current_user = None
-        self.app.user_role = None
-        self.app.show_login_screen()
+        self.app.log_out()
     
     async def show_tips(self, widget):
-        from datetime import datetime, timedelta
-        from ..database.supabase_db import fetch_sleep_logs
-        today = datetime.today().date()
-        week_ago = today - timedelta(days=6)
-        logs = await asyncio.to_thread(fetch_sleep_logs, login=self.app.current_user)
-        week_logs = [log for log in logs if 'date' in log and week_ago <= datetime.strptime(log['date'], '%Y-%m-%d').date() <= today]
-        if len(week_logs) < 7:
+        week_logs = (await self.get_overview()).week
+        summary = summarize(week_logs)
+        if len(week_logs) < 7 or summary is None:
             await self.app.main_window.info_dialog('Совет', 'Недостаточно данных! Вернитесь позднее.')
             return
         # Анализируем средние значения
-        total_sleep = 0
-        total_wellbeing = 0
-        for log in week_logs:
-            sleep_time = log.get('sleep_time', '00:00')
-            wake_time = log.get('wake_time', '00:00')
-            # Время сна в минутах
-            try:
-                s_h, s_m, *_ = map(int, sleep_time.split(':'))
-                w_h, w_m, *_ = map(int, wake_time.split(':'))
-                sleep_minutes = (w_h*60 + w_m) - (s_h*60 + s_m)
-                if sleep_minutes < 0:
-                    sleep_minutes += 24*60
-            except Exception:
-                sleep_minutes = 0
-            total_sleep += sleep_minutes
-            try:
-                total_wellbeing += int(log.get('wellbeing', 5))
-            except Exception:
-                total_wellbeing += 5
-        avg_sleep = total_sleep / 7 / 60  # в часах
-        avg_wellbeing = total_wellbeing / 7
+        avg_sleep = summary.avg_duration / 60  # в часах
+        avg_wellbeing = summary.avg_wellbeing
         # Градация советов
         tips = []
         if avg_sleep < 7:
@@ -246,100 +239,31 @@ class MainMenuScreen(BaseScreen):
             tips.append('У вас отличное самочувствие! Это говорит о том, что вы хорошо справляетесь с заботой о себе. Продолжайте поддерживать здоровый образ жизни, сохраняйте баланс между активностью и отдыхом.')
         await self.app.main_window.info_dialog('Совет', '\n'.join(tips))
 
-    def show_weekly_report(self, widget):
+    async def show_weekly_report(self, widget):
         from datetime import datetime, timedelta
-        from ..database.supabase_db import fetch_sleep_logs
-        from collections import defaultdict
         if self.app.user_role == 'admin':
             # Отчет по всем пользователям за неделю
-            logs = fetch_sleep_logs()
-            if not logs:
-                self.app.main_window.info_dialog('Отчет', 'Нет данных для отчета')
-                return
-            week_ago = datetime.today().date() - timedelta(days=6)
-            user_logs = defaultdict(list)
-            for log in logs:
-                # Фильтруем только за последнюю неделю
-                if 'date' in log:
-                    try:
-                        log_date = datetime.strptime(log['date'], '%Y-%m-%d').date()
-                        if week_ago <= log_date <= datetime.today().date():
-                            user_logs[log.get('login', '???')].append(log)
-                    except Exception:
-                        continue
-            text = ''
-            for user, logs in user_logs.items():
-                total_sleep = 0
-                total_wake = 0
-                total_wellbeing = 0
-                count = 0
-                for log in logs:
-                    try:
-                        sleep_h, sleep_m, *_ = map(int, log['sleep_time'].split(':'))
-                        wake_h, wake_m, *_ = map(int, log['wake_time'].split(':'))
-                        sleep_minutes = sleep_h * 60 + sleep_m
-                        wake_minutes = wake_h * 60 + wake_m
-                        total_sleep += sleep_minutes
-                        total_wake += wake_minutes
-                        total_wellbeing += int(log.get('wellbeing', 5))
-                        count += 1
-                    except Exception:
-                        continue
-                if count == 0:
-                    continue
-                avg_sleep = total_sleep // count
-                avg_wake = total_wake // count
-                avg_wellbeing = total_wellbeing / count
-                avg_sleep_str = f"{avg_sleep // 60:02d}:{avg_sleep % 60:02d}"
-                avg_wake_str = f"{avg_wake // 60:02d}:{avg_wake % 60:02d}"
-                text += (
-                    f"Пользователь: {user}\n"
-                    f"Среднее время сна: {avg_sleep_str}\n"
-                    f"Среднее время пробуждения: {avg_wake_str}\n"
-                    f"Среднее самочувствие: {avg_wellbeing:.1f}\n\n"
-                )
+            today = datetime.today().date()
+            week_ago = today - timedelta(days=6)
+            # Недельные суммы из rollup-таблиц, края окна добираются по дням
+            task = self.app.prefetcher.get('week_summaries')
+            summaries = await (task or async_db.fetch_summaries(date_from=week_ago, date_to=today))
+            text = format_user_summaries(summaries)
             if not text:
-                self.app.main_window.info_dialog('Отчет', 'Нет данных для отчета')
+                await self.app.main_window.info_dialog('Отчет', 'Нет данных для отчета')
             else:
-                self.app.main_window.info_dialog('Отчет', text)
+                await self.app.main_window.info_dialog('Отчет', text)
         else:
-            # Обычный пользователь — статистика за 7 дней
-            logs = fetch_sleep_logs(login=self.app.current_user)
-            if not logs:
-                self.app.main_window.info_dialog('Еженедельный отчет', 'Данных нет')
-                return
-            logs = sorted(logs, key=lambda x: x['date'], reverse=True)[:7]
-            if not logs:
-                self.app.main_window.info_dialog('Еженедельный отчет', 'Данных нет')
-                return
-            total_sleep = 0
-            total_wake = 0
-            total_wellbeing = 0
-            count = 0
-            for log in logs:
-                try:
-                    sleep_h, sleep_m, *_ = map(int, log['sleep_time'].split(':'))
-                    wake_h, wake_m, *_ = map(int, log['wake_time'].split(':'))
-                    sleep_minutes = sleep_h * 60 + sleep_m
-                    wake_minutes = wake_h * 60 + wake_m
-                    total_sleep += sleep_minutes
-                    total_wake += wake_minutes
-                    total_wellbeing += int(log.get('wellbeing', 5))
-                    count += 1
-                except Exception:
-                    continue
-            if count == 0:
-                self.app.main_window.info_dialog('Еженедельный отчет', 'Данных нет')
+            # Обычный пользователь — статистика по 7 последним записям
+            overview = await self.get_overview()
+            summary = summarize(overview.recent[:7])
+            if summary is None:
+                await self.app.main_window.info_dialog('Еженедельный отчет', 'Данных нет')
                 return
-            avg_sleep = total_sleep // count
-            avg_wake = total_wake // count
-            avg_wellbeing = total_wellbeing / count
-            avg_sleep_str = f"{avg_sleep // 60:02d}:{avg_sleep % 60:02d}"
-            avg_wake_str = f"{avg_wake // 60:02d}:{avg_wake % 60:02d}"
             text = (
                 f"Статистика за последние 7 дней:\n"
-                f"Среднее время сна: {avg_sleep_str}\n"
-                f"Среднее время пробуждения: {avg_wake_str}\n"
-                f"Среднее самочувствие: {avg_wellbeing:.1f}"
+                f"Среднее время сна: {format_minutes(summary.avg_sleep)}\n"
+                f"Среднее время пробуждения: {format_minutes(summary.avg_wake)}\n"
+                f"Среднее самочувствие: {summary.avg_wellbeing:.1f}"
             )
-            self.app.main_window.info_dialog('Еженедельный отчет', text) 
\ No newline at end of file
+            await self.app.main_window.info_dialog('Еженедельный отчет', text)
@@ -0,0 +1,447 @@
+"""
+Sleep statistics shared by all screens.
+"""
+
+from typing import NamedTuple
+
+from .clock import (
+    MINUTES_PER_DAY,
+    UNIT_COS,
+    UNIT_SIN,
+    circular_mean,
+    parse_minutes,
+    sleep_duration,
+)
+from .models import DEFAULT_WELLBEING, MISSING, LogArray
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the pure Python path always works
+    np = None
+
+# Below this many rows per batch the pure Python loop beats building arrays
+VECTORIZE_MIN_ROWS = 256
+
+
+def format_minutes(minutes):
+    """Format minutes after midnight as an ``HH:MM`` string.
+
+    Args:
+        minutes: The number of minutes after midnight
+    """
+    minutes = int(minutes)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def parse_log(log):
+    """Parse the values of a log that the statistics use.
+
+    Args:
+        log: A ``sleep_logs`` row
+
+    Returns:
+        A (sleep, wake, wellbeing) tuple, or None if the log has missing
+        or malformed values and must not be counted
+    """
+    try:
+        return (
+            parse_minutes(log['sleep_time']),
+            parse_minutes(log['wake_time']),
+            int(log.get('wellbeing', DEFAULT_WELLBEING)),
+        )
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+
+
+class SleepSummary(NamedTuple):
+    """Averages over a group of sleep logs."""
+
+    count: int
+    avg_sleep: int          # bedtime, minutes after midnight (circular mean)
+    avg_wake: int           # wake-up time, minutes after midnight (circular mean)
+    avg_wellbeing: float
+    avg_duration: float     # minutes asleep, wrapping past midnight
+
+
+class SleepStats:
+    """Single-pass aggregation engine for sleep logs.
+
+    Every log is parsed exactly once and folded into running totals for
+    its group, so rows can be fed straight from a paginated iterator
+    without being kept in memory.
+    """
+
+    def __init__(self, group_by='login', vectorize=None):
+        """Initialize the engine.
+
+        Args:
+            group_by: The log field to group by, or None for one group
+            vectorize: Aggregate batches with NumPy. None picks NumPy
+                automatically for large batches when it is installed.
+        """
+        if vectorize and np is None:
+            raise ImportError("NumPy is required for vectorize=True")
+        self.group_by = group_by
+        self.vectorize = vectorize
+        self._totals = {}
+
+    def add(self, log):
+        """Fold a single log into the totals.
+
+        Logs with missing or malformed values are skipped.
+
+        Args:
+            log: A ``sleep_logs`` row
+
+        Returns:
+            True if the log was counted
+        """
+        values = parse_log(log)
+        if values is None:
+            return False
+        sleep, wake, wellbeing = values
+        group = log.get(self.group_by, '???') if self.group_by else None
+        s = sleep % MINUTES_PER_DAY
+        w = wake % MINUTES_PER_DAY
+        self.merge(group, UNIT_SIN[s], UNIT_COS[s], UNIT_SIN[w], UNIT_COS[w],
+                   wellbeing, sleep_duration(sleep, wake), 1)
+        return True
+
+    def merge(self, group, sleep_sin, sleep_cos, wake_sin, wake_cos,
+              wellbeing, duration, count):
+        """Fold pre-aggregated sums (e.g. a rollup row) into a group.
+
+        Times are summed as unit vectors (see clock.py).
+
+        Args:
+            group: The group key
+            sleep_sin: Sum of the bedtime sine components
+            sleep_cos: Sum of the bedtime cosine components
+            wake_sin: Sum of the wake-up time sine components
+            wake_cos: Sum of the wake-up time cosine components
+            wellbeing: Sum of wellbeing values
+            duration: Sum of sleep durations, in minutes
+            count: Number of logs the sums cover
+        """
+        totals = self._totals.get(group)
+        if totals is None:
+            totals = self._totals[group] = [0.0, 0.0, 0.0, 0.0, 0, 0, 0]
+        totals[0] += sleep_sin
+        totals[1] += sleep_cos
+        totals[2] += wake_sin
+        totals[3] += wake_cos
+        totals[4] += wellbeing
+        totals[5] += duration
+        totals[6] += count
+
+    def update(self, logs):
+        """Fold an iterable of logs into the totals.
+
+        Lists (e.g. a page from the database) are aggregated with NumPy
+        when vectorization is enabled; results are identical either way.
+
+        Args:
+            logs: An iterable of ``sleep_logs`` rows, or a LogArray
+
+        Returns:
+            The engine itself, for chaining
+        """
+        if isinstance(logs, LogArray):
+            return self.update_array(logs)
+        # An empty page has nothing to vectorize
+        if isinstance(logs, list) and logs and self._vectorized(len(logs)):
+            return self.update_columns(LogColumns.from_logs(logs, self.group_by))
+        return self._update_rows(logs)
+
+    def _update_rows(self, logs):
+        # add() for every log, with parse_log, merge() and the unit vector
+        # lookups inlined: this is the hot loop of reports without NumPy
+        # (e.g. on Android), and the calls cost more than the arithmetic
+        group_by = self.group_by
+        all_totals = self._totals
+        unit_sin, unit_cos = UNIT_SIN, UNIT_COS
+        for log in logs:
+            try:
+                sleep = log['sleep_time'].split(':')
+                wake = log['wake_time'].split(':')
+                sleep = int(sleep[0]) * 60 + int(sleep[1])
+                wake = int(wake[0]) * 60 + int(wake[1])
+                wellbeing = int(log.get('wellbeing', DEFAULT_WELLBEING))
+            except (KeyError, TypeError, ValueError, AttributeError, IndexError):
+                continue
+            group = log.get(group_by, '???') if group_by else None
+            totals = all_totals.get(group)
+            if totals is None:
+                totals = all_totals[group] = [0.0, 0.0, 0.0, 0.0, 0, 0, 0]
+            s = sleep % MINUTES_PER_DAY
+            w = wake % MINUTES_PER_DAY
+            totals[0] += unit_sin[s]
+            totals[1] += unit_cos[s]
+            totals[2] += unit_sin[w]
+            totals[3] += unit_cos[w]
+            totals[4] += wellbeing
+            totals[5] += (wake - sleep) % MINUTES_PER_DAY
+            totals[6] += 1
+        return self
+
+    def update_array(self, logs):
+        """Fold a LogArray into the totals, without decoding any row.
+
+        Args:
+            logs: A LogArray (grouped by login, or as one group)
+
+        Returns:
+            The engine itself, for chaining
+        """
+        if self.group_by not in ('login', None):
+            return self.update(log.to_row() for log in logs)
+        if self._vectorized(len(logs)):
+            return self.update_columns(LogColumns.from_array(logs, self.group_by))
+        groups = logs.logins if self.group_by else [None] * len(logs.logins)
+        # merge() inlined, as in _update_rows
+        all_totals = self._totals
+        unit_sin, unit_cos = UNIT_SIN, UNIT_COS
+        for code, sleep, wake, wellbeing in zip(logs.codes, logs.sleep, logs.wake, logs.wellbeing):
+            if sleep == MISSING:
+                continue
+            group = groups[code]
+            totals = all_totals.get(group)
+            if totals is None:
+                totals = all_totals[group] = [0.0, 0.0, 0.0, 0.0, 0, 0, 0]
+            totals[0] += unit_sin[sleep]
+            totals[1] += unit_cos[sleep]
+            totals[2] += unit_sin[wake]
+            totals[3] += unit_cos[wake]
+            totals[4] += wellbeing
+            totals[5] += (wake - sleep) % MINUTES_PER_DAY
+            totals[6] += 1
+        return self
+
+    def update_columns(self, columns):
+        """Fold a LogColumns batch into the totals.
+
+        Args:
+            columns: A LogColumns instance
+
+        Returns:
+            The engine itself, for chaining
+        """
+        valid = columns.valid
+        rows = np.flatnonzero(valid)
+        codes = columns.codes[valid]
+        size = len(columns.groups)
+        counts = np.bincount(codes, minlength=size)
+        sin, cos = _unit_tables()
+        sleep = columns.sleep % MINUTES_PER_DAY
+        wake = columns.wake % MINUTES_PER_DAY
+        sums = [
+            np.bincount(codes, weights=values[valid], minlength=size)
+            for values in (sin[sleep], cos[sleep], sin[wake], cos[wake])
+        ] + [
+            np.bincount(codes, weights=values[valid], minlength=size).astype(np.int64)
+            for values in (columns.wellbeing, sleep_duration(columns.sleep, columns.wake))
+        ]
+        # Visit groups in order of their first counted row, like add() does
+        first = np.full(size, len(valid))
+        np.minimum.at(first, codes, rows)
+        for code in np.argsort(first, kind='stable'):
+            if not counts[code]:
+                break
+            self.merge(
+                columns.groups[code],
+                *(values[code].item() for values in sums),
+                int(counts[code]),
+            )
+        return self
+
+    def _vectorized(self, size):
+        if self.vectorize is None:
+            return np is not None and size >= VECTORIZE_MIN_ROWS
+        return self.vectorize
+
+    def summaries(self):
+        """Return a summary for every group, in order of first appearance."""
+        return {
+            group: _summary(*totals)
+            for group, totals in self._totals.items()
+        }
+
+    def summary(self, group=None):
+        """Return the summary of a single group, or None if it has no logs."""
+        totals = self._totals.get(group)
+        return _summary(*totals) if totals else None
+
+
+class LogColumns:
+    """A batch of sleep logs decoded into NumPy arrays.
+
+    Attributes:
+        groups: Group keys (e.g. logins), indexed by code
+        codes: Group code of every row
+        sleep: Bedtime of every row, minutes after midnight
+        wake: Wake-up time of every row, minutes after midnight
+        wellbeing: Wellbeing of every row
+        valid: Rows that parsed and are counted in the statistics
+    """
+
+    __slots__ = ('groups', 'codes', 'sleep', 'wake', 'wellbeing', 'valid')
+
+    def __init__(self, groups, codes, sleep, wake, wellbeing, valid):
+        self.groups = groups
+        self.codes = codes
+        self.sleep = sleep
+        self.wake = wake
+        self.wellbeing = wellbeing
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.codes)
+
+    @classmethod
+    def from_logs(cls, logs, group_by='login'):
+        """Decode a list of ``sleep_logs`` rows.
+
+        Args:
+            logs: A list of ``sleep_logs`` rows
+            group_by: The log field to group by, or None for one group
+        """
+        if group_by:
+            keys = [log.get(group_by, '???') for log in logs]
+        else:
+            keys = [None] * len(logs)
+        groups = list(dict.fromkeys(keys))
+        index = {key: code for code, key in enumerate(groups)}
+        codes = np.fromiter(map(index.__getitem__, keys), dtype=np.intp, count=len(keys))
+        sleep, sleep_ok = _time_column([log.get('sleep_time') for log in logs])
+        wake, wake_ok = _time_column([log.get('wake_time') for log in logs])
+        wellbeing, wellbeing_ok = _int_column(
+            [log.get('wellbeing', DEFAULT_WELLBEING) for log in logs]
+        )
+        return cls(
+            groups=groups,
+            codes=codes,
+            sleep=sleep,
+            wake=wake,
+            wellbeing=wellbeing,
+            valid=sleep_ok & wake_ok & wellbeing_ok,
+        )
+
+    @classmethod
+    def from_array(cls, logs, group_by='login'):
+        """View a LogArray as columns; its arrays are not copied.
+
+        Args:
+            logs: A LogArray
+            group_by: 'login', or None for one group
+        """
+        size = len(logs)
+        if group_by:
+            groups = list(logs.logins)
+            codes = _column(logs.codes).astype(np.intp)
+        else:
+            groups = [None]
+            codes = np.zeros(size, dtype=np.intp)
+        sleep = _column(logs.sleep)
+        return cls(
+            groups=groups,
+            codes=codes,
+            sleep=sleep.astype(np.int64),
+            wake=_column(logs.wake).astype(np.int64),
+            wellbeing=_column(logs.wellbeing).astype(np.int64),
+            valid=sleep != MISSING,
+        )
+
+
+def _column(values):
+    """View an array.array as a NumPy array without copying."""
+    return np.frombuffer(values, dtype=values.typecode) if len(values) else np.array([], dtype=values.typecode)
+
+
+def _time_column(values):
+    """Parse time strings in bulk.
+
+    Canonical ``HH:MM`` / ``HH:MM:SS`` values are decoded straight from
+    their code points; anything else goes through parse_minutes so both
+    paths accept exactly the same inputs.
+
+    Returns:
+        A (minutes, ok) pair of arrays
+    """
+    size = len(values)
+    text = np.array([v if isinstance(v, str) else '' for v in values])
+    if text.dtype.itemsize < 6 * 4:
+        text = text.astype('U6')
+    chars = text.view(np.uint32).reshape(size, -1)[:, :6].astype(np.int64)
+    lengths = np.char.str_len(text)
+    digits = chars - ord('0')
+    is_digit = (digits >= 0) & (digits <= 9)
+    fast = (
+        is_digit[:, 0] & is_digit[:, 1] & is_digit[:, 3] & is_digit[:, 4]
+        & (chars[:, 2] == ord(':'))
+        & ((lengths == 5) | (chars[:, 5] == ord(':')))
+    )
+    minutes = (digits[:, 0] * 10 + digits[:, 1]) * 60 + digits[:, 3] * 10 + digits[:, 4]
+    ok = fast.copy()
+    for i in np.flatnonzero(~fast):
+        try:
+            minutes[i] = parse_minutes(values[i])
+            ok[i] = True
+        except (TypeError, ValueError, AttributeError):
+            pass
+    return minutes, ok
+
+
+def _int_column(values):
+    """Convert values with int(), returning a (numbers, ok) pair of arrays."""
+    try:
+        return np.array([int(v) for v in values], dtype=np.int64), np.ones(len(values), dtype=bool)
+    except (TypeError, ValueError, OverflowError):
+        pass
+    numbers = np.zeros(len(values), dtype=np.int64)
+    ok = np.zeros(len(values), dtype=bool)
+    for i, value in enumerate(values):
+        try:
+            numbers[i] = int(value)
+            ok[i] = True
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return numbers, ok
+
+
+_tables = None
+
+
+def _unit_tables():
+    """clock.UNIT_SIN/UNIT_COS as NumPy arrays, built on first use."""
+    global _tables
+    if _tables is None:
+        _tables = np.array(UNIT_SIN), np.array(UNIT_COS)
+    return _tables
+
+
+def _summary(sleep_sin, sleep_cos, wake_sin, wake_cos, wellbeing, duration, count):
+    return SleepSummary(
+        count=count,
+        avg_sleep=circular_mean(sleep_sin, sleep_cos),
+        avg_wake=circular_mean(wake_sin, wake_cos),
+        avg_wellbeing=wellbeing / count,
+        avg_duration=duration / count,
+    )
+
+
+def summarize(logs):
+    """Summarize logs as a single group.
+
+    Returns:
+        A SleepSummary, or None if no log could be parsed
+    """
+    return SleepStats(group_by=None).update(logs).summary()
+
+
+def summarize_by_user(logs):
+    """Summarize logs per user.
+
+    Returns:
+        A dict mapping each login to its SleepSummary
+    """
+    return SleepStats().update(logs).summaries()
@@ -0,0 +1,23 @@
+import pytest
+
+from sleep_tracker.database import supabase_db
+from sleep_tracker.database.fake_backend import FakeBackend
+
+
+@pytest.fixture
+def backend_rows():
+    """Rows loaded into the backend fixture, by table; test modules override it."""
+    return {}
+
+
+@pytest.fixture
+def backend(monkeypatch, backend_rows):
+    """A FakeBackend plugged into supabase_db, read without a local mirror."""
+    monkeypatch.delenv('SLEEP_TRACKER_FAKE_BACKEND', raising=False)
+    monkeypatch.setattr(supabase_db, '_local_store', None)
+    backend = FakeBackend(error=lambda: ConnectionError('offline'))
+    for table, rows in backend_rows.items():
+        backend.load(table, rows)
+    supabase_db.use_backend(backend)
+    yield backend
+    supabase_db.use_backend(None)
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import time
+from datetime import date
+
+from sleep_tracker.database import async_db, supabase_db
+from sleep_tracker.models import LogArray
+
+
+def test_overview_queries_run_concurrently(monkeypatch):
+    """The overview costs one round trip, not three."""
+    calls = []
+
+    def fetch_log_array(**kwargs):
+        time.sleep(0.2)
+        calls.append(kwargs)
+        return LogArray.from_rows([{'date': '2025-05-07'}] if kwargs.get('limit') else [])
+
+    def has_today_entry(login):
+        time.sleep(0.2)
+        assert threading.current_thread() is not threading.main_thread()
+        return True
+
+    monkeypatch.setattr(supabase_db, 'fetch_log_array', fetch_log_array)
+    monkeypatch.setattr(supabase_db, 'has_today_entry', has_today_entry)
+    start = time.perf_counter()
+    overview = asyncio.run(async_db.fetch_overview('bob', today=date(2025, 5, 7)))
+    assert time.perf_counter() - start < 0.5
+    assert len(overview.week) == 0 and overview.has_today
+    assert [log.date for log in overview.recent] == [date(2025, 5, 7)]
+    week = next(call for call in calls if 'date_from' in call)
+    assert (week['date_from'], week['date_to']) == (date(2025, 5, 1), date(2025, 5, 7))
+
+
+def test_event_loop_stays_responsive(monkeypatch):
+    """Blocking queries never run on the event loop thread."""
+    monkeypatch.setattr(supabase_db, 'fetch_summaries', lambda *args: time.sleep(0.2) or {})
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        assert await async_db.fetch_summaries() == {}
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(main()) > 5
@@ -0,0 +1,72 @@
+import importlib.util
+import json
+from pathlib import Path
+
+import pytest
+
+from sleep_tracker.database import supabase_db
+
+BENCHMARKS = Path(__file__).resolve().parents[1] / 'benchmarks'
+
+
+def load_benchmark(name):
+    spec = importlib.util.spec_from_file_location(name, BENCHMARKS / f'{name}.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def bench(tmp_path, monkeypatch):
+    bench = load_benchmark('bench_reports')
+    monkeypatch.setattr(bench, 'BASELINE', tmp_path / 'baseline.json')
+    yield bench
+    supabase_db.use_local_store(None)
+    supabase_db.use_backend(None)
+
+
+def test_check_exits_on_regressions(bench, monkeypatch, capsys):
+    results = {'mirror/admin/1000': {'seconds': 0.010, 'peak_bytes': 1}}
+    monkeypatch.setattr(bench, 'run_size', lambda size, repeat: dict(results))
+    bench.main(['--sizes', '1000', '--save-baseline'])
+    assert json.loads(bench.BASELINE.read_text()) == results
+
+    # Within the tolerance
+    results['mirror/admin/1000'] = {'seconds': 0.012, 'peak_bytes': 1}
+    bench.main(['--sizes', '1000', '--check'])
+    assert '0 regression(s)' in capsys.readouterr().out
+
+    results['mirror/admin/1000'] = {'seconds': 0.013, 'peak_bytes': 1}
+    with pytest.raises(SystemExit) as exit_info:
+        bench.main(['--sizes', '1000', '--check', '--tolerance', '0.2'])
+    assert exit_info.value.code == 1
+    assert 'REGRESSION mirror/admin/1000: 10.00 ms -> 13.00 ms' in capsys.readouterr().out
+
+    # Without --check regressions are only reported
+    bench.main(['--sizes', '1000', '--tolerance', '0.2'])
+    assert '1 regression(s)' in capsys.readouterr().out
+
+
+def test_check_guards_peak_memory(bench, monkeypatch, capsys):
+    mib = 2 ** 20
+    results = {'remote/admin/1000': {'seconds': 0.010, 'peak_bytes': 4 * mib}}
+    monkeypatch.setattr(bench, 'run_size', lambda size, repeat: dict(results))
+    bench.main(['--sizes', '1000', '--save-baseline'])
+
+    results['remote/admin/1000'] = {'seconds': 0.010, 'peak_bytes': 6 * mib}
+    with pytest.raises(SystemExit):
+        bench.main(['--sizes', '1000', '--check'])
+    assert 'REGRESSION remote/admin/1000 peak: 4.00 MiB -> 6.00 MiB' in capsys.readouterr().out
+    bench.main(['--sizes', '1000', '--check', '--memory-tolerance', '0.6'])
+    assert '0 regression(s)' in capsys.readouterr().out
+
+    # Small absolute growth is noise
+    assert bench.compare({'k': {'seconds': 1, 'peak_bytes': 2000}}, {'k': {'seconds': 1, 'peak_bytes': 1000}}, 0.25) == 0
+
+
+def test_paths_run_against_the_fake_backend(bench, capsys):
+    results = bench.run_size(400, repeat=1)
+    assert {key.split('/')[0] for key in results} == {'mirror', 'remote'}
+    assert results['mirror/sync/400']['seconds'] > 0
+    assert {key.split('/')[1] for key in results} == {'sync', 'admin', 'weekly_admin', 'overview', 'history'}
+    assert supabase_db.get_local_store() is None
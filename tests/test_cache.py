@@ -0,0 +1,46 @@
+from sleep_tracker.database import cache
+from sleep_tracker.database.cache import QueryCache
+
+
+def test_hits_and_misses_are_counted():
+    query_cache = QueryCache()
+    assert query_cache.get(('bob', 'week')) == (False, None)
+    query_cache.put(('bob', 'week'), [1, 2])
+    assert query_cache.get(('bob', 'week')) == (True, [1, 2])
+    assert query_cache.stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    query_cache = QueryCache(ttl=30)
+    query_cache.put(('bob',), [])
+    now[0] += 29
+    assert query_cache.get(('bob',))[0]
+    now[0] += 2
+    assert not query_cache.get(('bob',))[0]
+    assert query_cache.stats()['size'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    query_cache = QueryCache(maxsize=2)
+    query_cache.put(('a',), 1)
+    query_cache.put(('b',), 2)
+    query_cache.get(('a',))
+    query_cache.put(('c',), 3)
+    assert query_cache.get(('a',))[0]
+    assert not query_cache.get(('b',))[0]
+    assert query_cache.get(('c',))[0]
+
+
+def test_invalidate_drops_user_and_all_users_queries():
+    query_cache = QueryCache()
+    query_cache.put(('bob', 'week'), 1)
+    query_cache.put(('alice', 'week'), 2)
+    query_cache.put((None, 'week'), 3)
+    query_cache.invalidate('bob')
+    assert not query_cache.get(('bob', 'week'))[0]
+    assert not query_cache.get((None, 'week'))[0]
+    assert query_cache.get(('alice', 'week'))[0]
+    query_cache.invalidate()
+    assert query_cache.stats()['size'] == 0
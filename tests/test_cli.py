@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+from datetime import date
+
+import pytest
+
+from sleep_tracker import cli
+from sleep_tracker.database import supabase_db
+from sleep_tracker.database.fake_backend import FakeBackend
+
+
+def make_logs():
+    for login, sleep in (('ann', '23:30:00'), ('bob', '00:30:00'), ('cid', '22:00:00')):
+        for day in range(1, 5):
+            yield {'login': login, 'date': f'2025-05-0{day}', 'sleep_time': sleep, 'wake_time': '07:00:00', 'wellbeing': day}
+
+
+def tables():
+    return {
+        'sleep_logs': make_logs(),
+        'users': [{'login': login, 'password': '', 'role': 'user'} for login in ('bob', 'ann', 'cid', 'dan')],
+    }
+
+
+def load(backend):
+    for table, rows in tables().items():
+        backend.load(table, rows)
+    return backend
+
+
+@pytest.fixture
+def backend_rows():
+    return tables()
+
+
+def test_partition():
+    assert cli.partition(['a', 'b', 'c', 'd', 'e'], 2) == [['a', 'c', 'e'], ['b', 'd']]
+    assert cli.partition(['a'], 4) == [['a']]
+
+
+def test_build_report_in_process(backend):
+    summaries = cli.build_report(supabase_db.fetch_logins(), date(2025, 5, 2), date(2025, 5, 3), workers=1)
+    assert list(summaries) == ['ann', 'bob', 'cid']
+    assert summaries['bob'].count == 2
+    assert summaries['bob'].avg_wellbeing == 2.5
+
+
+def test_report_command_writes_csv_and_json(backend, capsys, tmp_path):
+    assert cli.main(['report', '--users', 'bob,ann', '--workers', '1']) == 0
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert [row['login'] for row in rows] == ['ann', 'bob']
+    assert rows[1] == {'login': 'bob', 'logs': '4', 'avg_sleep': '00:30', 'avg_wake': '07:00', 'avg_duration': '390.0', 'avg_wellbeing': '2.5'}
+
+    output = tmp_path / 'report.json'
+    cli.main(['report', '--from', '2025-05-04', '--format', 'json', '--output', str(output), '--workers', '1'])
+    data = json.loads(output.read_text(encoding='utf-8'))
+    assert [row['logs'] for row in data] == [1, 1, 1]
+
+
+def test_failed_page_fails_the_report(backend, capsys, tmp_path):
+    # bob's page and the empty page after it arrive, ann's page fails
+    backend.fail_next(after=2)
+    output = tmp_path / 'report.csv'
+    assert cli.main(['report', '--users', 'bob,ann', '--workers', '1', '--output', str(output)]) == 1
+    assert not output.exists()
+    assert 'Report failed' in capsys.readouterr().err
+
+    backend.fail_next()
+    assert cli.main(['report', '--workers', '1']) == 1
+    captured = capsys.readouterr()
+    assert captured.out == ''
+    assert 'Report failed' in captured.err
+
+
+def test_report_in_worker_processes(monkeypatch, tmp_path):
+    path = tmp_path / 'server.sqlite3'
+    load(FakeBackend(path))
+    monkeypatch.setenv('SLEEP_TRACKER_FAKE_BACKEND', str(path))
+    cli._use_configured_backend()
+    try:
+        parallel = cli.build_report(supabase_db.fetch_logins(), workers=2)
+        assert parallel == cli.build_report(supabase_db.fetch_logins(), workers=1)
+        assert list(parallel) == ['ann', 'bob', 'cid']
+    finally:
+        supabase_db.use_backend(None)
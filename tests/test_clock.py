@@ -0,0 +1,27 @@
+from sleep_tracker.clock import MINUTES_PER_DAY, circular_mean, mean_time, sleep_duration, unit_vector
+
+
+def test_sleep_duration_wraps_past_midnight():
+    assert sleep_duration(23 * 60, 7 * 60) == 8 * 60
+    assert sleep_duration(60, 9 * 60) == 8 * 60
+    assert sleep_duration(22 * 60, 22 * 60) == 0
+
+
+def test_mean_time_is_circular():
+    assert mean_time([23 * 60 + 30, 30]) == 0
+    assert mean_time([23 * 60, 60]) == 0
+    assert mean_time([22 * 60, 23 * 60]) == 22 * 60 + 30
+    assert mean_time([6 * 60]) == 6 * 60
+    assert mean_time([MINUTES_PER_DAY - 1]) == MINUTES_PER_DAY - 1
+    assert mean_time([]) is None
+
+
+def test_unit_vector_sums_can_be_merged():
+    """Vector sums of separate groups combine into the mean of all times."""
+    def sums(times):
+        vectors = [unit_vector(m) for m in times]
+        return sum(v[0] for v in vectors), sum(v[1] for v in vectors)
+
+    first = sums([22 * 60, 23 * 60])
+    second = sums([0, 60])
+    assert circular_mean(first[0] + second[0], first[1] + second[1]) == 23 * 60 + 30
@@ -0,0 +1,92 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+
+from sleep_tracker import cli, export
+from sleep_tracker.database import supabase_db
+
+
+def make_logs():
+    for login in ('ann', 'bob'):
+        for day in range(1, 31):
+            yield {'login': login, 'date': f'2025-04-{day:02d}', 'sleep_time': '23:00:00', 'wake_time': '07:00:00', 'wellbeing': day % 10 + 1, 'comment': 'ок' if day == 1 else ''}
+
+
+@pytest.fixture
+def backend_rows():
+    return {'sleep_logs': make_logs()}
+
+
+def test_csv_export_with_filters(backend, tmp_path):
+    path = tmp_path / 'logs.csv'
+    count = export.export_logs(path, logins=['bob'], date_from=date(2025, 4, 1), date_to=date(2025, 4, 10), page_size=4)
+    assert count == 10
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['date'] for row in rows] == [f'2025-04-{day:02d}' for day in range(1, 11)]
+    assert rows[0] == {'id': '31', 'login': 'bob', 'date': '2025-04-01', 'sleep_time': '23:00:00', 'wake_time': '07:00:00', 'wellbeing': '2', 'comment': 'ок'}
+    assert export.export_logs(tmp_path / 'all.csv') == 60
+
+
+def test_pages_are_written_one_at_a_time(backend):
+    fetched = []
+
+    def pages():
+        for page in export.iter_pages(page_size=7):
+            # The previous page is already written when the next one is fetched
+            assert out.getvalue().count('\n') == 1 + sum(fetched)
+            fetched.append(len(page))
+            yield page
+
+    out = io.StringIO()
+    assert export.write_csv(out, pages()) == 60
+    assert max(fetched) == 7
+
+
+def test_failed_page_fails_the_export(backend, tmp_path):
+    backend.fail_next()
+    with pytest.raises(ConnectionError):
+        export.export_logs(tmp_path / 'logs.csv')
+
+
+def test_failed_sync_fails_the_export(backend, tmp_path):
+    supabase_db.use_local_store(':memory:')
+    try:
+        backend.fail_next()
+        with pytest.raises(ConnectionError):
+            export.export_logs(tmp_path / 'logs.csv')
+        # The mirror isn't taken as synced, so the next export fetches everything
+        assert export.export_logs(tmp_path / 'logs.csv') == 60
+    finally:
+        supabase_db.use_local_store(None)
+
+
+def test_parquet_export(backend, tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    path = tmp_path / 'logs.parquet'
+    assert export.format_for(path) == 'parquet'
+    assert export.export_logs(path, page_size=25) == 60
+    parquet = pq.ParquetFile(path)
+    assert parquet.metadata.num_row_groups == 3
+    table = parquet.read()
+    assert table.column('date')[0].as_py() == date(2025, 4, 1)
+    assert table.column('wellbeing').to_pylist()[:3] == [2, 3, 4]
+
+
+def test_parquet_needs_pyarrow(backend, tmp_path, monkeypatch):
+    monkeypatch.setattr(export, 'parquet_available', lambda: False)
+    with pytest.raises(ImportError):
+        export.export_logs(tmp_path / 'logs.parquet')
+
+
+def test_export_command(backend, capsys):
+    assert cli.main(['export', '--output', '-', '--users', 'ann', '--to', '2025-04-02']) == 0
+    out, err = capsys.readouterr()
+    assert [row['date'] for row in csv.DictReader(io.StringIO(out))] == ['2025-04-01', '2025-04-02']
+    assert 'Exported 2 logs' in err
+
+    backend.fail_next()
+    assert cli.main(['export', '--output', '-']) == 1
+    assert 'Export failed' in capsys.readouterr().err
@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from sleep_tracker.database import supabase_db
+from sleep_tracker.database.fake_backend import FakeBackend, from_environ
+
+
+def make_log(login, day, wellbeing=7):
+    return {'login': login, 'date': day, 'sleep_time': '23:00:00', 'wake_time': '07:00:00', 'wellbeing': wellbeing, 'comment': ''}
+
+
+@pytest.fixture
+def backend_rows():
+    return {'sleep_logs': [make_log('bob', f'2025-05-0{day}', day) for day in range(1, 6)] + [make_log('ann', '2025-05-03')]}
+
+
+def test_filters_order_and_range(backend):
+    query = backend.table('sleep_logs').select('date,wellbeing').eq('login', 'bob')
+    rows = query.gte('date', '2025-05-02').lt('date', '2025-05-05').order('date', desc=True).execute().data
+    assert rows == [{'date': '2025-05-04', 'wellbeing': 4}, {'date': '2025-05-03', 'wellbeing': 3}, {'date': '2025-05-02', 'wellbeing': 2}]
+    rows = backend.table('sleep_logs').select('date').eq('login', 'bob').order('date').range(1, 2).execute().data
+    assert [row['date'] for row in rows] == ['2025-05-02', '2025-05-03']
+    response = backend.table('sleep_logs').select('id', count='exact', head=True).eq('date', '2025-05-03').execute()
+    assert (response.data, response.count) == ([], 2)
+    with pytest.raises(ValueError):
+        backend.table('sleep_logs').select('password').execute()
+
+
+def test_upsert_skips_existing_day(backend):
+    query = backend.table('sleep_logs').upsert(
+        [make_log('bob', '2025-05-01'), make_log('bob', '2025-05-06')],
+        on_conflict='login,date', ignore_duplicates=True,
+    )
+    stored = query.execute().data
+    assert [row['date'] for row in stored] == ['2025-05-06']
+    assert stored[0]['id'] > 6
+
+
+def test_data_layer_runs_against_the_backend(backend):
+    assert supabase_db.count_sleep_logs(login='bob') == 5
+    logs = supabase_db.fetch_sleep_logs(login='bob', columns='date', order='date', desc=True, limit=2, offset=1)
+    assert logs == [{'date': '2025-05-04'}, {'date': '2025-05-03'}]
+    assert not supabase_db.has_today_entry('bob')
+    assert supabase_db.save_sleep_data('bob', '23:00:00', '07:00:00', 7)
+    assert supabase_db.has_today_entry('bob')
+    with pytest.raises(supabase_db.DuplicateEntryError):
+        supabase_db.save_sleep_data('bob', '23:00:00', '07:00:00', 7)
+    assert set(supabase_db.fetch_summaries()) == {'bob', 'ann'}
+
+
+def test_injected_failures(backend):
+    backend.fail_next(2)
+    assert supabase_db.fetch_sleep_logs(login='bob') == []
+    assert not supabase_db.save_sleep_data('bob', '23:00:00', '07:00:00', 7)
+    assert len(supabase_db.fetch_sleep_logs(login='bob')) == 5
+    assert backend.requests == 3
+
+    backend.failure_rate = 1
+    assert not supabase_db.has_today_entry('bob')
+
+
+def test_failure_rate_is_reproducible():
+    def outcomes(seed):
+        backend = FakeBackend(failure_rate=0.5, error=lambda: ConnectionError('offline'), seed=seed)
+        results = []
+        for _ in range(20):
+            try:
+                backend.table('users').select().execute()
+                results.append(True)
+            except ConnectionError:
+                results.append(False)
+        return results
+
+    assert outcomes(1) == outcomes(1)
+    assert True in outcomes(1) and False in outcomes(1)
+
+
+def test_latency_is_added_to_every_request():
+    backend = FakeBackend(latency=0.02)
+    start = time.perf_counter()
+    for _ in range(3):
+        backend.table('users').select().execute()
+    assert time.perf_counter() - start >= 0.06
+
+
+def test_login_against_the_backend(backend):
+    pytest.importorskip('httpx')
+    backend.load('users', [{'login': 'bob', 'password': 'secret', 'role': 'user'}])
+    assert supabase_db.login_user('bob', 'secret')['role'] == 'user'
+    assert supabase_db.login_user('bob', 'wrong') is None
+    backend.fail_next(error=FakeBackend().error)
+    with pytest.raises(Exception, match='Нет подключения'):
+        supabase_db.login_user('bob', 'secret')
+
+
+
+def test_fetch_user_reads_the_current_role(backend):
+    backend.load('users', [{'login': 'bob', 'password': 'secret', 'role': 'admin'}])
+    assert supabase_db.fetch_user('bob') == {'login': 'bob', 'password': 'secret', 'role': 'admin'}
+    assert supabase_db.fetch_user('eve') is None
+    backend.fail_next()
+    with pytest.raises(ConnectionError):
+        supabase_db.fetch_user('bob')
+
+def test_from_environ(tmp_path):
+    assert from_environ({}) is None
+    path = tmp_path / 'server.sqlite3'
+    backend = from_environ({'SLEEP_TRACKER_FAKE_BACKEND': str(path), 'SLEEP_TRACKER_FAKE_LATENCY': '0.1'})
+    assert backend.latency == 0.1 and backend.failure_rate == 0
+    backend.load('users', [{'login': 'bob', 'password': 'secret', 'role': 'admin'}])
+    # The file keeps the data for the next run
+    assert FakeBackend(path).table('users').select('role').execute().data == [{'role': 'admin'}]
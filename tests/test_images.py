@@ -0,0 +1,27 @@
+import pytest
+
+from sleep_tracker.images import ASSETS_DIR, SLEEP_IMAGE, ImageCache
+
+
+def test_images_resolve_relative_to_the_package(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    assert ImageCache().load_bytes(SLEEP_IMAGE).startswith(b'\x89PNG')
+    assert ImageCache().path(SLEEP_IMAGE) == ASSETS_DIR / SLEEP_IMAGE
+
+
+def test_each_image_is_read_and_decoded_once(tmp_path):
+    (tmp_path / 'a.png').write_bytes(b'data')
+    decoded = []
+    cache = ImageCache(tmp_path, factory=lambda data: decoded.append(data) or object())
+    cache.preload(['a.png']).join()
+    (tmp_path / 'a.png').unlink()
+    first = cache.get('a.png')
+    assert cache.get('a.png') is first
+    assert decoded == [b'data']
+
+
+def test_missing_images_raise(tmp_path):
+    cache = ImageCache(tmp_path, factory=bytes)
+    cache.preload(['missing.png']).join()
+    with pytest.raises(OSError):
+        cache.get('missing.png')
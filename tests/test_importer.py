@@ -0,0 +1,130 @@
+import csv
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from sleep_tracker import cli, importer
+from sleep_tracker.database import supabase_db
+
+TODAY = date(2025, 6, 1)
+FIELDS = ('login', 'date', 'sleep_time', 'wake_time', 'wellbeing', 'comment')
+
+
+def make_row(login, day, **changes):
+    row = {'login': login, 'date': day, 'sleep_time': '23:00', 'wake_time': '07:00', 'wellbeing': 7, 'comment': ''}
+    row.update(changes)
+    return row
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+
+@pytest.fixture
+def backend_rows():
+    return {'sleep_logs': [make_row('ann', '2025-05-02'), make_row('bob', '2025-05-01')]}
+
+
+def stored(login):
+    return {row['date']: row for row in supabase_db.fetch_sleep_logs(login)}
+
+
+def test_validate_row():
+    row = importer.validate_row(make_row(' ann ', '2025-05-01', sleep_time='7:5', wake_time='08:30:15', wellbeing='10', comment=None), today=TODAY)
+    assert row == {'login': 'ann', 'date': '2025-05-01', 'sleep_time': '07:05:00', 'wake_time': '08:30:00', 'wellbeing': 10, 'comment': ''}
+    assert importer.validate_row(make_row('bob', '2025-05-01'), login='ann', today=TODAY)['login'] == 'ann'
+    for changes, message in [
+        ({'login': ''}, 'нет логина'),
+        ({'date': '01.05.2025'}, 'неверная дата'),
+        ({'date': '2025-06-02'}, 'дата в будущем'),
+        ({'sleep_time': '07:75'}, 'неверное время sleep_time'),
+        ({'wake_time': '24:00'}, 'неверное время wake_time'),
+        ({'wake_time': None}, 'неверное время wake_time'),
+        ({'wellbeing': 11}, 'самочувствие'),
+        ({'wellbeing': 'хорошо'}, 'самочувствие'),
+    ]:
+        with pytest.raises(ValueError, match=message):
+            importer.validate_row(dict(make_row('ann', '2025-05-01'), **changes), today=TODAY)
+
+
+def test_csv_import_skips_stored_and_repeated_days(backend, tmp_path):
+    path = write_csv(tmp_path / 'history.csv', [
+        make_row('ann', '2025-05-01', comment='первая'),
+        make_row('ann', '2025-05-02'),                      # already stored
+        make_row('ann', '2025-05-01', comment='повтор'),    # repeated in the file
+        make_row('bob', '2025-05-02', wellbeing=11),
+        make_row('bob', '2025-05-03'),
+    ])
+    result = importer.import_file(path, today=TODAY)
+    assert result == importer.ImportResult(read=5, imported=2, duplicates=2, invalid=1, errors=[(4, result.errors[0][1])])
+    assert 'самочувствие' in result.errors[0][1]
+    assert sorted(stored('ann')) == ['2025-05-01', '2025-05-02']
+    assert stored('ann')['2025-05-01']['comment'] == 'первая'
+    assert sorted(stored('bob')) == ['2025-05-01', '2025-05-03']
+
+    # Running it again imports nothing
+    assert importer.import_file(path, today=TODAY)[1:4] == (0, 4, 1)
+
+
+def test_json_formats_and_login_override(backend, tmp_path):
+    rows = [make_row('someone', f'2025-04-{day:02d}') for day in range(1, 4)]
+    jsonl = tmp_path / 'history.jsonl'
+    jsonl.write_text(''.join(json.dumps(row) + '\n\n' for row in rows), encoding='utf-8')
+    assert importer.import_file(jsonl, login='ann', today=TODAY).imported == 3
+    array = tmp_path / 'history.json'
+    array.write_text(json.dumps([make_row('carl', '2025-04-01')]), encoding='utf-8')
+    assert importer.import_file(array, today=TODAY).imported == 1
+    assert sorted(stored('ann')) == ['2025-04-01', '2025-04-02', '2025-04-03', '2025-05-02']
+    assert list(stored('carl')) == ['2025-04-01']
+
+
+def test_large_import_takes_few_requests(backend, tmp_path):
+    first = TODAY - timedelta(days=12_000)
+    days = [(first + timedelta(days=i)).isoformat() for i in range(12_000)]
+    backend.load('sleep_logs', [make_row('dan', day) for day in days[:2500]])
+    path = write_csv(tmp_path / 'history.csv', [make_row('dan', day) for day in days])
+    progress = []
+    backend.requests = 0
+    result = importer.import_file(path, batch_size=4000, progress=progress.append, today=TODAY)
+    assert (result.imported, result.duplicates) == (9500, 2500)
+    # 3 pages of stored days and the empty one ending them, then 3 batches
+    assert backend.requests == 7
+    assert [report.imported for report in progress] == [4000, 8000, 9500]
+    assert len(stored('dan')) == 12_000
+
+
+def test_failed_batch_raises_and_can_be_resumed(backend, tmp_path, monkeypatch):
+    path = write_csv(tmp_path / 'history.csv', [make_row('eve', f'2025-03-{day:02d}') for day in range(1, 11)])
+    insert = supabase_db.insert_sleep_logs
+    calls = []
+
+    def fail_second_batch(rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise ConnectionError('offline')
+        return insert(rows)
+
+    monkeypatch.setattr(supabase_db, 'insert_sleep_logs', fail_second_batch)
+    with pytest.raises(ConnectionError):
+        importer.import_file(path, batch_size=4, today=TODAY)
+    assert len(stored('eve')) == 4
+    result = importer.import_file(path, batch_size=4, today=TODAY)
+    assert (result.imported, result.duplicates) == (6, 4)
+    assert len(stored('eve')) == 10
+
+
+def test_import_command(backend, tmp_path, capsys):
+    path = write_csv(tmp_path / 'history.csv', [make_row('ann', '2025-04-01'), make_row('ann', '2025-04-02', sleep_time='25:00')])
+    assert cli.main(['import', str(path), '--batch-size', '10']) == 0
+    err = capsys.readouterr().err
+    assert 'read 2, imported 1, duplicates 0, invalid 1' in err
+    assert 'row 2: неверное время sleep_time' in err
+
+    backend.fail_next()
+    assert cli.main(['import', str(path)]) == 1
+    assert 'Import failed' in capsys.readouterr().err
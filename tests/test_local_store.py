@@ -0,0 +1,122 @@
+import pytest
+
+from sleep_tracker.database.local_store import ALL_USERS, LocalStore
+from sleep_tracker.stats import SleepStats, summarize_by_user
+
+
+@pytest.fixture
+def store():
+    store = LocalStore(":memory:")
+    store.upsert([
+        {'id': 1, 'login': 'bob', 'date': '2025-05-01', 'sleep_time': '22:00:00', 'wake_time': '06:00:00', 'wellbeing': 7},
+        {'id': 2, 'login': 'alice', 'date': '2025-05-01', 'sleep_time': '23:00:00', 'wake_time': '07:00:00', 'wellbeing': '8'},
+        {'id': 3, 'login': 'bob', 'date': '2025-05-02', 'sleep_time': '23:30:00', 'wake_time': '07:30:00', 'wellbeing': 6},
+        {'id': 4, 'login': 'bob', 'date': '2025-05-03', 'sleep_time': '00:15:00', 'wake_time': '08:00:00', 'wellbeing': 9},
+    ])
+    yield store
+    store.close()
+
+
+def test_query_filters_order_and_limit(store):
+    """The mirror answers the same queries as fetch_sleep_logs."""
+    rows = store.query(login='bob', columns='date,wellbeing', order='date', desc=True, limit=2)
+    assert rows == [
+        {'date': '2025-05-03', 'wellbeing': 9},
+        {'date': '2025-05-02', 'wellbeing': 6},
+    ]
+    rows = store.query(date_from='2025-05-02', date_to='2025-05-02')
+    assert [row['id'] for row in rows] == [3]
+
+
+def test_values_keep_their_server_types(store):
+    """Wellbeing is stored exactly as the server returned it."""
+    assert store.query(login='alice', columns='wellbeing') == [{'wellbeing': '8'}]
+
+
+def test_unknown_columns_are_rejected(store):
+    with pytest.raises(ValueError):
+        store.query(columns='id; DROP TABLE sleep_logs')
+    with pytest.raises(ValueError):
+        store.query(order='1; --')
+
+
+def test_iter_pages_uses_keyset_pagination(store):
+    pages = list(store.iter_pages(login='bob', columns='date', page_size=2))
+    assert [[row['id'] for row in page] for page in pages] == [[1, 3], [4]]
+
+
+def test_has_entry(store):
+    assert store.has_entry('bob', '2025-05-02')
+    assert not store.has_entry('alice', '2025-05-02')
+
+
+def test_upsert_replaces_existing_rows(store):
+    store.upsert([{'id': 2, 'login': 'alice', 'date': '2025-05-01', 'sleep_time': '21:00:00', 'wake_time': '05:00:00', 'wellbeing': 5}])
+    assert store.query(login='alice', columns='sleep_time') == [{'sleep_time': '21:00:00'}]
+
+
+def test_high_water_mark_is_tracked_per_scope(store):
+    assert store.high_water_mark(ALL_USERS) is None
+    store.mark_synced('bob', 4)
+    store.mark_synced(ALL_USERS, None)
+    assert store.high_water_mark('bob') == 4
+    assert store.high_water_mark(ALL_USERS) is None
+    assert store.is_fresh('bob', 60)
+    assert store.is_fresh('alice', 60)
+    store.reset_sync()
+    assert store.high_water_mark('bob') is None
+    assert not store.is_fresh('bob', 60)
+
+
+def _rollup_summaries(store, **window):
+    stats = SleepStats()
+    for group, *totals in store.rollup_totals(**window):
+        stats.merge(group, *totals)
+    return stats.summaries()
+
+
+def _logs(store, date_from=None, date_to=None):
+    return store.query(date_from=date_from, date_to=date_to, order='login')
+
+
+def test_rollups_match_raw_logs(store):
+    """Rollup totals give the same summaries as aggregating every log."""
+    store.upsert([
+        # Next ISO week, a malformed row and a replaced row
+        {'id': 5, 'login': 'alice', 'date': '2025-05-05', 'sleep_time': '22:45', 'wake_time': '06:10', 'wellbeing': 4},
+        {'id': 6, 'login': 'alice', 'date': '2025-05-06', 'sleep_time': None, 'wake_time': '06:10', 'wellbeing': 4},
+        {'id': 1, 'login': 'bob', 'date': '2025-05-01', 'sleep_time': '21:00:00', 'wake_time': '05:30:00', 'wellbeing': 3},
+    ])
+    assert _rollup_summaries(store) == summarize_by_user(_logs(store))
+    for window in [('2025-05-02', None), (None, '2025-05-04'), ('2025-05-02', '2025-05-02'),
+                   ('2025-04-28', '2025-05-11'), ('2025-05-03', '2025-05-05')]:
+        assert _rollup_summaries(store, date_from=window[0], date_to=window[1]) == \
+            summarize_by_user(_logs(store, *window)), window
+    assert _rollup_summaries(store, login='alice') == summarize_by_user(store.query(login='alice'))
+
+
+def test_rollups_follow_outbox_delivery(store):
+    """Queued rows are left out until delivered, then counted once."""
+    row = {'login': 'alice', 'date': '2025-05-02', 'sleep_time': '23:00', 'wake_time': '07:00', 'wellbeing': 6}
+    store.enqueue(row)
+    assert store.pending_logs(login='alice', date_from='2025-05-02') == [dict(row, id=None, comment=None)]
+    assert _rollup_summaries(store)['alice'].count == 1
+    [(seq, _)] = store.pending()
+    store.complete([seq], [dict(row, id=10)])
+    assert store.pending_logs() == []
+    assert _rollup_summaries(store) == summarize_by_user(_logs(store))
+    assert _rollup_summaries(store)['alice'].count == 2
+
+
+def test_schema_change_refetches_mirror_but_keeps_outbox(tmp_path):
+    path = tmp_path / 'mirror.sqlite3'
+    store = LocalStore(path)
+    store.upsert([{'id': 1, 'login': 'bob', 'date': '2025-05-01', 'sleep_time': '22:00', 'wake_time': '06:00', 'wellbeing': 7}])
+    store.mark_synced(ALL_USERS, 1)
+    store.enqueue({'login': 'bob', 'date': '2025-05-02', 'sleep_time': '22:00', 'wake_time': '06:00', 'wellbeing': 7})
+    store._conn.execute("PRAGMA user_version = 0")
+    store.close()
+    store = LocalStore(path)
+    assert store.high_water_mark(ALL_USERS) is None
+    assert [row['date'] for row in store.query()] == ['2025-05-02']
+    store.close()
@@ -0,0 +1,82 @@
+import json
+
+import pytest
+
+from sleep_tracker.database import supabase_db
+from sleep_tracker.metrics import Histogram, Metrics, metrics
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for ms in [0.5] * 90 + [30] * 9 + [700]:
+        histogram.add(ms, None, 0, True)
+    summary = histogram.as_dict()
+    assert summary['calls'] == 100
+    assert summary['p50_ms'] == 1
+    assert summary['p95_ms'] == 50
+    assert summary['max_ms'] == 700
+    assert summary['buckets']['1'] == 90
+
+
+def test_measure_records_rows_bytes_and_errors():
+    recorder = Metrics(capacity=3)
+
+    def fetch():
+        recorder.add_bytes(100)
+        return [1, 2, 3]
+
+    def fail():
+        raise ValueError('boom')
+
+    assert recorder.measure('fetch', fetch) == [1, 2, 3]
+    with pytest.raises(ValueError):
+        recorder.measure('fail', fail)
+    calls = recorder.snapshot()['calls']
+    assert (calls['fetch']['rows'], calls['fetch']['bytes'], calls['fetch']['errors']) == (3, 100, 0)
+    assert calls['fail']['errors'] == 1
+
+
+def test_nested_calls_share_bytes():
+    recorder = Metrics()
+
+    @recorder.timed('outer')
+    def outer():
+        recorder.add_bytes(10)
+        inner()
+
+    @recorder.timed('inner')
+    def inner():
+        recorder.add_bytes(5)
+
+    outer()
+    recorder.add_bytes(1000)  # outside any call, ignored
+    calls = recorder.snapshot()['calls']
+    assert calls['outer']['bytes'] == 15
+    assert calls['inner']['bytes'] == 5
+
+
+def test_ring_buffer_keeps_last_calls(tmp_path):
+    recorder = Metrics(capacity=3)
+    for i in range(5):
+        recorder.record(f'call{i}', 0.001)
+    assert [call['name'] for call in recorder.snapshot()['recent']] == ['call2', 'call3', 'call4']
+    assert len(recorder.snapshot()['calls']) == 5
+
+    path = tmp_path / 'metrics.json'
+    recorder.dump(path, startup={'imports': 0.5})
+    data = json.loads(path.read_text(encoding='utf-8'))
+    assert data['startup'] == {'imports': 0.5}
+    assert data['calls']['call0']['calls'] == 1
+    recorder.reset()
+    assert recorder.snapshot() == {'calls': {}, 'recent': []}
+
+
+def test_data_layer_is_instrumented(backend):
+    backend.load('sleep_logs', [{'login': 'bob', 'date': '2025-05-01', 'sleep_time': '23:00:00', 'wake_time': '07:00:00', 'wellbeing': 7}])
+    metrics.reset()
+    supabase_db.fetch_sleep_logs(login='bob')
+    supabase_db.has_today_entry('bob')
+    calls = metrics.snapshot()['calls']
+    assert calls['fetch_sleep_logs']['rows'] == 1
+    assert calls['fetch_sleep_logs']['bytes'] > 50
+    assert calls['has_today_entry']['calls'] == 1
@@ -0,0 +1,68 @@
+from datetime import date
+
+import pytest
+
+from sleep_tracker.models import MISSING, LogArray, SleepLog
+from sleep_tracker.stats import SleepStats, summarize, summarize_by_user
+
+ROWS = [
+    {'id': 1, 'login': 'bob', 'date': '2025-05-01', 'sleep_time': '23:30:00', 'wake_time': '07:15:00', 'wellbeing': 7, 'comment': ''},
+    {'id': 2, 'login': 'ann', 'date': '2025-05-01', 'sleep_time': '00:45:00', 'wake_time': '08:00:00', 'wellbeing': '6', 'comment': 'кофе'},
+    {'id': 3, 'login': 'bob', 'date': '2025-05-02', 'sleep_time': 'поздно', 'wake_time': '07:00:00', 'wellbeing': 5, 'comment': None},
+    {'id': None, 'login': 'bob', 'date': '2025-05-03', 'sleep_time': '22:00', 'wake_time': '06:30', 'comment': ''},
+]
+
+
+def test_sleep_log_decodes_a_row_once():
+    log = SleepLog.from_row(ROWS[0])
+    assert (log.login, log.date, log.sleep, log.wake, log.wellbeing) == ('bob', date(2025, 5, 1), 23 * 60 + 30, 7 * 60 + 15, 7)
+    assert log.duration == 7 * 60 + 45
+    assert log.valid
+    assert log.to_row() == dict(ROWS[0], date='2025-05-01')
+    assert not hasattr(log, '__dict__')
+
+
+def test_malformed_rows_are_kept_but_not_counted():
+    log = SleepLog.from_row(ROWS[2])
+    assert not log.valid and log.sleep == MISSING
+    assert log.to_row()['sleep_time'] is None
+    assert SleepLog.from_row({'login': 'bob'}).date is None
+    # Missing wellbeing falls back to the default, as in parse_log
+    assert SleepLog.from_row(ROWS[3]).wellbeing == 5
+
+
+def test_log_array_round_trip():
+    logs = LogArray.from_rows(ROWS)
+    assert len(logs) == 4
+    assert logs.logins == ['bob', 'ann']
+    assert list(logs) == [SleepLog.from_row(row) for row in ROWS]
+    assert logs[-1].id is None and logs[1].comment == 'кофе'
+    assert logs.comments == {1: 'кофе'}
+    assert logs.valid_count() == 3
+    tail = logs[1:3]
+    assert isinstance(tail, LogArray)
+    assert [log.id for log in tail] == [2, 3]
+    assert tail.comments == {0: 'кофе'}
+    with pytest.raises(IndexError):
+        logs[4]
+
+
+def test_statistics_match_the_row_dicts():
+    logs = LogArray.from_rows(ROWS)
+    assert summarize(logs) == summarize(ROWS)
+    assert summarize_by_user(logs) == summarize_by_user(ROWS)
+    assert summarize(LogArray()) is None
+
+
+def test_numpy_path_views_the_arrays():
+    pytest.importorskip('numpy')
+    rows = ROWS * 100
+    logs = LogArray.from_rows(rows)
+    assert SleepStats(vectorize=True).update(logs).summaries() == SleepStats(vectorize=False).update(rows).summaries()
+    assert SleepStats(group_by=None, vectorize=True).update(logs).summary() == summarize(rows)
+
+
+def test_columns_are_compact():
+    rows = [dict(ROWS[0], id=i) for i in range(10_000)]
+    logs = LogArray.from_rows(rows)
+    assert logs.nbytes == 10_000 * 24
@@ -0,0 +1,210 @@
+from sleep_tracker.database.local_store import SKIPPED_ERROR, LocalStore
+from sleep_tracker.database.outbox import OutboxFlusher, is_transient_error
+
+
+def make_row(login, date):
+    return {'login': login, 'date': date, 'sleep_time': '23:00:00', 'wake_time': '07:00:00', 'wellbeing': '7', 'comment': ''}
+
+
+class FakeServer:
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.requests = []
+        self.next_id = 100
+
+    def insert(self, rows):
+        self.requests.append(rows)
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError('offline')
+        stored = []
+        for row in rows:
+            stored.append(dict(row, id=self.next_id))
+            self.next_id += 1
+        return stored
+
+
+def test_queued_rows_are_visible_before_delivery():
+    store = LocalStore(':memory:')
+    store.enqueue(make_row('bob', '2025-05-01'))
+    assert store.has_entry('bob', '2025-05-01')
+    assert store.query(login='bob', columns='id,date') == [{'id': None, 'date': '2025-05-01'}]
+    pages = list(store.iter_pages(login='bob', columns='date'))
+    assert pages == [[{'id': None, 'date': '2025-05-01'}]]
+
+
+def test_flush_sends_everything_in_one_bulk_insert():
+    store = LocalStore(':memory:')
+    for day in ('2025-05-01', '2025-05-02', '2025-05-03'):
+        store.enqueue(make_row('bob', day))
+    server = FakeServer()
+    assert OutboxFlusher(store, server.insert).flush()
+    assert len(server.requests) == 1
+    assert len(server.requests[0]) == 3
+    assert store.pending_count() == 0
+    assert [row['id'] for row in store.query(login='bob', order='date')] == [100, 101, 102]
+
+
+def test_failed_flush_keeps_rows_for_retry():
+    store = LocalStore(':memory:')
+    store.enqueue(make_row('bob', '2025-05-01'))
+    server = FakeServer(fail=1)
+    flusher = OutboxFlusher(store, server.insert)
+    assert not flusher.flush()
+    assert store.pending_count() == 1
+    assert flusher.flush()
+    assert store.pending_count() == 0
+    assert store.query(login='bob', columns='id') == [{'id': 100}]
+
+
+def test_flush_batches_large_backlogs():
+    store = LocalStore(':memory:')
+    for day in range(1, 6):
+        store.enqueue(make_row('bob', f'2025-05-{day:02d}'))
+    server = FakeServer()
+    OutboxFlusher(store, server.insert, batch_size=2).flush()
+    assert [len(rows) for rows in server.requests] == [2, 2, 1]
+
+
+def test_second_log_for_a_day_is_not_queued():
+    store = LocalStore(':memory:')
+    assert store.enqueue(make_row('bob', '2025-05-01')) is not None
+    assert store.enqueue(make_row('bob', '2025-05-01')) is None
+    store.upsert([dict(make_row('alice', '2025-05-01'), id=1)])
+    assert store.enqueue(make_row('alice', '2025-05-01')) is None
+    assert store.pending_count() == 1
+
+
+def test_rows_skipped_by_the_server_are_kept_for_the_user():
+    """A day already logged on another device leaves the outbox but isn't lost."""
+    store = LocalStore(':memory:')
+    store.enqueue(make_row('bob', '2025-05-01'))
+    store.enqueue(make_row('bob', '2025-05-02'))
+    server = FakeServer()
+    assert OutboxFlusher(store, lambda rows: server.insert(rows[1:])).flush()
+    assert store.pending_count() == 0
+    assert [row['date'] for row in store.query(login='bob')] == ['2025-05-02']
+    rejected = store.rejected('bob', unseen=True)
+    assert [(row['date'], row['error']) for row in rejected] == [('2025-05-01', SKIPPED_ERROR)]
+    assert rejected[0]['sleep_time'] == '23:00:00'
+    store.mark_seen([rejected[0]['seq']])
+    assert store.rejected('bob', unseen=True) == []
+    assert len(store.rejected('bob')) == 1
+
+
+class RefusingServer(FakeServer):
+    """Refuses every batch containing a row for one bad day."""
+
+    def __init__(self, bad_date):
+        super().__init__()
+        self.bad_date = bad_date
+
+    def insert(self, rows):
+        if any(row['date'] == self.bad_date for row in rows):
+            self.requests.append(rows)
+            raise ValueError('invalid input syntax')
+        return super().insert(rows)
+
+
+def test_refused_row_is_isolated_and_rejected():
+    store = LocalStore(':memory:')
+    for day in range(1, 9):
+        store.enqueue(make_row('bob', f'2025-05-{day:02d}'))
+    server = RefusingServer('2025-05-03')
+    flusher = OutboxFlusher(store, server.insert, max_attempts=2)
+    # The rows queued with the bad one are delivered right away
+    assert not flusher.flush()
+    assert [row['date'] for _, row in store.pending()] == ['2025-05-03']
+    assert len(store.query(login='bob', columns='id')) == 8
+    # Later rows no longer wait behind it once it is rejected
+    store.enqueue(make_row('bob', '2025-05-09'))
+    assert flusher.flush()
+    assert store.pending_count() == 0
+    rejected = store.rejected()
+    assert [(row['date'], row['error']) for row in rejected] == [('2025-05-03', 'invalid input syntax')]
+    assert store.rejected('alice') == []
+    assert not store.has_entry('bob', '2025-05-03')
+
+
+def test_network_errors_never_reject_rows():
+    store = LocalStore(':memory:')
+    store.enqueue(make_row('bob', '2025-05-01'))
+    server = FakeServer(fail=10)
+    flusher = OutboxFlusher(store, server.insert, max_attempts=2)
+    for _ in range(5):
+        assert not flusher.flush()
+    assert store.pending_count() == 1
+    assert store.rejected() == []
+
+
+class APIError(Exception):
+    """Shaped like postgrest's: ``code`` is a SQLSTATE, a PostgREST code or an HTTP status."""
+
+    def __init__(self, code):
+        super().__init__(f'error {code}')
+        self.code = code
+
+
+def test_outages_are_transient_and_refusals_are_not():
+    assert is_transient_error(ConnectionError('offline'))
+    assert is_transient_error(TimeoutError())
+    assert is_transient_error(APIError(503))
+    assert is_transient_error(APIError('502'))
+    assert is_transient_error(APIError('57014'))
+    assert is_transient_error(APIError('PGRST001'))
+    assert not is_transient_error(APIError('23505'))
+    assert not is_transient_error(APIError('22P02'))
+    assert not is_transient_error(APIError(400))
+    assert not is_transient_error(APIError('PGRST204'))
+    assert not is_transient_error(ValueError('invalid input syntax'))
+
+
+class ScriptedServer(FakeServer):
+    """Fails with the given errors in turn, then stores rows."""
+
+    def __init__(self, errors):
+        super().__init__()
+        self.errors = list(errors)
+
+    def insert(self, rows):
+        if self.errors:
+            self.requests.append(rows)
+            raise self.errors.pop(0)
+        return super().insert(rows)
+
+
+def test_outages_do_not_spend_the_refusal_budget():
+    """Offline, then a server outage, then a refusal: the row is still retried."""
+    store = LocalStore(':memory:')
+    store.enqueue(make_row('bob', '2025-05-01'))
+    outage = [ConnectionError('offline')] * 5 + [APIError(503), APIError('57014')] * 3
+    server = ScriptedServer(outage + [APIError('23514')])
+    flusher = OutboxFlusher(store, server.insert, max_attempts=2)
+    for _ in range(len(outage) + 1):
+        assert not flusher.flush()
+    assert store.pending_count() == 1
+    assert store.rejected() == []
+    # The server is back
+    assert flusher.flush()
+    assert store.pending_count() == 0
+    assert store.rejected() == []
+    assert store.query(login='bob', columns='id') == [{'id': 100}]
+
+
+def test_flusher_reports_the_users_whose_logs_changed():
+    store = LocalStore(':memory:')
+    store.enqueue(make_row('bob', '2025-05-01'))
+    store.enqueue(make_row('ann', '2025-05-01'))
+    store.enqueue(make_row('cid', '2025-05-03'))
+    server = RefusingServer('2025-05-03')
+    changed = []
+
+    def send(rows):
+        # bob already has a log for the day on the server
+        return server.insert([row for row in rows if row['login'] != 'bob'])
+
+    flusher = OutboxFlusher(store, send, max_attempts=1, changed=changed.append)
+    assert flusher.flush()
+    # bob's log was skipped as a duplicate, ann's delivered, cid's rejected
+    assert sorted(changed) == ['ann', 'bob', 'cid']
+    assert [row['login'] for row in store.rejected()] == ['bob', 'cid']
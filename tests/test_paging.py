@@ -0,0 +1,88 @@
+import asyncio
+
+from sleep_tracker.database import paging, supabase_db
+from sleep_tracker.database.local_store import LocalStore
+from sleep_tracker.database.paging import PagedLogs, visible_range
+
+
+def make_source(size, **kwargs):
+    fetched = []
+
+    def fetch_page(offset, limit):
+        fetched.append(offset)
+        return [{'n': i} for i in range(offset, min(offset + limit, size))]
+
+    return PagedLogs(fetch_page, size, **kwargs), fetched
+
+
+def test_rows_are_fetched_page_by_page():
+    logs, fetched = make_source(95, page_size=10)
+    assert len(logs) == 95
+    assert logs.window(8, 12) == [{'n': 8}, {'n': 9}, {'n': 10}, {'n': 11}]
+    assert logs[-1] == {'n': 94}
+    assert fetched == [0, 10, 90]
+
+
+def test_memory_is_bounded_by_max_pages():
+    logs, fetched = make_source(10_000, page_size=10, max_pages=3)
+    for i in range(0, 10_000, 7):
+        logs[i]
+    assert len(logs._pages) == 3
+    assert len(fetched) == 1000
+    logs[9_999]
+    assert len(fetched) == 1000
+
+
+def test_visible_range():
+    assert visible_range(0, 400, 40, 1000, overscan=5) == (0, 16)
+    assert visible_range(4000, 400, 40, 1000, overscan=5) == (95, 116)
+    assert visible_range(39_900, 400, 40, 1000, overscan=5) == (992, 1000)
+
+
+def test_user_history_pages_the_local_mirror(monkeypatch):
+    store = LocalStore(':memory:')
+    store.upsert([
+        {'id': i, 'login': 'bob', 'date': f'2025-01-{i:02d}', 'sleep_time': '23:00', 'wake_time': '07:00', 'wellbeing': 5}
+        for i in range(1, 26)
+    ])
+    store.mark_synced('bob', 25)
+    monkeypatch.setattr(supabase_db, '_local_store', store)
+    supabase_db.query_cache.invalidate()
+    logs = paging.user_history('bob', page_size=10)
+    assert len(logs) == 25
+    assert [log.date.isoformat() for log in logs.window(9, 11)] == ['2025-01-16', '2025-01-15']
+    assert logs[24].date.isoformat() == '2025-01-01'
+    supabase_db.query_cache.invalidate()
+    store.close()
+
+
+def test_pages_load_in_the_background():
+    logs, fetched = make_source(95, page_size=10)
+    assert logs.cached(12, 'pending') == 'pending'
+    assert logs.missing_pages(8, 25) == [0, 1, 2]
+    assert logs.missing_pages(90, 200) == [9]
+
+    async def load():
+        # Concurrent requests for one page share a single fetch
+        return await asyncio.gather(logs.load_page(1), logs.load_page(1), logs.load_page(2))
+
+    first, second, _ = asyncio.run(load())
+    assert first is second
+    assert sorted(fetched) == [10, 20]
+    assert logs.cached(12) == {'n': 12}
+    assert logs.missing_pages(8, 25) == [0]
+
+
+def test_history_pages_skip_the_shared_cache(monkeypatch):
+    store = LocalStore(':memory:')
+    store.upsert([
+        {'id': i, 'login': 'bob', 'date': f'2025-01-{i:02d}', 'sleep_time': '23:00', 'wake_time': '07:00', 'wellbeing': 5}
+        for i in range(1, 26)
+    ])
+    store.mark_synced('bob', 25)
+    monkeypatch.setattr(supabase_db, '_local_store', store)
+    supabase_db.query_cache.invalidate()
+    logs = paging.user_history('bob', page_size=10)
+    logs.window(0, 25)
+    assert supabase_db.query_cache.stats()['size'] == 0
+    store.close()
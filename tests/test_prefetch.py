@@ -0,0 +1,80 @@
+import asyncio
+
+from sleep_tracker.database import async_db
+from sleep_tracker.database.prefetch import Prefetcher
+
+
+def fake_fetches(monkeypatch, calls):
+    async def fetch_overview(login):
+        calls.append(('overview', login))
+        return f'overview of {login}'
+
+    async def fetch_summaries(date_from=None, date_to=None):
+        calls.append(('summaries', date_from is not None))
+        return {}
+
+    monkeypatch.setattr(async_db, 'fetch_overview', fetch_overview)
+    monkeypatch.setattr(async_db, 'fetch_summaries', fetch_summaries)
+
+
+def test_jobs_run_in_background_and_are_served_once(monkeypatch):
+    calls = []
+    fake_fetches(monkeypatch, calls)
+
+    async def main():
+        prefetcher = Prefetcher(asyncio.get_running_loop(), delay=0)
+        prefetcher.start('boss', 'admin')
+        assert prefetcher.result('overview') is None
+        await prefetcher._runner
+        assert prefetcher.result('overview') == 'overview of boss'
+        assert await prefetcher.get('overview') == 'overview of boss'
+        assert await prefetcher.get('summaries') == {}
+
+    asyncio.run(main())
+    assert calls == [('overview', 'boss'), ('summaries', True), ('summaries', False)]
+
+
+def test_users_only_prefetch_their_overview(monkeypatch):
+    calls = []
+    fake_fetches(monkeypatch, calls)
+
+    async def main():
+        prefetcher = Prefetcher(asyncio.get_running_loop(), delay=0)
+        prefetcher.start('bob', 'user')
+        await prefetcher._runner
+        assert prefetcher.get('summaries') is None
+
+    asyncio.run(main())
+    assert calls == [('overview', 'bob')]
+
+
+def test_cancel_stops_pending_jobs(monkeypatch):
+    calls = []
+    fake_fetches(monkeypatch, calls)
+
+    async def main():
+        prefetcher = Prefetcher(asyncio.get_running_loop(), delay=10)
+        prefetcher.start('bob', 'user')
+        runner = prefetcher._runner
+        prefetcher.cancel()
+        await asyncio.sleep(0)
+        assert runner.cancelled()
+        assert prefetcher.get('overview') is None
+
+    asyncio.run(main())
+    assert calls == []
+
+
+def test_stale_results_are_fetched_again(monkeypatch):
+    calls = []
+    fake_fetches(monkeypatch, calls)
+
+    async def main():
+        prefetcher = Prefetcher(asyncio.get_running_loop(), delay=0, max_age=0)
+        prefetcher.start('bob', 'user')
+        await prefetcher._runner
+        assert prefetcher.result('overview') is None
+        await prefetcher.get('overview')
+
+    asyncio.run(main())
+    assert calls == [('overview', 'bob'), ('overview', 'bob')]
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("toga_dummy")
+
+
+@pytest.fixture
+def make_app(monkeypatch):
+    monkeypatch.setenv("TOGA_BACKEND", "toga_dummy")
+
+    def make(role):
+        return SimpleNamespace(
+            current_user="alice",
+            user_role=role,
+            loop=SimpleNamespace(create_task=lambda coro: coro.close()),
+            prefetcher=SimpleNamespace(get=lambda name: None),
+        )
+
+    return make
+
+
+@pytest.mark.parametrize("role, shown", [("admin", True), ("user", False)])
+def test_admin_button_only_for_admins(make_app, role, shown):
+    from sleep_tracker.screens.main_menu import MainMenuScreen
+
+    screen = MainMenuScreen(make_app(role))
+
+    assert (screen.admin_button in screen.admin_box.children) is shown
+
+
+def test_admin_button_follows_the_role(make_app):
+    from sleep_tracker.screens.main_menu import MainMenuScreen
+
+    app = make_app("user")
+    screen = MainMenuScreen(app)
+    app.user_role = "admin"
+    screen.reload()
+    assert screen.admin_button in screen.admin_box.children
+
+    app.user_role = "user"
+    screen.reload()
+    assert screen.admin_button not in screen.admin_box.children
@@ -0,0 +1,51 @@
+from sleep_tracker.database import session
+from sleep_tracker.database.session import clear_session, load_session, save_session, verify_session
+
+BOB = {'login': 'bob', 'password': 'secret', 'role': 'user'}
+
+
+def test_saved_session_is_restored(tmp_path):
+    path = tmp_path / 'session.json'
+    token = save_session(path, BOB)
+    restored = load_session(path)
+    assert restored['login'] == 'bob'
+    assert restored['token'] == token
+    assert 'role' not in restored
+    assert verify_session(restored, BOB)
+    # The role is whatever the server says now
+    assert verify_session(restored, dict(BOB, role='admin'))
+
+
+def test_session_is_checked_against_the_server(tmp_path):
+    path = tmp_path / 'session.json'
+    save_session(path, BOB)
+    restored = load_session(path)
+    assert not verify_session(restored, None)
+    assert not verify_session(restored, dict(BOB, password='changed'))
+    assert not verify_session(dict(restored, login='alice'), dict(BOB, login='alice'))
+    assert not verify_session(dict(restored, expires=restored['expires'] + 1), BOB)
+
+
+def test_expired_session_is_ignored(tmp_path, monkeypatch):
+    path = tmp_path / 'session.json'
+    save_session(path, BOB)
+    now = session.time.time()
+    monkeypatch.setattr(session.time, 'time', lambda: now + session.SESSION_TTL + 1)
+    assert load_session(path) is None
+
+
+def test_missing_or_corrupt_session(tmp_path):
+    path = tmp_path / 'session.json'
+    assert load_session(path) is None
+    path.write_text('{not json')
+    assert load_session(path) is None
+    path.write_text('{"login": "bob", "role": "admin", "expires": 1e20}')
+    assert load_session(path) is None
+
+
+def test_clear_session(tmp_path):
+    path = tmp_path / 'session.json'
+    save_session(path, BOB)
+    clear_session(path)
+    clear_session(path)
+    assert load_session(path) is None
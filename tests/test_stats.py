@@ -0,0 +1,144 @@
+import pytest
+
+from sleep_tracker.models import LogArray
+from sleep_tracker.stats import (
+    SleepStats,
+    format_minutes,
+    parse_minutes,
+    summarize,
+    summarize_by_user,
+)
+
+
+def test_parse_minutes():
+    """Times with and without seconds are parsed to minutes after midnight."""
+    assert parse_minutes('00:00') == 0
+    assert parse_minutes('23:15:00') == 23 * 60 + 15
+    assert parse_minutes('7:05') == 7 * 60 + 5
+
+
+def test_format_minutes():
+    """Minutes are formatted back as HH:MM."""
+    assert format_minutes(0) == '00:00'
+    assert format_minutes(23 * 60 + 15) == '23:15'
+
+
+def test_summarize_single_group():
+    """Times are averaged on the clock, durations wrap past midnight."""
+    logs = [
+        {'sleep_time': '22:00:00', 'wake_time': '06:00:00', 'wellbeing': '7'},
+        {'sleep_time': '23:02:00', 'wake_time': '07:00:00', 'wellbeing': 8},
+    ]
+    summary = summarize(logs)
+    assert summary.count == 2
+    assert summary.avg_sleep == 22 * 60 + 31
+    assert summary.avg_wake == 6 * 60 + 30
+    assert summary.avg_wellbeing == 7.5
+    assert summary.avg_duration == (8 * 60 + 7 * 60 + 58) / 2
+
+
+def test_bedtimes_around_midnight_average_to_midnight():
+    summary = summarize([
+        {'sleep_time': '23:30', 'wake_time': '07:30'},
+        {'sleep_time': '00:30', 'wake_time': '08:30'},
+    ])
+    assert summary.avg_sleep == 0
+    assert summary.avg_wake == 8 * 60
+    assert summary.avg_duration == 8 * 60
+
+
+def test_malformed_logs_are_skipped():
+    """Rows with missing or broken values do not count."""
+    logs = [
+        {'sleep_time': None, 'wake_time': '06:00'},
+        {'sleep_time': 'late', 'wake_time': '06:00'},
+        {'wake_time': '06:00'},
+        {'sleep_time': '22:00', 'wake_time': '06:00', 'wellbeing': 'good'},
+        {'sleep_time': '22', 'wake_time': '06:00'},
+        {'sleep_time': 2200, 'wake_time': '06:00'},
+    ]
+    assert summarize(logs) is None
+    assert not any(SleepStats().add(log) for log in logs)
+
+
+def test_missing_wellbeing_defaults_to_five():
+    """A log without a wellbeing value counts as 5."""
+    summary = summarize([{'sleep_time': '22:00', 'wake_time': '06:00'}])
+    assert summary.avg_wellbeing == 5
+
+
+def test_group_by_user_keeps_first_appearance_order():
+    """Per-user summaries are grouped in a single pass."""
+    logs = [
+        {'login': 'bob', 'sleep_time': '22:00', 'wake_time': '06:00', 'wellbeing': 5},
+        {'login': 'alice', 'sleep_time': '23:00', 'wake_time': '07:00', 'wellbeing': 9},
+        {'login': 'bob', 'sleep_time': '00:00', 'wake_time': '08:00', 'wellbeing': 7},
+    ]
+    summaries = summarize_by_user(logs)
+    assert list(summaries) == ['bob', 'alice']
+    assert summaries['bob'].count == 2
+    assert summaries['bob'].avg_wellbeing == 6
+    assert summaries['alice'].avg_sleep == 23 * 60
+
+
+def test_engine_accepts_rows_incrementally():
+    """Feeding rows one at a time gives the same result as a batch."""
+    logs = [
+        {'login': 'bob', 'sleep_time': '22:00', 'wake_time': '06:00', 'wellbeing': 5},
+        {'login': 'bob', 'sleep_time': '23:30', 'wake_time': '07:10', 'wellbeing': 6},
+    ]
+    stats = SleepStats()
+    for log in logs:
+        assert stats.add(log)
+    assert stats.summaries() == summarize_by_user(logs)
+    assert stats.summary('nobody') is None
+
+
+def test_vectorized_path_matches_pure_python():
+    """The NumPy path accepts and rejects exactly the same rows."""
+    pytest.importorskip('numpy')
+    times = ['22:30', '23:45:00', '7:05', ' 7:05', '12:305', '12:30:xx',
+             '-1:30', '25:99', '', 'late', None, 5]
+    wellbeings = [1, '7', 10, ' 4', 2.7, 'x', None]
+    logins = ['bob', 'alice', None]
+    logs = []
+    for i in range(600):
+        log = {
+            'login': logins[i % 3],
+            'sleep_time': times[i % len(times)],
+            'wake_time': times[(i * 7) % len(times)],
+            'wellbeing': wellbeings[(i * 5) % len(wellbeings)],
+        }
+        if i % 11 == 0:
+            del log['wellbeing']
+        if i % 13 == 0:
+            del log['login']
+        logs.append(log)
+    expected = SleepStats(vectorize=False).update(logs).summaries()
+    result = SleepStats(vectorize=True).update(logs).summaries()
+    assert result == expected
+    assert list(result) == list(expected)
+
+
+def test_vectorized_pages_keep_group_order():
+    """Groups appear in order of their first counted row across pages."""
+    pytest.importorskip('numpy')
+    logs = [
+        {'login': 'bob', 'sleep_time': 'late', 'wake_time': '06:00'},
+        {'login': 'alice', 'sleep_time': '23:00', 'wake_time': '07:00'},
+        {'login': 'bob', 'sleep_time': '22:00', 'wake_time': '06:00'},
+    ]
+    stats = SleepStats(vectorize=True)
+    stats.update(logs[:2])
+    stats.update(logs[2:])
+    assert list(stats.summaries()) == ['alice', 'bob']
+    assert stats.summaries() == summarize_by_user(logs)
+
+
+def test_vectorized_empty_batch():
+    """An empty page or window adds nothing, as on the pure-Python path."""
+    pytest.importorskip('numpy')
+    stats = SleepStats(vectorize=True)
+    assert stats.update([]).summaries() == {}
+    assert stats.update(LogArray()).summaries() == {}
+    assert SleepStats(group_by=None, vectorize=True).update([]).summary() is None
@@ -0,0 +1,78 @@
+import os
+import subprocess
+import sys
+import threading
+import types
+from pathlib import Path
+
+import pytest
+
+from sleep_tracker.database import supabase_db
+
+
+def test_import_does_not_load_the_network_stack():
+    """Importing the data layer must stay cheap for the startup path."""
+    code = (
+        "import sys\n"
+        "import sleep_tracker.database.supabase_db\n"
+        "assert not {'supabase', 'postgrest', 'httpx'} & set(sys.modules)\n"
+    )
+    src = Path(supabase_db.__file__).parents[2]
+    subprocess.run([sys.executable, '-c', code], check=True, env={**os.environ, 'PYTHONPATH': str(src)})
+
+
+def test_client_is_created_once(monkeypatch):
+    calls = []
+
+    def create_client(url, key, options):
+        calls.append((url, key))
+        assert options.httpx_client == 'pooled'
+        return object()
+
+    monkeypatch.setitem(sys.modules, 'supabase', types.SimpleNamespace(
+        create_client=create_client, ClientOptions=types.SimpleNamespace,
+    ))
+    monkeypatch.setattr(supabase_db, 'create_http_client', lambda config, **kwargs: 'pooled')
+    monkeypatch.setattr(supabase_db, '_client', None)
+    clients = []
+    threads = [threading.Thread(target=lambda: clients.append(supabase_db.get_client())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(client is clients[0] for client in clients)
+
+
+class FakeUpsertClient:
+    """Just enough of the Supabase client for save_sleep_data."""
+
+    def __init__(self, existing):
+        self.existing = existing
+        self.requests = 0
+
+    def table(self, name):
+        return self
+
+    def upsert(self, row, on_conflict, ignore_duplicates):
+        assert on_conflict == 'login,date' and ignore_duplicates
+        self.row = row
+        return self
+
+    def execute(self):
+        self.requests += 1
+        key = (self.row['login'], self.row['date'])
+        if key in self.existing:
+            return types.SimpleNamespace(data=[])
+        self.existing.add(key)
+        return types.SimpleNamespace(data=[dict(self.row, id=1)])
+
+
+def test_save_rejects_second_entry_in_one_request(monkeypatch):
+    client = FakeUpsertClient(existing=set())
+    monkeypatch.setattr(supabase_db, '_client', client)
+    monkeypatch.setattr(supabase_db, '_local_store', None)
+    assert supabase_db.save_sleep_data('bob', '23:00:00', '07:00:00', '7')
+    with pytest.raises(supabase_db.DuplicateEntryError):
+        supabase_db.save_sleep_data('bob', '23:30:00', '07:30:00', '6')
+    assert client.requests == 2
@@ -0,0 +1,32 @@
+import pytest
+
+from sleep_tracker.database import supabase_db
+from sleep_tracker.database.transport import TransportConfig, create_http_client
+
+
+def test_client_uses_configured_pool_and_timeouts():
+    pytest.importorskip('httpx')
+    config = TransportConfig(max_connections=3, max_keepalive_connections=2, read_timeout=7.5)
+    with create_http_client(config) as client:
+        pool = client._transport._pool
+        assert pool._max_connections == 3
+        assert pool._max_keepalive_connections == 2
+        assert client.timeout.read == 7.5
+        assert client.timeout.connect == config.connect_timeout
+
+
+def test_configure_transport_replaces_the_client(monkeypatch):
+    closed = []
+
+    class HttpClient:
+        def close(self):
+            closed.append(self)
+
+    old = HttpClient()
+    monkeypatch.setattr(supabase_db, '_client', object())
+    monkeypatch.setattr(supabase_db, '_http_client', old)
+    monkeypatch.setattr(supabase_db, '_transport_config', TransportConfig())
+    supabase_db.configure_transport(TransportConfig(http2=False))
+    assert closed == [old]
+    assert supabase_db._client is None
+    assert supabase_db._transport_config.http2 is False